@@ -0,0 +1,223 @@
+# benchmarks/run.py
+from __future__ import annotations
+
+import os, sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.server import StandInServer
+from benchmarks.synth import Synth, atom_feed, profile_vocab
+
+
+SUITES = ("parse", "rank", "e2e")
+DEFAULT_SIZES = (1_000, 10_000)
+PAGE_SIZE = 200
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _summary(suite: str, size: int, items: int, latencies: List[float], total_seconds: float, rss_mb: float) -> Dict:
+    lat = np.asarray(latencies) * 1000.0
+    return {
+        "suite": suite,
+        "size": size,
+        "samples": len(latencies),
+        "throughput_per_s": items / total_seconds if total_seconds > 0 else 0.0,
+        "p50_ms": float(np.percentile(lat, 50)) if len(lat) else 0.0,
+        "p99_ms": float(np.percentile(lat, 99)) if len(lat) else 0.0,
+        "total_s": total_seconds,
+        "peak_rss_mb": rss_mb,
+    }
+
+
+# ---- suites (run inside a worker process so peak RSS is per suite) ----
+
+def bench_parse(size: int, repeat: int, seed: int) -> Dict:
+    """Streaming Atom parser over API-sized pages; latency is per page."""
+    from mercurial.sources.atom_parser import parse_feed
+
+    synth = Synth(size, seed=seed)
+    latencies: List[float] = []
+    total = 0.0
+    parsed = 0
+    for _ in range(repeat):
+        for start in range(0, size, PAGE_SIZE):
+            body = atom_feed(synth.papers(start, start + PAGE_SIZE))
+            t0 = time.perf_counter()
+            parsed += sum(1 for _ in parse_feed(body))
+            dt = time.perf_counter() - t0
+            latencies.append(dt)
+            total += dt
+    return _summary("parse", size, parsed, latencies, total, _peak_rss_mb())
+
+
+def bench_rank(size: int, repeat: int, seed: int) -> Dict:
+    """rank_top_k over a columnar corpus with every profile's keywords; latency is per full rank."""
+    from mercurial.columnar import PaperBatch
+    from mercurial.ranker.batch_ranker import rank_top_k
+    from mercurial.ranker.simple_ranker import RankerConfig
+
+    synth = Synth(size, seed=seed)
+    batch = PaperBatch.from_papers(synth.papers())
+    cfg = RankerConfig(keywords=profile_vocab().keywords)
+
+    latencies: List[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rank_top_k(batch, cfg, 20, now=synth.now)
+        latencies.append(time.perf_counter() - t0)
+    return _summary("rank", size, size * repeat, latencies, sum(latencies), _peak_rss_mb())
+
+
+def bench_e2e(size: int, repeat: int, seed: int) -> Dict:
+    """`mercurial rank-only` as a subprocess against the local stand-in server."""
+    vocab = profile_vocab()
+    latencies: List[float] = []
+    peak = 0.0
+    with StandInServer(Synth(size, seed=seed)) as srv:
+        env = dict(
+            os.environ,
+            ARXIV_API_URL=srv.url,
+            ARXIV_DELAY_SECONDS="0",
+            MAX_FETCH=str(size),
+            LOOKBACK_HOURS=str(10 ** 6),
+            PROFILES="",
+            ARXIV_CATEGORIES=",".join(vocab.categories),
+            KEYWORDS=",".join(vocab.keywords),
+        )
+        cmd = [sys.executable, "-m", "mercurial.cli", "rank-only", "--top", "20"]
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            proc = subprocess.Popen(cmd, cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL)
+            _, status, usage = os.wait4(proc.pid, 0)
+            latencies.append(time.perf_counter() - t0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            if proc.returncode != 0:
+                raise RuntimeError(f"rank-only exited with {proc.returncode}")
+            rss = usage.ru_maxrss / (1024 * 1024) if sys.platform == "darwin" else usage.ru_maxrss / 1024
+            peak = max(peak, rss)
+    return _summary("e2e", size, size * repeat, latencies, sum(latencies), peak)
+
+
+BENCHES = {"parse": bench_parse, "rank": bench_rank, "e2e": bench_e2e}
+
+
+def _run_worker(suite: str, size: int, repeat: int, seed: int) -> Dict:
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "--worker", suite,
+        "--sizes", str(size), "--repeat", str(repeat), "--seed", str(seed),
+    ]
+    out = subprocess.run(cmd, cwd=PROJECT_ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _compare(current: Dict, baseline_path: Path, max_regression: float | None) -> int:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    base = {(r["suite"], r["size"]): r for r in baseline["results"]}
+    print(f"\n=== vs {baseline_path.name} ({baseline.get('commit', '?')}) ===")
+    worst = 0.0
+    for r in current["results"]:
+        b = base.get((r["suite"], r["size"]))
+        if b is None or not b["throughput_per_s"]:
+            continue
+        change = r["throughput_per_s"] / b["throughput_per_s"] - 1.0
+        worst = min(worst, change)
+        print(
+            f"{r['suite']:>6} {r['size']:>9}  throughput {change:+7.1%}  "
+            f"p99 {b['p99_ms']:.1f} -> {r['p99_ms']:.1f} ms  rss {b['peak_rss_mb']:.0f} -> {r['peak_rss_mb']:.0f} MB"
+        )
+    if max_regression is not None and -worst > max_regression:
+        print(f"REGRESSION: throughput dropped {-worst:.1%} (> {max_regression:.0%})")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Mercurial benchmark suite (synthetic arXiv feeds, no network)")
+    parser.add_argument("--suite", action="append", choices=SUITES, default=None, help="Suites to run (repeatable)")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(n) for n in DEFAULT_SIZES),
+        help="Comma-separated corpus sizes, e.g. 1000,10000,100000,1000000",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Result JSON (default: data/bench/<commit>-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline result JSON to compare against")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=None,
+        help="With --compare: exit 1 if any throughput drops by more than this fraction (e.g. 0.1)",
+    )
+    parser.add_argument("--worker", choices=SUITES, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+
+    if args.worker:
+        print(json.dumps(BENCHES[args.worker](sizes[0], args.repeat, args.seed)))
+        return 0
+
+    results = []
+    for suite in args.suite or list(SUITES):
+        for size in sizes:
+            r = _run_worker(suite, size, args.repeat, args.seed)
+            results.append(r)
+            print(
+                f"{suite:>6} {size:>9}  {r['throughput_per_s']:>12,.0f} items/s  "
+                f"p50 {r['p50_ms']:9.2f} ms  p99 {r['p99_ms']:9.2f} ms  rss {r['peak_rss_mb']:7.1f} MB"
+            )
+
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+
+    out = Path(args.out) if args.out else (
+        Path(PROJECT_ROOT) / "data" / "bench" / f"{commit}-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Saved {out}")
+
+    if args.compare:
+        return _compare(report, Path(args.compare), args.max_regression)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,102 @@
+# benchmarks/server.py
+from __future__ import annotations
+
+import os, sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synth import Synth, atom_feed
+
+
+class StandInServer:
+    """
+    Local stand-in for export.arxiv.org/api/query backed by a Synth corpus.
+
+    Honors start/max_results paging (the search query is ignored: every
+    request pages through the same lastUpdatedDate-descending corpus) and
+    counts requests and bytes served. `latency` (seconds) is slept before
+    each response to stand in for network round-trip and server time.
+    """
+
+    def __init__(self, synth: Synth, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.synth = synth
+        self.latency = latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                q = parse_qs(urlparse(self.path).query)
+                start = int(q.get("start", ["0"])[0])
+                n = int(q.get("max_results", ["10"])[0])
+                body = atom_feed(outer.synth.papers(start, start + n), total=outer.synth.n)
+                if outer.latency > 0:
+                    time.sleep(outer.latency)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/atom+xml; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+                with outer._lock:
+                    outer.requests += 1
+                    outer.bytes_sent += len(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/query"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serve a synthetic arXiv API for local runs")
+    parser.add_argument("--size", type=int, default=10000, help="Number of synthetic papers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay every response by this much")
+    args = parser.parse_args()
+
+    srv = StandInServer(Synth(args.size, seed=args.seed), port=args.port, latency=args.latency_ms / 1000.0)
+    print(f"Serving {args.size} synthetic papers at {srv.url}")
+    print(f"  ARXIV_API_URL={srv.url} ARXIV_DELAY_SECONDS=0 python -m mercurial.cli rank-only")
+    try:
+        srv.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
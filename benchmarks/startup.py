@@ -0,0 +1,112 @@
+# benchmarks/startup.py
+from __future__ import annotations
+
+import os, sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import argparse
+import json
+import statistics
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BUDGET_PATH = Path(__file__).with_name("startup_budget.json")
+
+# Startup budget check for the CLI. `python -X importtime -c "import mercurial.cli"`
+# is run a few times; the median cumulative import time of each mercurial
+# module and the wall time of `mercurial profiles` must stay within
+# startup_budget.json, and none of the heavy modules may be imported at all.
+
+
+def importtime(module: str = "mercurial.cli") -> Tuple[Dict[str, int], str]:
+    """{module: cumulative µs} from one fresh interpreter, plus the raw -X importtime output."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    out: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            out[name.strip()] = int(cumulative)
+        except ValueError:
+            continue  # header line
+    return out, proc.stderr
+
+
+def profiles_wall_ms() -> float:
+    t0 = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "mercurial.cli", "profiles"], cwd=PROJECT_ROOT, capture_output=True, check=True
+    )
+    return (time.perf_counter() - t0) * 1000.0
+
+
+def measure(runs: int) -> Tuple[Dict[str, int], List[str], float, str]:
+    samples: List[Dict[str, int]] = []
+    raw = ""
+    for _ in range(runs):
+        times, raw = importtime()
+        samples.append(times)
+    ours = sorted({m for s in samples for m in s if m == "mercurial" or m.startswith("mercurial.")})
+    median = {m: int(statistics.median(s.get(m, 0) for s in samples)) for m in ours}
+    imported = sorted(set(samples[-1]))
+    wall = statistics.median(profiles_wall_ms() for _ in range(runs))
+    return median, imported, wall, raw
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check CLI import time against benchmarks/startup_budget.json")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", default=str(BUDGET_PATH))
+    parser.add_argument("--write-budget", action="store_true", help="Write a new budget (2x current + headroom)")
+    parser.add_argument("--importtime-out", default=None, metavar="PATH", help="Save raw -X importtime output")
+    args = parser.parse_args()
+
+    median, imported, wall, raw = measure(args.runs)
+    if args.importtime_out:
+        Path(args.importtime_out).write_text(raw, encoding="utf-8")
+
+    for m, us in sorted(median.items(), key=lambda kv: kv[1], reverse=True):
+        print(f"  {m:<36} {us / 1000:8.1f} ms")
+    print(f"  {'`mercurial profiles` wall':<36} {wall:8.1f} ms")
+
+    budget_path = Path(args.budget)
+    if args.write_budget:
+        budget = json.loads(budget_path.read_text(encoding="utf-8")) if budget_path.exists() else {}
+        budget["import_us"] = {m: max(2 * us, 5_000) for m, us in median.items() if m == "mercurial.cli"}
+        budget["profiles_wall_ms"] = round(2 * wall + 50)
+        budget_path.write_text(json.dumps(budget, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {budget_path}")
+        return 0
+
+    budget = json.loads(budget_path.read_text(encoding="utf-8"))
+    failures: List[str] = []
+    for m, limit in budget.get("import_us", {}).items():
+        if median.get(m, 0) > limit:
+            failures.append(f"{m} imports in {median[m] / 1000:.1f} ms (budget {limit / 1000:.1f} ms)")
+    heavy = [m for m in budget.get("forbidden_modules", []) if m in imported]
+    if heavy:
+        failures.append(f"`import mercurial.cli` pulls in {', '.join(heavy)}")
+    if wall > budget.get("profiles_wall_ms", float("inf")):
+        failures.append(f"`mercurial profiles` took {wall:.0f} ms (budget {budget['profiles_wall_ms']} ms)")
+
+    for f in failures:
+        print(f"OVER BUDGET: {f}")
+    if not failures:
+        print("Startup within budget.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
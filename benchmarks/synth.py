@@ -0,0 +1,138 @@
+# benchmarks/synth.py
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, List
+from xml.sax.saxutils import escape
+
+from mercurial.profiles import list_profiles, load_profile
+from mercurial.types import Paper
+
+
+# filler vocabulary for the non-keyword part of titles/abstracts
+_FILLER = (
+    "we propose a novel method for the of and in to with on by that this our results show "
+    "framework approach performance evaluation experiments demonstrate significant improvement "
+    "based analysis problem efficient robust scalable data training learning model models "
+    "system systems algorithm algorithms task tasks benchmark benchmarks state art existing "
+    "prior work however while achieve achieves outperforms baseline baselines large small "
+    "study propose present introduce new setting settings under across multiple various"
+).split()
+
+_FIRST = "Alice Bob Chen Dmitri Elena Fatima Gustavo Hiro Ines Jun Kai Lena Mehdi Nora Omar Priya".split()
+_LAST = "Smith Wang Garcia Müller Kim Rossi Ivanov Sato Nguyen Okafor Silva Kowalski Haddad Patel".split()
+
+
+@dataclass(frozen=True)
+class Vocab:
+    categories: List[str]
+    keywords: List[str]
+
+
+def profile_vocab() -> Vocab:
+    """Union of categories/keywords over every profiles/*.env (the real keyword sets)."""
+    cats: List[str] = []
+    kws: List[str] = []
+    for name in list_profiles():
+        p = load_profile(name)
+        cats.extend(c for c in p.arxiv_categories if c not in cats)
+        kws.extend(k for k in p.keywords if k not in kws)
+    return Vocab(categories=cats or ["cs.LG"], keywords=kws or ["llm"])
+
+
+class Synth:
+    """
+    Deterministic synthetic corpus: paper i depends only on (seed, i), so any
+    slice can be generated on demand (the stand-in server never holds the
+    whole corpus). Papers are ordered by updated_at descending, spaced
+    `spacing_seconds` apart starting at `now`.
+    """
+
+    def __init__(
+        self,
+        n: int,
+        seed: int = 0,
+        now: datetime | None = None,
+        spacing_seconds: float = 30.0,
+        keyword_rate: float = 0.04,
+        vocab: Vocab | None = None,
+    ):
+        self.n = n
+        self.seed = seed
+        self.now = (now or datetime.utcnow()).replace(microsecond=0)
+        self.spacing = spacing_seconds
+        self.keyword_rate = keyword_rate
+        self.vocab = vocab or profile_vocab()
+
+    def _words(self, r: random.Random, k: int) -> str:
+        out = []
+        for _ in range(k):
+            if r.random() < self.keyword_rate:
+                out.append(r.choice(self.vocab.keywords))
+            else:
+                out.append(r.choice(_FILLER))
+        return " ".join(out)
+
+    def paper(self, i: int) -> Paper:
+        r = random.Random(self.seed * 1_000_003 + i)
+        updated = self.now - timedelta(seconds=self.spacing * i)
+        version = 1 + (r.random() < 0.2) + (r.random() < 0.05)
+        cats = r.sample(self.vocab.categories, k=min(len(self.vocab.categories), r.randint(1, 3)))
+        authors = [f"{r.choice(_FIRST)} {r.choice(_LAST)}" for _ in range(r.randint(1, 8))]
+        return Paper(
+            arxiv_id=f"{2600 + i // 100000:04d}.{i % 100000:05d}",
+            version=version,
+            title=self._words(r, r.randint(6, 16)).capitalize(),
+            authors=authors,
+            abstract=self._words(r, r.randint(120, 260)),
+            categories=cats,
+            published_at=updated - timedelta(days=version - 1, hours=r.randint(0, 48)),
+            updated_at=updated,
+        )
+
+    def papers(self, start: int = 0, stop: int | None = None) -> Iterator[Paper]:
+        stop = self.n if stop is None else min(stop, self.n)
+        for i in range(start, stop):
+            yield self.paper(i)
+
+
+def _ts(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def atom_entry(p: Paper) -> str:
+    authors = "".join(f"<author><name>{escape(a)}</name></author>" for a in p.authors)
+    cats = "".join(
+        f'<category term="{escape(c)}" scheme="http://arxiv.org/schemas/atom"/>' for c in p.categories
+    )
+    return (
+        "<entry>"
+        f"<id>http://arxiv.org/abs/{p.arxiv_id}v{p.version}</id>"
+        f"<updated>{_ts(p.updated_at)}</updated>"
+        f"<published>{_ts(p.published_at)}</published>"
+        f"<title>{escape(p.title)}</title>"
+        f"<summary>  {escape(p.abstract)}\n</summary>"
+        f"{authors}"
+        f'<arxiv:primary_category xmlns:arxiv="http://arxiv.org/schemas/atom" term="{escape(p.categories[0])}" '
+        'scheme="http://arxiv.org/schemas/atom"/>'
+        f"{cats}"
+        f'<link href="{p.abs_url}v{p.version}" rel="alternate" type="text/html"/>'
+        f'<link title="pdf" href="{p.pdf_url}" rel="related" type="application/pdf"/>'
+        "</entry>"
+    )
+
+
+def atom_feed(papers: Iterator[Paper], total: int | None = None) -> bytes:
+    """Serialize papers as an arXiv-API-shaped Atom response."""
+    head = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" '
+        'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+        'xmlns:arxiv="http://arxiv.org/schemas/atom">'
+        "<title>ArXiv Query: synthetic</title>"
+    )
+    if total is not None:
+        head += f"<opensearch:totalResults>{total}</opensearch:totalResults>"
+    return (head + "".join(atom_entry(p) for p in papers) + "</feed>").encode("utf-8")
@@ -2,39 +2,217 @@
 from __future__ import annotations
 
 import argparse
+import os
+import re
+import sys
+from contextlib import redirect_stdout
+from dataclasses import replace
+from datetime import datetime, timedelta
 from textwrap import shorten
+from typing import TYPE_CHECKING
 
+from . import instrument
 from .config import load_settings
+from .export import EXPORT_FORMATS
 
-from .profiles import list_profiles
-from .sources.arxiv_client import fetch_recent
+from .profiles import Profile, list_profiles, load_profile
+from .sources.planner import SHARD_STRATEGIES
+from .sources.snapshot import SNAPSHOT_FORMATS
 
-from .ranker.simple_ranker import RankerConfig, rank_papers
+# Everything heavy (requests, numpy, the rankers, SQLite stores) is imported
+# inside the commands that use it, so `mercurial profiles` or `--help` stay fast.
+if TYPE_CHECKING:
+    from .sources.arxiv_client import ArxivClient
+    from .sources.http_cache import ResponseCache
+    from .sources.planner import Shard
 
 
-def cmd_fetch_only(profiles: list[str] | None) -> int:
+def _make_cache(s, cache: bool, replay: bool) -> ResponseCache | None:
+    if not (cache or replay):
+        return None
+    from .sources.http_cache import ResponseCache
+
+    return ResponseCache(
+        ttl_seconds=s.http_cache_ttl_seconds,
+        max_bytes=int(s.http_cache_max_mb * 1024 * 1024),
+        replay=replay,
+    )
+
+
+def _plan_shards(s, strategy: str) -> list[Shard]:
+    from .sources.planner import Shard, plan_by_category, plan_by_profile
+
+    shards: list[Shard] = []
+    if strategy == "profile":
+        shards = plan_by_profile(s.profiles, s.base_categories, s.base_keywords)
+    elif strategy == "category":
+        shards = plan_by_category(s.arxiv_categories, s.keywords)
+    return shards or [Shard("all", s.arxiv_categories, s.keywords)]
+
+
+def _profile_groups(s) -> list[Profile]:
+    # like plan_by_profile: a 'base' group for legacy .env keywords, then one per profile
+    groups: list[Profile] = []
+    if s.base_categories or s.base_keywords:
+        groups.append(Profile("base", list(s.base_categories), list(s.base_keywords)))
+    groups.extend(load_profile(name) for name in s.profiles)
+    return groups or [Profile("all", list(s.arxiv_categories), list(s.keywords))]
+
+
+def _print_ranked(ranked) -> None:
+    for i, rp in enumerate(ranked, 1):
+        p = rp.paper
+        hits = ", ".join(rp.matched_keywords[:8]) + ("..." if len(rp.matched_keywords) > 8 else "")
+        b = rp.score_breakdown
+        rel = f"sim={b['similarity']:.3f}" if "similarity" in b else f"kw={b['kw_score']:.1f}"
+        dupes = int(b.get("cluster_size", 1)) - 1
+        dup = f"  (+{dupes} near-duplicate{'s' if dupes > 1 else ''})" if dupes > 0 else ""
+        print(f"[{i}] score={rp.score:.4f}  {rel}  recency={b['recency']:.3f}  hrs={b['hours_ago']:.1f}{dup}")
+        print(f"    {p.arxiv_id}v{p.version} | {p.updated_at} UTC")
+        print(f"    {p.title}")
+        print(f"    hits: {hits}")
+        print(f"    {p.abs_url}")
+        print()
+
+
+def _load_seeds(seed_ids: list[str], papers, cache: ResponseCache | None, client: ArxivClient):
+    """Seed papers by arXiv id (version suffix ignored): from the window, then data/papers.db, then arXiv."""
+    from .sources.arxiv_client import fetch_by_ids
+    from .store import PaperStore
+
+    wanted = list(dict.fromkeys(re.sub(r"v\d+$", "", i.strip()) for x in seed_ids for i in x.split(",") if i.strip()))
+    row_of = {a: i for i, a in enumerate(papers.arxiv_ids)}
+    found = {a: papers[row_of[a]] for a in wanted if a in row_of}
+    missing = [a for a in wanted if a not in found]
+    if missing:
+        with PaperStore() as store:
+            found.update((p.arxiv_id, p) for p in store.latest(missing))
+        missing = [a for a in wanted if a not in found]
+    if missing:
+        found.update((p.arxiv_id, p) for p in fetch_by_ids(missing, cache=cache, client=client))
+    for a in wanted:
+        if a not in found:
+            print(f"Seed {a} not found; ignored")
+    return [found[a] for a in wanted if a in found]
+
+
+def _print_rank_header(s, n_papers: int, n: int, by_profile: bool, client: ArxivClient) -> None:
+    prof_str = ", ".join(s.profiles) if s.profiles else "(none)"
+    print(f"Profiles: {prof_str}")
+    per = " per profile" if by_profile else ""
+    print(f"Fetched {n_papers} papers -> Ranked {n_papers} papers. Showing top {n}{per}.")
+    print(f"arXiv: {client.stats.summary()}")
+
+
+def _print_shard_report(results) -> None:
+    for res in results:
+        print(
+            f"  shard {res.shard.name}: {res.fetched} papers in {res.seconds:.2f}s "
+            f"(query {len(res.shard.query)} chars)"
+            + ("" if res.status is None or res.status.complete else "; stopped at max_fetch")
+        )
+
+
+def _iter_papers(
+    s,
+    sync: bool,
+    cache: ResponseCache | None = None,
+    shard: str | None = None,
+    workers: int = 4,
+    client: ArxivClient | None = None,
+):
+    """Stream papers straight from arXiv, or sync the local store and read the window back."""
+    from .sources.arxiv_client import iter_recent
+    from .sources.planner import merge_results, run_shards
+    from .store import PaperStore, sync_recent, sync_shards
+
+    if shard is not None:
+        shards = _plan_shards(s, shard)
+        print(f"Running {len(shards)} query shards ({shard}) on {workers} workers")
+
+        if not sync:
+            results = run_shards(
+                shards, s.lookback_hours, s.max_fetch, max_workers=workers, client=client, cache=cache
+            )
+            _print_shard_report(results)
+            yield from merge_results(results)
+            return
+
+        with PaperStore() as store:
+            results = sync_shards(
+                store, shards, s.lookback_hours, s.max_fetch, max_workers=workers, client=client, cache=cache
+            )
+            _print_shard_report(results)
+            cutoff = datetime.utcnow() - timedelta(hours=s.lookback_hours)
+            yield from store.iter_window(cutoff, query=[sh.query for sh in shards])
+        return
+
+    if not sync:
+        yield from iter_recent(
+            categories=s.arxiv_categories,
+            keywords=s.keywords,
+            lookback_hours=s.lookback_hours,
+            max_fetch=s.max_fetch,
+            cache=cache,
+            client=client,
+        )
+        return
+
+    with PaperStore() as store:
+        res = sync_recent(
+            store,
+            categories=s.arxiv_categories,
+            keywords=s.keywords,
+            lookback_hours=s.lookback_hours,
+            max_fetch=s.max_fetch,
+            cache=cache,
+            client=client,
+        )
+        since = res.previous_high_water.isoformat() if res.previous_high_water else "(full window)"
+        print(f"Synced {res.fetched} new/updated papers since {since} into {store.path}")
+        if not res.complete:
+            print(
+                f"Warning: the window has more than MAX_FETCH={s.max_fetch} entries; the sync mark was not "
+                "moved, so the next sync fetches the whole window again (raise MAX_FETCH to avoid this)"
+            )
+
+        cutoff = datetime.utcnow() - timedelta(hours=s.lookback_hours)
+        yield from store.iter_window(cutoff, query=res.query)
+
+
+def cmd_fetch_only(
+    profiles: list[str] | None,
+    sync: bool = False,
+    cache: bool = False,
+    replay: bool = False,
+    shard: str | None = None,
+    workers: int = 4,
+) -> int:
+    from .sources.arxiv_client import ArxivClient
+
     s = load_settings(selected_profiles=profiles)
-    papers = fetch_recent(
-        categories=s.arxiv_categories,
-        keywords=s.keywords,
-        lookback_hours=s.lookback_hours,
-        max_fetch=s.max_fetch,
+    client = ArxivClient(s.arxiv_api_url, delay_seconds=s.arxiv_delay_seconds, pool_size=workers)
+    papers = instrument.timed_iter(
+        "stage.fetch", _iter_papers(s, sync, _make_cache(s, cache, replay), shard, workers, client)
     )
 
     prof_str = ", ".join(s.profiles) if s.profiles else "(none)"
     print(f"Profiles: {prof_str}")
-    print(f"Fetched {len(papers)} papers (lookback_hours={s.lookback_hours}, max_fetch={s.max_fetch}).")
+    print(f"Fetching papers (lookback_hours={s.lookback_hours}, max_fetch={s.max_fetch}).")
     print("-" * 80)
 
-    for i, p in enumerate(papers, 1):
+    n = 0
+    for n, p in enumerate(papers, 1):
         authors = ", ".join(p.authors[:5]) + ("..." if len(p.authors) > 5 else "")
-        print(f"[{i}] {p.arxiv_id}v{p.version} | {p.updated_at} UTC")
+        print(f"[{n}] {p.arxiv_id}v{p.version} | {p.updated_at} UTC")
         print(f"    {p.title}")
         print(f"    Authors: {authors}")
         print(f"    {shorten(p.abstract, width=200, placeholder='...')}")
         print(f"    {p.abs_url}")
         print()
 
+    print(f"Fetched {n} papers.")
+    print(f"arXiv: {client.stats.summary()}")
     return 0
 
 
@@ -49,45 +227,539 @@ def cmd_list_profiles() -> int:
         print("-", n)
     return 0
 
-def cmd_rank_only(profiles: list[str] | None, top: int | None) -> int:
+def cmd_rank_only(
+    profiles: list[str] | None,
+    top: int | None,
+    sync: bool = False,
+    cache: bool = False,
+    replay: bool = False,
+    shard: str | None = None,
+    workers: int = 4,
+    ranker: str = "simple",
+    by_profile: bool = False,
+    from_store: bool = False,
+    lookback_hours: int | None = None,
+    score_cache: bool = False,
+    seed_ids: list[str] | None = None,
+    pipeline: bool = True,
+    page_queue: int = 2,
+    batch_queue: int = 4,
+    dedupe: bool = False,
+    dedupe_threshold: float = 0.6,
+    from_pack: str | None = None,
+) -> int:
+    if from_pack and (
+        from_store or sync or shard or by_profile or score_cache or seed_ids or dedupe or ranker != "simple"
+    ):
+        print("--from-pack is only supported with --ranker simple (without --from-store, --sync, --shard or other modes)")
+        return 2
+    if dedupe and (by_profile or score_cache or seed_ids or ranker != "simple"):
+        print("--dedupe is only supported with --ranker simple (without --by-profile, --score-cache or --seed-ids)")
+        return 2
+    if seed_ids and (by_profile or score_cache or ranker != "simple"):
+        print("--seed-ids cannot be combined with --by-profile, --score-cache or --ranker bm25")
+        return 2
+    if by_profile and ranker != "simple":
+        print("--by-profile is only supported with --ranker simple")
+        return 2
+    if score_cache and (by_profile or ranker != "simple"):
+        print("--score-cache is only supported with --ranker simple (without --by-profile)")
+        return 2
+
+    from .columnar import PaperBatch
+    from .ranker.batch_ranker import rank_top_k
+    from .ranker.simple_ranker import RankerConfig
+    from .sources.arxiv_client import ArxivClient
+    from .store import PaperStore
+
     s = load_settings(selected_profiles=profiles)
+    if lookback_hours is not None:
+        s = replace(s, lookback_hours=lookback_hours)
+    client = ArxivClient(s.arxiv_api_url, delay_seconds=s.arxiv_delay_seconds, pool_size=workers)
+    http_cache = _make_cache(s, cache, replay)
+    cfg = RankerConfig.from_settings(s)
+    n = top if top is not None else getattr(s, "top_picks", 20)
 
-    papers = fetch_recent(
-        categories=s.arxiv_categories,
-        keywords=s.keywords,
-        lookback_hours=s.lookback_hours,
-        max_fetch=s.max_fetch,
+    plain = not (
+        from_pack or from_store or sync or shard or by_profile or score_cache or seed_ids or dedupe
+        or ranker != "simple"
     )
+    if pipeline and plain:
+        # fetch, parse and score overlap; only the running top-n is kept
+        from .pipeline import rank_pipelined
 
-    cfg = RankerConfig(
-        keywords=s.keywords,
-        title_weight=getattr(s, "kw_title_weight", 3.0),
-        abstract_weight=getattr(s, "kw_abstract_weight", 1.0),
-        recency_half_life_hours=getattr(s, "recency_half_life_hours", 48.0),
-        category_bonus=getattr(s, "category_bonus", 0.2),
-    )
+        with instrument.span("stage.pipeline"):
+            res = rank_pipelined(
+                s.arxiv_categories,
+                s.keywords,
+                s.lookback_hours,
+                s.max_fetch,
+                cfg,
+                n,
+                page_queue=page_queue,
+                batch_queue=batch_queue,
+                cache=http_cache,
+                client=client,
+            )
+        _print_rank_header(s, res.papers_seen, n, False, client)
+        print(res.stats.summary())
+        print("-" * 80)
+        _print_ranked(res.ranked)
+        return 0
+
+    with instrument.span("stage.fetch"):
+        if from_pack:
+            # rank a pack snapshot (see `export --format pack`) in place; no arXiv requests
+            from .packfile import PackedPapers
+
+            cutoff = datetime.utcnow() - timedelta(hours=s.lookback_hours)
+            try:
+                papers = PackedPapers(from_pack).window(cutoff, categories=s.arxiv_categories or None)
+            except (OSError, ValueError) as e:
+                print(f"Cannot read pack file: {e}")
+                return 2
+        elif from_store:
+            # rank what is already in data/papers.db (e.g. an imported snapshot); no arXiv requests
+            with PaperStore() as store:
+                cutoff = datetime.utcnow() - timedelta(hours=s.lookback_hours)
+                papers = store.load_batch(cutoff, categories=s.arxiv_categories or None)
+        else:
+            papers = PaperBatch.from_papers(_iter_papers(s, sync, http_cache, shard, workers, client))
+        seeds = _load_seeds(seed_ids, papers, http_cache, client) if seed_ids else []
+
+    with instrument.span("stage.rank"):
+        if by_profile:
+            from .ranker.multi_ranker import rank_by_profile
+
+            grouped = rank_by_profile(papers, _profile_groups(s), cfg, n)
+        elif seed_ids:
+            from .ranker.semantic_ranker import SemanticIndex, rank_similar
 
-    ranked = rank_papers(papers, cfg)
+            index = SemanticIndex.open(title_weight=cfg.title_weight / max(cfg.abstract_weight, 1e-9))
+            ranked = rank_similar(papers, seeds, cfg, n, index=index)
+        elif dedupe:
+            from .ranker.dedupe import SignatureCache, rank_deduped
+
+            with SignatureCache() as sig_cache:
+                ranked = rank_deduped(papers, cfg, n, threshold=dedupe_threshold, cache=sig_cache)
+        elif score_cache:
+            from .ranker.score_cache import KEEP_RECENT_CONFIGS, ScoreCache, config_fingerprint, rank_cached
+
+            with ScoreCache() as sc:
+                ranked = rank_cached(papers, cfg, sc, n)
+                # every keyword/profile edit adds a fingerprint; only recent configs are kept
+                sc.prune(config_fingerprint(cfg), keep_recent=KEEP_RECENT_CONFIGS)
+        elif ranker == "bm25":
+            from .ranker.index_ranker import InvertedIndex, rank_bm25
+
+            with InvertedIndex() as index:
+                ranked = rank_bm25(papers, cfg, index, n)
+        else:
+            ranked = rank_top_k(papers, cfg, n)
+
+    _print_rank_header(s, len(papers), n, by_profile, client)
+    print("-" * 80)
+
+    if by_profile:
+        for name, ranked in grouped.items():
+            print(f"=== {name}: top {len(ranked)} ===")
+            print()
+            _print_ranked(ranked)
+    else:
+        _print_ranked(ranked)
+
+    return 0
+
+def _floats(values: list[str] | None) -> list[float]:
+    return [float(x) for v in values or [] for x in v.split(",") if x.strip()]
+
+
+def cmd_rerank(
+    profiles: list[str] | None,
+    top: int | None,
+    title_weights: list[str] | None = None,
+    abstract_weights: list[str] | None = None,
+    half_lives: list[str] | None = None,
+    bonuses: list[str] | None = None,
+    rebuild: bool = False,
+    from_store: bool = False,
+    lookback_hours: int | None = None,
+    sync: bool = False,
+    cache: bool = False,
+    replay: bool = False,
+    jsonl: str | None = None,
+) -> int:
+    import json
+    import time
+
+    from .ranker.feature_store import FeatureTable, Reranker, build_features, features_path, sweep_configs
+    from .ranker.score_cache import ScoreCache, config_fingerprint
+    from .ranker.simple_ranker import RankerConfig
+
+    try:
+        grid = [_floats(title_weights), _floats(abstract_weights), _floats(half_lives), _floats(bonuses)]
+    except ValueError as e:
+        print(f"Weights must be comma-separated numbers: {e}")
+        return 2
+
+    s = load_settings(selected_profiles=profiles)
+    if lookback_hours is not None:
+        s = replace(s, lookback_hours=lookback_hours)
+    cfg = RankerConfig.from_settings(s)
     n = top if top is not None else getattr(s, "top_picks", 20)
+    path = features_path(s.profiles)
+    source = f"{'store' if from_store else 'arxiv'}, lookback {s.lookback_hours}h"
+
+    ft = None if rebuild else FeatureTable.load(path)
+    if ft is not None and ft.fingerprint != config_fingerprint(cfg):
+        print(f"Keywords changed since {path} was built; rebuilding")
+        ft = None
+    elif ft is not None and ft.source != source:
+        print(f"{path} holds another window ({ft.source or 'unknown'}, not {source}); rebuilding")
+        ft = None
+    elif ft is not None and (sync or cache or replay):
+        # these only matter for a fetch, so asking for one means the saved window is not wanted
+        print("--sync/--cache/--replay given; rebuilding the saved features")
+        ft = None
+    elif ft is not None:
+        print(
+            f"Reusing features from {path} ({ft.source}, built {ft.computed_at:%Y-%m-%d %H:%M} UTC); "
+            "--rebuild fetches the window again"
+        )
+    if ft is None:
+        from .columnar import PaperBatch
+        from .sources.arxiv_client import ArxivClient
+        from .store import PaperStore
+
+        with instrument.span("stage.fetch"):
+            if from_store:
+                with PaperStore() as store:
+                    cutoff = datetime.utcnow() - timedelta(hours=s.lookback_hours)
+                    papers = store.load_batch(cutoff, categories=s.arxiv_categories or None)
+            else:
+                client = ArxivClient(s.arxiv_api_url, delay_seconds=s.arxiv_delay_seconds)
+                papers = PaperBatch.from_papers(_iter_papers(s, sync, _make_cache(s, cache, replay), None, 1, client))
+        with ScoreCache() as sc:
+            ft = build_features(papers, cfg, sc, source=source)
+        ft.save(path)
+        print(f"Built features for {len(ft)} papers -> {path}")
+
+    rr = Reranker(ft)
+    configs = sweep_configs(cfg, *grid)
+    base_top, _ = rr.top(cfg, n)
+    base_ids = set(ft.arxiv_ids[base_top])
 
     prof_str = ", ".join(s.profiles) if s.profiles else "(none)"
     print(f"Profiles: {prof_str}")
-    print(f"Fetched {len(papers)} papers -> Ranked {len(ranked)} papers. Showing top {n}.")
+    print(f"Features: {len(ft)} papers as of {ft.computed_at:%Y-%m-%d %H:%M} UTC. Top {n}, {len(configs)} config(s).")
+    print(
+        f"Settings: title={cfg.title_weight:g} abstract={cfg.abstract_weight:g} "
+        f"half_life={cfg.recency_half_life_hours:g}h bonus={cfg.category_bonus:g}"
+    )
     print("-" * 80)
 
-    for i, rp in enumerate(ranked[:n], 1):
-        p = rp.paper
-        hits = ", ".join(rp.matched_keywords[:8]) + ("..." if len(rp.matched_keywords) > 8 else "")
-        b = rp.score_breakdown
-        print(f"[{i}] score={rp.score:.4f}  kw={b['kw_score']:.1f}  recency={b['recency']:.3f}  hrs={b['hours_ago']:.1f}")
-        print(f"    {p.arxiv_id}v{p.version} | {p.updated_at} UTC")
+    out = open(jsonl, "w", encoding="utf-8") if jsonl else None
+    t_all = time.perf_counter()
+    try:
+        for c in configs:
+            t0 = time.perf_counter()
+            idx, score = rr.top(c, n)
+            ms = (time.perf_counter() - t0) * 1000.0
+            ids = [str(a) for a in ft.arxiv_ids[idx]]
+            if out is not None:
+                out.write(
+                    json.dumps(
+                        {
+                            "title_weight": c.title_weight,
+                            "abstract_weight": c.abstract_weight,
+                            "recency_half_life_hours": c.recency_half_life_hours,
+                            "category_bonus": c.category_bonus,
+                            "top": [{"arxiv_id": a, "score": float(score[i])} for a, i in zip(ids, idx)],
+                        }
+                    )
+                    + "\n"
+                )
+            if len(configs) == 1:
+                kw_score, recency, _ = rr.scores(c)
+                for r, i in enumerate(idx, 1):
+                    print(
+                        f"[{r}] score={score[i]:.4f}  kw={kw_score[i]:.1f}  recency={recency[i]:.3f}  "
+                        f"hrs={rr.hours_ago[i]:.1f}  {ft.arxiv_ids[i]}v{ft.versions[i]}"
+                    )
+                    print(f"    {ft.titles[i]}")
+            else:
+                overlap = len(base_ids.intersection(ids))
+                print(
+                    f"title={c.title_weight:<5g} abstract={c.abstract_weight:<5g} "
+                    f"half_life={c.recency_half_life_hours:<6g} bonus={c.category_bonus:<5g} "
+                    f"{ms:6.2f} ms  overlap={overlap}/{len(base_ids)}  top: {', '.join(ids[:3])}"
+                )
+    finally:
+        if out is not None:
+            out.close()
+    total = time.perf_counter() - t_all
+    print("-" * 80)
+    print(f"Re-ranked {len(ft)} papers under {len(configs)} config(s) in {total * 1000:.1f} ms")
+    return 0
+
+
+def cmd_query(
+    authors: list[str] | None,
+    categories: list[str] | None,
+    since: str | None = None,
+    until: str | None = None,
+    days: float | None = None,
+    profiles: list[str] | None = None,
+    rank: bool = False,
+    limit: int = 50,
+    rebuild: bool = False,
+) -> int:
+    import time
+
+    from .facets import FacetIndex, FacetQuery, load_or_build
+    from .store import PaperStore
+
+    try:
+        q = FacetQuery(
+            authors=[a.strip() for a in authors or [] if a.strip()],
+            categories=[c for v in categories or [] for c in _split_csv(v) or []],
+            since=datetime.fromisoformat(since) if since else (
+                datetime.utcnow() - timedelta(days=days) if days is not None else None
+            ),
+            until=datetime.fromisoformat(until) if until else None,
+        )
+    except ValueError as e:
+        print(f"Dates must be ISO format (e.g. 2026-10-01 or 2026-10-01T12:00): {e}")
+        return 2
+
+    with PaperStore() as store:
+        t0 = time.perf_counter()
+        if rebuild:
+            idx = FacetIndex.build(store.facet_rows(), store_key=store.state_key())
+            idx.save()
+            built = True
+        else:
+            idx, built = load_or_build(store)
+        t_index = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        rows, unknown = idx.select(q)
+        t_select = time.perf_counter() - t0
+        for u in unknown:
+            print(f"No stored papers for {u!r}")
+
+        # only the matching papers are read back from the store
+        want = rows if rank else rows[:limit]
+        with instrument.span("query.load"):
+            by_id = {p.arxiv_id: p for p in store.latest([str(a) for a in idx.arxiv_ids[want]])}
+        papers = [by_id[str(a)] for a in idx.arxiv_ids[want] if str(a) in by_id]
+
+    print(
+        f"Index: {len(idx)} papers ({'built' if built else 'loaded'} in {t_index * 1000:.0f} ms). "
+        f"Matched {len(rows)} in {t_select * 1000:.1f} ms."
+    )
+    print("-" * 80)
+
+    if rank:
+        from .ranker.batch_ranker import rank_top_k
+        from .ranker.simple_ranker import RankerConfig
+
+        cfg = RankerConfig.from_settings(load_settings(selected_profiles=profiles))
+        with instrument.span("stage.rank"):
+            _print_ranked(rank_top_k(papers, cfg, limit))
+        return 0
+
+    for n, p in enumerate(papers, 1):
+        authors_str = ", ".join(p.authors[:5]) + ("..." if len(p.authors) > 5 else "")
+        print(f"[{n}] {p.arxiv_id}v{p.version} | {p.updated_at} UTC | {', '.join(p.categories)}")
         print(f"    {p.title}")
-        print(f"    hits: {hits}")
+        print(f"    Authors: {authors_str}")
         print(f"    {p.abs_url}")
         print()
+    if len(rows) > len(papers):
+        print(f"({len(rows) - len(papers)} more; raise --limit to see them)")
+    return 0
+
+
+def cmd_import(
+    paths: list[str],
+    profiles: list[str] | None,
+    categories: list[str] | None,
+    fmt: str | None = None,
+    workers: int | None = None,
+    batch_size: int = 50_000,
+) -> int:
+    from .store import PaperStore, import_snapshot
+
+    wanted = list(categories or [])
+    if profiles:
+        wanted.extend(load_settings(selected_profiles=profiles).arxiv_categories)
+    print(f"Category filter: {', '.join(wanted) if wanted else '(none, importing everything)'}")
+
+    def _progress(read: int, written: int) -> None:
+        print(f"  {read:,} records read, {written:,} papers written", flush=True)
 
+    with PaperStore() as store:
+        for path in paths:
+            res = import_snapshot(
+                store, path, wanted, fmt=fmt, workers=workers, batch_size=batch_size, progress=_progress
+            )
+            rate = res.read / res.seconds if res.seconds > 0 else 0.0
+            print(
+                f"Imported {res.written:,} of {res.read:,} records from {res.path} ({res.format}) "
+                f"in {res.seconds:.1f}s ({rate:,.0f} records/s)"
+            )
+        print(f"Store {store.path}: {store.count():,} paper versions")
     return 0
 
+
+def cmd_watch(
+    profiles: list[str] | None,
+    top: int | None,
+    jsonl: str | None = None,
+    interval: float | None = None,
+    offset_minutes: float = 15.0,
+    iterations: int = 0,
+) -> int:
+    from .watch import watch
+
+    return watch(
+        profiles,
+        top=top,
+        jsonl=jsonl,
+        interval_seconds=interval,
+        offset_minutes=offset_minutes,
+        iterations=iterations,
+    )
+
+
+def cmd_serve(
+    profiles: list[str] | None,
+    host: str = "127.0.0.1",
+    port: int = 8700,
+    interval: float = 900.0,
+    top: int | None = None,
+) -> int:
+    from .serve import serve
+
+    return serve(profiles, host=host, port=port, interval_seconds=interval, top=top)
+
+
+def _export_source(s, from_store: bool, all_papers: bool, sync: bool, cache: bool, replay: bool, shard, workers: int):
+    """Papers to export: the store window (or the whole store), or a fresh fetch."""
+    if from_store:
+        from .store import PaperStore
+
+        since = datetime.min if all_papers else datetime.utcnow() - timedelta(hours=s.lookback_hours)
+        with PaperStore() as store:
+            yield from store.iter_window(since, categories=None if all_papers else (s.arxiv_categories or None))
+        return
+
+    from .sources.arxiv_client import ArxivClient
+
+    client = ArxivClient(s.arxiv_api_url, delay_seconds=s.arxiv_delay_seconds, pool_size=workers)
+    yield from _iter_papers(s, sync, _make_cache(s, cache, replay), shard, workers, client)
+
+
+def cmd_export(
+    profiles: list[str] | None,
+    output: str = "-",
+    fmt: str | None = None,
+    fields: list[str] | None = None,
+    exclude: list[str] | None = None,
+    compress: bool = False,
+    ranked: bool = False,
+    top: int | None = None,
+    from_store: bool = False,
+    all_papers: bool = False,
+    lookback_hours: int | None = None,
+    sync: bool = False,
+    cache: bool = False,
+    replay: bool = False,
+    shard: str | None = None,
+    workers: int = 4,
+) -> int:
+    from .export import export_papers, export_ranked, open_sink, resolve_fields
+
+    if all_papers and not from_store:
+        print("--all needs --from-store", file=sys.stderr)
+        return 2
+    try:
+        columns = resolve_fields(fields, exclude, ranked=ranked)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if fmt is None:
+        if output.endswith(".pack"):
+            fmt = "pack"
+        else:
+            fmt = "csv" if output.removesuffix(".gz").endswith(".csv") else "jsonl"
+    if fmt == "pack" and (output == "-" or compress or ranked or fields or exclude):
+        print(
+            "--format pack writes whole, unranked papers to a file (no stdout, --gzip, --ranked, --fields or --exclude)",
+            file=sys.stderr,
+        )
+        return 2
+
+    s = load_settings(selected_profiles=profiles)
+    if lookback_hours is not None:
+        s = replace(s, lookback_hours=lookback_hours)
+
+    papers = instrument.timed_iter(
+        "stage.fetch", _export_source(s, from_store, all_papers, sync, cache, replay, shard, workers)
+    )
+    if fmt == "pack":
+        from .packfile import write_pack
+
+        with redirect_stdout(sys.stderr):
+            n = write_pack(papers, output)
+        print(f"Exported {n} records (pack) to {output}", file=sys.stderr)
+        return 0
+    try:
+        # the sink grabs the real stdout first; progress output then goes to stderr
+        with open_sink(output, compress) as sink, redirect_stdout(sys.stderr):
+            if not ranked:
+                n = export_papers(papers, sink, fmt, columns)
+            else:
+                from .ranker.batch_ranker import rank_stream, score_stream
+                from .ranker.simple_ranker import RankerConfig
+
+                cfg = RankerConfig.from_settings(s)
+                k = top if top is not None else getattr(s, "top_picks", 20)
+                if k > 0:
+                    n = export_ranked(rank_stream(papers, cfg, k), sink, fmt, columns)
+                else:
+                    n = export_ranked(score_stream(papers, cfg), sink, fmt, columns, ordered=False)
+    except BrokenPipeError:
+        # `mercurial export | head`: stop quietly; point stdout at devnull so the exit flush cannot fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+
+    print(f"Exported {n} records ({fmt}) to {'stdout' if output == '-' else output}", file=sys.stderr)
+    return 0
+
+
+def _add_cache_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--cache", action="store_true", help="Record/reuse raw arXiv responses under data/http_cache")
+    p.add_argument("--replay", action="store_true", help="Serve arXiv responses only from data/http_cache (no network)")
+
+
+def _add_stats_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--stats", action="store_true", help="Print a per-stage timing and counter breakdown at the end")
+    p.add_argument("--stats-json", default=None, metavar="PATH", help="Write the stats breakdown as JSON to PATH")
+    p.add_argument("--cprofile", default=None, metavar="PATH", help="Run under cProfile and dump pstats to PATH")
+
+
+def _add_shard_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument(
+        "--shard",
+        choices=SHARD_STRATEGIES,
+        default=None,
+        help="Split the merged query into shards (per profile, or category x keyword groups) fetched concurrently",
+    )
+    p.add_argument("--workers", type=int, default=4, help="Max concurrent shard fetches (shared arXiv rate limit)")
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(prog="mercurial")
     sub = parser.add_subparsers(dest="cmd", required=True)
@@ -99,24 +771,315 @@ def main() -> int:
         default=None,
         help="Enable a profile under ./profiles (can repeat). Example: --profile llm --profile systems",
     )
+    p_fetch.add_argument(
+        "--sync",
+        action="store_true",
+        help="Only fetch entries newer than the last sync into data/papers.db, then read the window from it",
+    )
+    _add_cache_args(p_fetch)
+    _add_shard_args(p_fetch)
+    _add_stats_args(p_fetch)
 
     sub.add_parser("profiles", help="List available profiles under ./profiles")
 
     p_rank = sub.add_parser("rank-only", help="Fetch then rank papers and print top picks")
     p_rank.add_argument("--profile", action="append", default=None, help="Enable a profile (repeatable)")
     p_rank.add_argument("--top", type=int, default=None, help="Show top N ranked papers")
+    p_rank.add_argument("--sync", action="store_true", help="Incrementally sync the local store and rank from it")
+    _add_cache_args(p_rank)
+    _add_shard_args(p_rank)
+    p_rank.add_argument(
+        "--ranker",
+        choices=("simple", "bm25"),
+        default="simple",
+        help="simple = keyword presence; bm25 = BM25F over the incremental index in data/index.db",
+    )
+    p_rank.add_argument(
+        "--from-store",
+        action="store_true",
+        help="Rank papers already in data/papers.db (e.g. from `import`) instead of fetching",
+    )
+    p_rank.add_argument(
+        "--from-pack",
+        default=None,
+        metavar="PATH",
+        help="Rank a memory-mapped pack snapshot written by `export --format pack` instead of fetching",
+    )
+    p_rank.add_argument("--lookback-hours", type=int, default=None, help="Override LOOKBACK_HOURS for this run")
+    p_rank.add_argument(
+        "--score-cache",
+        action="store_true",
+        help="Reuse keyword hits per (arxiv_id, version, config) from data/scores.db; only new versions are matched",
+    )
+    p_rank.add_argument(
+        "--seed-ids",
+        nargs="+",
+        default=None,
+        metavar="ID",
+        help="Rank by similarity to these papers (hashed TF-IDF + LSH), decayed by recency; ids may be comma-separated",
+    )
+    p_rank.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Collapse near-duplicate abstracts (MinHash + LSH), keeping the best-ranked paper of each cluster",
+    )
+    p_rank.add_argument(
+        "--dedupe-threshold",
+        type=float,
+        default=0.6,
+        help="Estimated Jaccard similarity of abstract 3-grams at which papers count as near-duplicates",
+    )
+    p_rank.add_argument(
+        "--by-profile",
+        action="store_true",
+        help="Rank once against all profiles' keywords and print a separate top N per profile",
+    )
+    p_rank.add_argument(
+        "--no-pipeline",
+        dest="pipeline",
+        action="store_false",
+        help="Fetch everything, then rank (default: overlap download, parsing and scoring)",
+    )
+    p_rank.add_argument(
+        "--page-queue", type=int, default=2, help="Pipeline: max downloaded pages waiting to be parsed"
+    )
+    p_rank.add_argument(
+        "--batch-queue", type=int, default=4, help="Pipeline: max parsed pages waiting to be scored"
+    )
+    _add_stats_args(p_rank)
 
+    p_export = sub.add_parser("export", help="Stream fetched or ranked papers to JSONL/CSV (constant memory)")
+    p_export.add_argument("--profile", action="append", default=None, help="Enable a profile (repeatable)")
+    p_export.add_argument("-o", "--output", default="-", help="Output file ('-' = stdout; a .gz suffix implies --gzip)")
+    p_export.add_argument(
+        "--format",
+        choices=EXPORT_FORMATS + ("pack",),
+        default=None,
+        help="Default: csv for *.csv[.gz], pack for *.pack, else jsonl",
+    )
+    p_export.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    p_export.add_argument(
+        "--fields", default=None, help="Comma-separated columns to write, in order (default: all; see README)"
+    )
+    p_export.add_argument("--exclude", default=None, help="Comma-separated columns to drop, e.g. abstract,authors")
+    p_export.add_argument(
+        "--ranked", action="store_true", help="Rank with the keyword ranker and add score columns"
+    )
+    p_export.add_argument(
+        "--top",
+        type=int,
+        default=None,
+        help="With --ranked: export the top N in rank order (default TOP_PICKS); 0 = every paper, unsorted",
+    )
+    p_export.add_argument(
+        "--from-store", action="store_true", help="Read data/papers.db instead of fetching from arXiv"
+    )
+    p_export.add_argument(
+        "--all", action="store_true", help="With --from-store: the whole store, ignoring lookback and categories"
+    )
+    p_export.add_argument("--lookback-hours", type=int, default=None, help="Override LOOKBACK_HOURS for this run")
+    p_export.add_argument("--sync", action="store_true", help="Sync data/papers.db first and export the window from it")
+    _add_cache_args(p_export)
+    _add_shard_args(p_export)
+    _add_stats_args(p_export)
+
+    p_import = sub.add_parser("import", help="Bulk-load an arXiv metadata snapshot into data/papers.db")
+    p_import.add_argument("paths", nargs="+", help="Snapshot files: JSONL dump or OAI-PMH XML, optionally .gz")
+    p_import.add_argument(
+        "--category",
+        action="append",
+        default=None,
+        help="Keep only papers in this category or archive (e.g. cs.LG, math); repeatable",
+    )
+    p_import.add_argument("--profile", action="append", default=None, help="Also keep the categories of this profile")
+    p_import.add_argument("--format", choices=SNAPSHOT_FORMATS, default=None, help="Default: detect from the file")
+    p_import.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count; 0 = inline)")
+    p_import.add_argument("--batch-size", type=int, default=50_000, help="Papers per write transaction")
+
+    p_watch = sub.add_parser("watch", help="Stay resident, poll arXiv and print papers newly entering the top N")
+    p_watch.add_argument("--profile", action="append", default=None, help="Enable a profile (repeatable)")
+    p_watch.add_argument("--top", type=int, default=None, help="Size of the tracked top N")
+    p_watch.add_argument("--jsonl", default=None, metavar="PATH", help="Append new top-N entries to PATH as JSON lines")
+    p_watch.add_argument(
+        "--interval",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Poll every SECONDS instead of after each arXiv announcement (20:00 US Eastern, Sun-Thu)",
+    )
+    p_watch.add_argument(
+        "--offset-minutes", type=float, default=15.0, help="Delay after an announcement before polling"
+    )
+    p_watch.add_argument("--iterations", type=int, default=0, help="Stop after N polls (0 = run forever)")
+
+    p_query = sub.add_parser(
+        "query", help="Filter stored papers by author, category and date via secondary indexes (no arXiv requests)"
+    )
+    p_query.add_argument(
+        "--author", action="append", default=None, help="Full name or surname; repeatable (any of them matches)"
+    )
+    p_query.add_argument(
+        "--category", action="append", default=None, help="arXiv category; repeatable or comma-separated (any of them)"
+    )
+    p_query.add_argument("--since", default=None, metavar="DATE", help="updated_at >= DATE (ISO)")
+    p_query.add_argument("--until", default=None, metavar="DATE", help="updated_at < DATE (ISO)")
+    p_query.add_argument("--days", type=float, default=None, help="Shortcut for --since N days ago")
+    p_query.add_argument(
+        "--rank", action="store_true", help="Rank the matches with the keyword ranker (profiles from --profile)"
+    )
+    p_query.add_argument("--profile", action="append", default=None, help="Profiles whose keywords --rank uses")
+    p_query.add_argument("--limit", type=int, default=50, help="Show at most N papers (newest first, or top N)")
+    p_query.add_argument("--rebuild-index", action="store_true", help="Rebuild data/facets.npz even if current")
+    _add_stats_args(p_query)
+
+    p_rerank = sub.add_parser(
+        "rerank", help="Re-rank saved per-paper features under new weights (no fetching or matching)"
+    )
+    p_rerank.add_argument("--profile", action="append", default=None, help="Enable a profile (repeatable)")
+    p_rerank.add_argument("--top", type=int, default=None, help="Show top N ranked papers")
+    p_rerank.add_argument(
+        "--title-weight", action="append", default=None, metavar="W[,W...]", help="KW_TITLE_WEIGHT value(s) to try"
+    )
+    p_rerank.add_argument(
+        "--abstract-weight", action="append", default=None, metavar="W[,W...]", help="KW_ABSTRACT_WEIGHT value(s)"
+    )
+    p_rerank.add_argument(
+        "--half-life", action="append", default=None, metavar="H[,H...]", help="RECENCY_HALF_LIFE_HOURS value(s)"
+    )
+    p_rerank.add_argument(
+        "--category-bonus", action="append", default=None, metavar="B[,B...]", help="CATEGORY_BONUS value(s)"
+    )
+    p_rerank.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Fetch the window again and rebuild data/features/<profiles>.npz (default: reuse it)",
+    )
+    p_rerank.add_argument("--from-store", action="store_true", help="Build features from data/papers.db")
+    p_rerank.add_argument("--lookback-hours", type=int, default=None, help="Override LOOKBACK_HOURS when building")
+    p_rerank.add_argument("--sync", action="store_true", help="Build from an incremental sync of the local store")
+    p_rerank.add_argument("--jsonl", default=None, metavar="PATH", help="Write each config's top N to PATH")
+    _add_cache_args(p_rerank)
+    _add_stats_args(p_rerank)
+
+    p_serve = sub.add_parser("serve", help="Serve precomputed ranked feeds over a local HTTP API")
+    p_serve.add_argument("--profile", action="append", default=None, help="Serve a profile (repeatable; default: all)")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8700)
+    p_serve.add_argument(
+        "--interval", type=float, default=900.0, metavar="SECONDS", help="Refresh from arXiv every SECONDS"
+    )
+    p_serve.add_argument("--top", type=int, default=None, help="Default feed length when a request gives no top")
 
     args = parser.parse_args()
 
+    want_stats = getattr(args, "stats", False) or getattr(args, "stats_json", None)
+    if want_stats:
+        instrument.enable()
+
+    with instrument.profiled(getattr(args, "cprofile", None)):
+        rc = _dispatch(args)
+
+    if want_stats:
+        snap = instrument.snapshot()
+        if args.stats:
+            print(instrument.format_report(snap))
+        if args.stats_json:
+            instrument.write_json(args.stats_json, snap)
+    return rc
+
+
+def _split_csv(value: str | None) -> list[str] | None:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+
+def _dispatch(args: argparse.Namespace) -> int:
     if args.cmd == "fetch-only":
-        return cmd_fetch_only(args.profile)
+        return cmd_fetch_only(args.profile, args.sync, args.cache, args.replay, args.shard, args.workers)
 
     if args.cmd == "profiles":
         return cmd_list_profiles()
     
     if args.cmd == "rank-only":
-        return cmd_rank_only(args.profile, args.top)
+        return cmd_rank_only(
+            args.profile,
+            args.top,
+            args.sync,
+            args.cache,
+            args.replay,
+            args.shard,
+            args.workers,
+            args.ranker,
+            args.by_profile,
+            args.from_store,
+            args.lookback_hours,
+            args.score_cache,
+            args.seed_ids,
+            args.pipeline,
+            args.page_queue,
+            args.batch_queue,
+            args.dedupe,
+            args.dedupe_threshold,
+            args.from_pack,
+        )
+
+    if args.cmd == "export":
+        return cmd_export(
+            args.profile,
+            args.output,
+            args.format,
+            _split_csv(args.fields),
+            _split_csv(args.exclude),
+            args.gzip,
+            args.ranked,
+            args.top,
+            args.from_store,
+            args.all,
+            args.lookback_hours,
+            args.sync,
+            args.cache,
+            args.replay,
+            args.shard,
+            args.workers,
+        )
+
+    if args.cmd == "import":
+        return cmd_import(args.paths, args.profile, args.category, args.format, args.workers, args.batch_size)
+
+    if args.cmd == "watch":
+        return cmd_watch(args.profile, args.top, args.jsonl, args.interval, args.offset_minutes, args.iterations)
+
+    if args.cmd == "query":
+        return cmd_query(
+            args.author,
+            args.category,
+            args.since,
+            args.until,
+            args.days,
+            args.profile,
+            args.rank,
+            args.limit,
+            args.rebuild_index,
+        )
+
+    if args.cmd == "rerank":
+        return cmd_rerank(
+            args.profile,
+            args.top,
+            args.title_weight,
+            args.abstract_weight,
+            args.half_life,
+            args.category_bonus,
+            args.rebuild,
+            args.from_store,
+            args.lookback_hours,
+            args.sync,
+            args.cache,
+            args.replay,
+            args.jsonl,
+        )
+
+    if args.cmd == "serve":
+        return cmd_serve(args.profile, args.host, args.port, args.interval, args.top)
 
     raise RuntimeError("Unknown command")
 
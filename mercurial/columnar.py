@@ -0,0 +1,189 @@
+# mercurial/columnar.py
+from __future__ import annotations
+
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+from .types import Paper
+
+
+class _StringTable:
+    """Interns repeated strings (category codes, author names) as small ints."""
+
+    def __init__(self) -> None:
+        self.strings: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def code(self, s: str) -> int:
+        c = self.codes.get(s)
+        if c is None:
+            c = len(self.strings)
+            self.codes[s] = c
+            self.strings.append(s)
+        return c
+
+
+class PaperBatchBuilder:
+    """Accumulates papers column by column; call build() for an immutable PaperBatch."""
+
+    def __init__(self) -> None:
+        self.arxiv_ids: List[str] = []
+        self.versions = array("i")
+        self.titles: List[str] = []
+        self.abstracts: List[str] = []
+        self.published: List[datetime] = []
+        self.updated: List[datetime] = []
+        self.categories = _StringTable()
+        self.cat_codes = array("i")
+        self.cat_offsets = array("q", [0])
+        self.authors = _StringTable()
+        self.author_codes = array("i")
+        self.author_offsets = array("q", [0])
+
+    def __len__(self) -> int:
+        return len(self.arxiv_ids)
+
+    def append(
+        self,
+        arxiv_id: str,
+        version: int,
+        title: str,
+        authors: Iterable[str],
+        abstract: str,
+        categories: Iterable[str],
+        published_at: datetime,
+        updated_at: datetime,
+    ) -> None:
+        self.arxiv_ids.append(arxiv_id)
+        self.versions.append(version)
+        self.titles.append(title)
+        self.abstracts.append(abstract)
+        self.published.append(published_at)
+        self.updated.append(updated_at)
+
+        self.cat_codes.extend(self.categories.code(c) for c in categories)
+        self.cat_offsets.append(len(self.cat_codes))
+        self.author_codes.extend(self.authors.code(a) for a in authors)
+        self.author_offsets.append(len(self.author_codes))
+
+    def append_paper(self, p: Paper) -> None:
+        self.append(
+            p.arxiv_id, p.version, p.title, p.authors, p.abstract, p.categories, p.published_at, p.updated_at
+        )
+
+    def build(self) -> "PaperBatch":
+        return PaperBatch(
+            arxiv_ids=self.arxiv_ids,
+            versions=np.frombuffer(self.versions, dtype=np.int32).copy(),
+            titles=self.titles,
+            abstracts=self.abstracts,
+            published=np.array(self.published, dtype="datetime64[s]"),
+            updated=np.array(self.updated, dtype="datetime64[s]"),
+            category_table=self.categories.strings,
+            cat_codes=np.frombuffer(self.cat_codes, dtype=np.int32).copy(),
+            cat_offsets=np.frombuffer(self.cat_offsets, dtype=np.int64).copy(),
+            author_table=self.authors.strings,
+            author_codes=np.frombuffer(self.author_codes, dtype=np.int32).copy(),
+            author_offsets=np.frombuffer(self.author_offsets, dtype=np.int64).copy(),
+        )
+
+
+class PaperBatch(Sequence[Paper]):
+    """
+    Columnar, read-only collection of papers.
+
+    Versions and timestamps are parallel NumPy arrays; categories and authors
+    are interned into shared string tables and stored as code ranges
+    (CSR-style offsets); URLs are derived from arxiv_id. Indexing returns a
+    Paper built on demand, so a batch of millions of papers only pays for
+    Python objects that are actually looked at.
+    """
+
+    __slots__ = (
+        "arxiv_ids", "versions", "titles", "abstracts", "published", "updated",
+        "category_table", "cat_codes", "cat_offsets",
+        "author_table", "author_codes", "author_offsets",
+    )
+
+    def __init__(
+        self,
+        arxiv_ids: List[str],
+        versions: np.ndarray,
+        titles: List[str],
+        abstracts: List[str],
+        published: np.ndarray,
+        updated: np.ndarray,
+        category_table: List[str],
+        cat_codes: np.ndarray,
+        cat_offsets: np.ndarray,
+        author_table: List[str],
+        author_codes: np.ndarray,
+        author_offsets: np.ndarray,
+    ):
+        self.arxiv_ids = arxiv_ids
+        self.versions = versions
+        self.titles = titles
+        self.abstracts = abstracts
+        self.published = published
+        self.updated = updated
+        self.category_table = category_table
+        self.cat_codes = cat_codes
+        self.cat_offsets = cat_offsets
+        self.author_table = author_table
+        self.author_codes = author_codes
+        self.author_offsets = author_offsets
+
+    @classmethod
+    def from_papers(cls, papers: Iterable[Paper]) -> "PaperBatch":
+        b = PaperBatchBuilder()
+        for p in papers:
+            b.append_paper(p)
+        return b.build()
+
+    def __len__(self) -> int:
+        return len(self.arxiv_ids)
+
+    def categories_of(self, i: int) -> List[str]:
+        lo, hi = self.cat_offsets[i], self.cat_offsets[i + 1]
+        return [self.category_table[c] for c in self.cat_codes[lo:hi]]
+
+    def authors_of(self, i: int) -> List[str]:
+        lo, hi = self.author_offsets[i], self.author_offsets[i + 1]
+        return [self.author_table[c] for c in self.author_codes[lo:hi]]
+
+    def paper(self, i: int) -> Paper:
+        return Paper(
+            arxiv_id=self.arxiv_ids[i],
+            version=int(self.versions[i]),
+            title=self.titles[i],
+            authors=self.authors_of(i),
+            abstract=self.abstracts[i],
+            categories=self.categories_of(i),
+            published_at=self.published[i].item(),
+            updated_at=self.updated[i].item(),
+        )
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self.paper(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.paper(i)
+
+    def __iter__(self) -> Iterator[Paper]:
+        for i in range(len(self)):
+            yield self.paper(i)
+
+    def has_any_category(self, categories: Iterable[str]) -> np.ndarray:
+        """Boolean mask: paper i is cross-listed in at least one of `categories`."""
+        wanted = [self.category_table.index(c) for c in set(categories) if c in self.category_table]
+        if not wanted or len(self.cat_codes) == 0:
+            return np.zeros(len(self), dtype=bool)
+        hit = np.isin(self.cat_codes, np.asarray(wanted, dtype=np.int32))
+        csum = np.concatenate(([0], np.cumsum(hit, dtype=np.int64)))
+        return (csum[self.cat_offsets[1:]] - csum[self.cat_offsets[:-1]]) > 0
@@ -2,12 +2,18 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from pathlib import Path
 from typing import List, Optional, Sequence
 
-from dotenv import load_dotenv
-
+from . import instrument
 from .profiles import list_profiles, load_profile
+from .settings_cache import apply_env
+
+
+def data_dir() -> Path:
+    # project_root/data (git-ignored; caches, stores and debug dumps live here)
+    return Path(__file__).resolve().parents[1] / "data"
 
 
 def _split_csv(s: str) -> List[str]:
@@ -36,6 +42,14 @@ class Settings:
     kw_abstract_weight: float
     recency_half_life_hours: float
     category_bonus: float
+    kw_word_boundary: bool = False
+    http_cache_ttl_seconds: float = 3600.0
+    http_cache_max_mb: float = 256.0
+    arxiv_delay_seconds: float = 3.0
+    arxiv_api_url: str = "https://export.arxiv.org/api/query"
+    # legacy .env ARXIV_CATEGORIES/KEYWORDS before merging profiles (used by query sharding)
+    base_categories: List[str] = field(default_factory=list)
+    base_keywords: List[str] = field(default_factory=list)
 
 
 def load_settings(selected_profiles: Optional[List[str]] = None) -> Settings:
@@ -49,7 +63,12 @@ def load_settings(selected_profiles: Optional[List[str]] = None) -> Settings:
       - lookback_hours/max_fetch: .env default, can be overridden by profile if profile defines it
         (if multiple profiles define it, we take the max to be safe)
     """
-    load_dotenv()
+    with instrument.span("config.load_settings"):
+        return _load_settings(selected_profiles)
+
+
+def _load_settings(selected_profiles: Optional[List[str]] = None) -> Settings:
+    apply_env()  # .env values (mtime-cached parse), without overriding the real environment
 
     base_categories = _split_csv(os.getenv("ARXIV_CATEGORIES", ""))
     base_keywords = _split_csv(os.getenv("KEYWORDS", ""))
@@ -66,6 +85,12 @@ def load_settings(selected_profiles: Optional[List[str]] = None) -> Settings:
     kw_abstract_weight = float(os.getenv("KW_ABSTRACT_WEIGHT", "1.0"))
     recency_half_life_hours = float(os.getenv("RECENCY_HALF_LIFE_HOURS", "48"))
     category_bonus = float(os.getenv("CATEGORY_BONUS", "0.2"))
+    kw_word_boundary = os.getenv("KW_WORD_BOUNDARY", "0").strip().lower() in ("1", "true", "yes", "on")
+
+    http_cache_ttl_seconds = float(os.getenv("HTTP_CACHE_TTL_SECONDS", "3600"))
+    http_cache_max_mb = float(os.getenv("HTTP_CACHE_MAX_MB", "256"))
+    arxiv_delay_seconds = float(os.getenv("ARXIV_DELAY_SECONDS", "3"))
+    arxiv_api_url = os.getenv("ARXIV_API_URL", "https://export.arxiv.org/api/query")
 
     # Merge profiles
     all_categories: List[str] = list(base_categories)
@@ -81,6 +106,7 @@ def load_settings(selected_profiles: Optional[List[str]] = None) -> Settings:
                 raise ValueError(f"Unknown profile: {name}. Available: {sorted(available)}")
 
             p = load_profile(name)
+            instrument.count("config.profiles_loaded")
             all_categories.extend(p.arxiv_categories)
             all_keywords.extend(p.keywords)
 
@@ -106,4 +132,11 @@ def load_settings(selected_profiles: Optional[List[str]] = None) -> Settings:
         kw_abstract_weight=kw_abstract_weight,
         recency_half_life_hours=recency_half_life_hours,
         category_bonus=category_bonus,
+        kw_word_boundary=kw_word_boundary,
+        http_cache_ttl_seconds=http_cache_ttl_seconds,
+        http_cache_max_mb=http_cache_max_mb,
+        arxiv_delay_seconds=arxiv_delay_seconds,
+        arxiv_api_url=arxiv_api_url,
+        base_categories=base_categories,
+        base_keywords=base_keywords,
     )
@@ -0,0 +1,155 @@
+# mercurial/export.py
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .types import Paper, RankedPaper
+
+
+# Streaming export of papers / ranked papers to JSONL or CSV. Records are
+# written one at a time as the input iterator produces them, so memory stays
+# flat however large the export is.
+EXPORT_FORMATS = ("jsonl", "csv")
+
+PAPER_FIELDS = (
+    "arxiv_id", "version", "title", "authors", "abstract", "categories",
+    "published_at", "updated_at", "abs_url", "pdf_url",
+)
+RANK_FIELDS = ("rank", "score", "kw_score", "recency", "cat_bonus", "hours_ago", "matched_keywords")
+ALL_FIELDS = RANK_FIELDS + PAPER_FIELDS
+
+# CSV has no lists; list fields are joined with this
+CSV_LIST_SEP = "; "
+
+
+def resolve_fields(
+    fields: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    ranked: bool = True,
+) -> List[str]:
+    """Output columns: `fields` (in that order) or every field, minus `exclude`."""
+    available = ALL_FIELDS if ranked else PAPER_FIELDS
+    chosen = list(fields) if fields else list(available)
+    unknown = [f for f in list(chosen) + list(exclude or ()) if f not in ALL_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown export field(s): {', '.join(unknown)}. Available: {', '.join(ALL_FIELDS)}")
+    if not ranked:
+        rank_only = [f for f in chosen if f in RANK_FIELDS]
+        if rank_only:
+            raise ValueError(f"Field(s) {', '.join(rank_only)} need a ranked export")
+    drop = set(exclude or ())
+    return [f for f in chosen if f not in drop]
+
+
+def _paper_value(p: Paper, field: str):
+    if field in ("published_at", "updated_at"):
+        return getattr(p, field).isoformat()
+    return getattr(p, field)
+
+
+def paper_record(p: Paper, fields: Sequence[str]) -> Dict[str, object]:
+    return {f: _paper_value(p, f) for f in fields}
+
+
+def ranked_record(rank: Optional[int], rp: RankedPaper, fields: Sequence[str]) -> Dict[str, object]:
+    out: Dict[str, object] = {}
+    b = rp.score_breakdown
+    for f in fields:
+        if f == "rank":
+            out[f] = rank
+        elif f == "score":
+            out[f] = rp.score
+        elif f == "matched_keywords":
+            out[f] = rp.matched_keywords
+        elif f in RANK_FIELDS:
+            out[f] = b.get(f)
+        else:
+            out[f] = _paper_value(rp.paper, f)
+    return out
+
+
+@contextmanager
+def open_sink(path: str | Path | None, compress: bool = False) -> Iterator[IO[str]]:
+    """Text sink for `path` ("-" or None = stdout); gzip when `compress` or the path ends in .gz."""
+    to_stdout = path is None or str(path) == "-"
+    compress = compress or (not to_stdout and str(path).endswith(".gz"))
+    if to_stdout:
+        if not compress:
+            yield sys.stdout
+            return
+        with gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb") as gz:
+            with io.TextIOWrapper(gz, encoding="utf-8", newline="") as f:
+                yield f
+        return
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if compress:
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+            yield f
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            yield f
+
+
+class RecordWriter:
+    """Writes dict records with a fixed column list as JSON lines or CSV rows."""
+
+    def __init__(self, sink: IO[str], fmt: str, fields: Sequence[str]):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}. Available: {EXPORT_FORMATS}")
+        self.sink = sink
+        self.fmt = fmt
+        self.fields = list(fields)
+        self.written = 0
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.writer(sink)
+            self._csv.writerow(self.fields)
+
+    def write(self, record: Dict[str, object]) -> None:
+        if self._csv is not None:
+            self._csv.writerow(
+                CSV_LIST_SEP.join(v) if isinstance(v, list) else ("" if v is None else v)
+                for v in (record[f] for f in self.fields)
+            )
+        else:
+            self.sink.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.written += 1
+
+
+def export_papers(
+    papers: Iterable[Paper],
+    sink: IO[str],
+    fmt: str = "jsonl",
+    fields: Optional[Sequence[str]] = None,
+) -> int:
+    """Write each paper as it arrives. Returns the number written."""
+    w = RecordWriter(sink, fmt, fields or PAPER_FIELDS)
+    for p in papers:
+        w.write(paper_record(p, w.fields))
+    return w.written
+
+
+def export_ranked(
+    ranked: Iterable[RankedPaper],
+    sink: IO[str],
+    fmt: str = "jsonl",
+    fields: Optional[Sequence[str]] = None,
+    ordered: bool = True,
+) -> int:
+    """
+    Write ranked papers as they arrive. `rank` is the 1-based position when
+    `ordered`; for unordered streams (see batch_ranker.score_stream) it is left empty.
+    """
+    w = RecordWriter(sink, fmt, fields or ALL_FIELDS)
+    for i, rp in enumerate(ranked, 1):
+        w.write(ranked_record(i if ordered else None, rp, w.fields))
+    return w.written
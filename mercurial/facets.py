@@ -0,0 +1,280 @@
+# mercurial/facets.py
+from __future__ import annotations
+
+import json
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import instrument
+from .config import data_dir
+
+
+# Secondary indexes over the latest version of every stored paper, so
+# "these authors, in these categories, updated in this range" is answered by
+# intersecting indexes instead of scanning author/category lists:
+#
+#   authors     CSR posting lists (author code -> sorted row ids), found by
+#               binary search over sorted normalized names and surnames
+#   categories  one packed bitset over all rows per category
+#   updated_at  row ids sorted by updated_at, so a date range is two
+#               binary searches and a slice
+#
+# Rows hold only ids, versions, authors, categories and timestamps; full
+# papers are read from data/papers.db for the rows that survive the filters.
+# The index is saved to data/facets.npz and rebuilt when the store changes.
+FACETS_VERSION = 1
+
+
+def default_facets_path() -> Path:
+    return data_dir() / "facets.npz"
+
+
+def normalize_name(name: str) -> str:
+    """Casefolded, accent-stripped, single-spaced author name."""
+    s = unicodedata.normalize("NFKD", name)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return " ".join(s.replace(".", ". ").casefold().split())
+
+
+def _surname(key: str) -> str:
+    return key.rsplit(" ", 1)[-1]
+
+
+def _bitset(rows: np.ndarray, n: int) -> np.ndarray:
+    mask = np.zeros(n, dtype=bool)
+    mask[rows] = True
+    return np.packbits(mask)
+
+
+@dataclass(frozen=True)
+class FacetQuery:
+    authors: List[str] = field(default_factory=list)      # any of (full name or surname)
+    categories: List[str] = field(default_factory=list)   # any of
+    since: Optional[datetime] = None                      # updated_at >= since
+    until: Optional[datetime] = None                      # updated_at < until
+
+
+class FacetIndex:
+    def __init__(
+        self,
+        store_key: str,
+        arxiv_ids: np.ndarray,
+        versions: np.ndarray,
+        author_table: np.ndarray,
+        post_rows: np.ndarray,
+        post_offsets: np.ndarray,
+        name_keys: np.ndarray,
+        name_codes: np.ndarray,
+        surname_keys: np.ndarray,
+        surname_codes: np.ndarray,
+        category_table: np.ndarray,
+        category_bits: np.ndarray,
+        by_updated: np.ndarray,
+        updated_sorted: np.ndarray,
+    ):
+        self.store_key = store_key
+        self.arxiv_ids = arxiv_ids
+        self.versions = versions
+        self.author_table = author_table
+        self.post_rows = post_rows
+        self.post_offsets = post_offsets
+        self.name_keys = name_keys
+        self.name_codes = name_codes
+        self.surname_keys = surname_keys
+        self.surname_codes = surname_codes
+        self.category_table = category_table
+        self.category_bits = category_bits
+        self.by_updated = by_updated
+        self.updated_sorted = updated_sorted
+
+    _ARRAYS = (
+        "arxiv_ids", "versions", "author_table", "post_rows", "post_offsets", "name_keys", "name_codes",
+        "surname_keys", "surname_codes", "category_table", "category_bits", "by_updated", "updated_sorted",
+    )
+
+    def __len__(self) -> int:
+        return len(self.arxiv_ids)
+
+    # ---- build / persist ----
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[str, int, str, str, str]], store_key: str = "") -> "FacetIndex":
+        """rows: (arxiv_id, version, authors JSON, categories JSON, updated_at ISO), one per paper."""
+        ids: List[str] = []
+        versions: List[int] = []
+        updated: List[str] = []
+        authors: dict = {}
+        author_codes: List[int] = []
+        author_counts: List[int] = []
+        categories: dict = {}
+        cat_rows: List[List[int]] = []
+
+        for i, (arxiv_id, version, authors_json, categories_json, updated_at, *_) in enumerate(rows):
+            ids.append(arxiv_id)
+            versions.append(int(version))
+            updated.append(updated_at)
+            names = json.loads(authors_json)
+            author_counts.append(len(names))
+            for a in names:
+                c = authors.get(a)
+                if c is None:
+                    c = authors[a] = len(authors)
+                author_codes.append(c)
+            for cat in json.loads(categories_json):
+                c = categories.get(cat)
+                if c is None:
+                    c = categories[cat] = len(categories)
+                    cat_rows.append([])
+                cat_rows[c].append(i)
+
+        n = len(ids)
+        # author -> rows, by transposing the row -> author codes CSR
+        codes = np.asarray(author_codes, dtype=np.int32)
+        row_of = np.repeat(np.arange(n, dtype=np.int32), np.asarray(author_counts, dtype=np.int64))
+        order = np.argsort(codes, kind="stable")
+        post_rows = row_of[order]
+        post_offsets = np.zeros(len(authors) + 1, dtype=np.int64)
+        post_offsets[1:] = np.cumsum(np.bincount(codes, minlength=len(authors)))
+
+        author_table = np.array(list(authors), dtype=str) if authors else np.empty(0, dtype=str)
+        keys = np.array([normalize_name(a) for a in author_table], dtype=str) if authors else author_table
+        key_order = np.argsort(keys, kind="stable")
+        surnames = np.array([_surname(k) for k in keys], dtype=str) if authors else keys
+        surname_order = np.argsort(surnames, kind="stable")
+
+        category_table = np.array(list(categories), dtype=str) if categories else np.empty(0, dtype=str)
+        nbytes = (n + 7) // 8
+        category_bits = np.zeros((len(categories), nbytes), dtype=np.uint8)
+        for c, crow in enumerate(cat_rows):
+            category_bits[c] = _bitset(np.asarray(crow, dtype=np.int64), n)
+
+        upd = np.array(updated, dtype="datetime64[s]") if n else np.empty(0, dtype="datetime64[s]")
+        by_updated = np.argsort(upd, kind="stable").astype(np.int32)
+
+        return cls(
+            store_key=store_key,
+            arxiv_ids=np.array(ids, dtype=str) if n else np.empty(0, dtype=str),
+            versions=np.asarray(versions, dtype=np.int32),
+            author_table=author_table,
+            post_rows=post_rows,
+            post_offsets=post_offsets,
+            name_keys=keys[key_order],
+            name_codes=key_order.astype(np.int32),
+            surname_keys=surnames[surname_order],
+            surname_codes=surname_order.astype(np.int32),
+            category_table=category_table,
+            category_bits=category_bits,
+            by_updated=by_updated,
+            updated_sorted=upd[by_updated],
+        )
+
+    def save(self, path: Path | str | None = None) -> Path:
+        path = Path(path) if path is not None else default_facets_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        arrays = {name: getattr(self, name) for name in self._ARRAYS}
+        arrays["updated_sorted"] = self.updated_sorted.astype(np.int64)
+        np.savez(tmp, meta=np.array([str(FACETS_VERSION), self.store_key]), **arrays)
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path | str | None = None) -> Optional["FacetIndex"]:
+        path = Path(path) if path is not None else default_facets_path()
+        if not path.exists():
+            return None
+        with np.load(path, allow_pickle=False) as z:
+            version, store_key = (str(x) for x in z["meta"])
+            if version != str(FACETS_VERSION):
+                return None
+            arrays = {name: z[name] for name in cls._ARRAYS}
+        arrays["updated_sorted"] = arrays["updated_sorted"].astype("datetime64[s]")
+        return cls(store_key=store_key, **arrays)
+
+    # ---- lookups ----
+
+    def _codes_for(self, keys: np.ndarray, codes: np.ndarray, key: str) -> np.ndarray:
+        lo = np.searchsorted(keys, key, side="left")
+        hi = np.searchsorted(keys, key, side="right")
+        return codes[lo:hi]
+
+    def author_codes(self, name: str) -> np.ndarray:
+        """Codes of authors matching `name`: by full normalized name, or by surname if it is one word."""
+        key = normalize_name(name)
+        if " " not in key:
+            return self._codes_for(self.surname_keys, self.surname_codes, key)
+        return self._codes_for(self.name_keys, self.name_codes, key)
+
+    def author_rows(self, names: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+        """(sorted rows by any of `names`, names that matched no author)."""
+        parts: List[np.ndarray] = []
+        unknown: List[str] = []
+        for name in names:
+            codes = self.author_codes(name)
+            if not len(codes):
+                unknown.append(name)
+            for c in codes:
+                parts.append(self.post_rows[self.post_offsets[c]:self.post_offsets[c + 1]])
+        rows = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int32)
+        return rows, unknown
+
+    def category_bitset(self, categories: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+        """(bitset of rows cross-listed in any of `categories`, categories not in the index)."""
+        pos = {c: i for i, c in enumerate(self.category_table)}
+        bits = np.zeros((len(self) + 7) // 8, dtype=np.uint8)
+        unknown = [c for c in categories if c not in pos]
+        for c in categories:
+            if c in pos:
+                bits |= self.category_bits[pos[c]]
+        return bits, unknown
+
+    def updated_rows(self, since: Optional[datetime], until: Optional[datetime]) -> np.ndarray:
+        """Rows with since <= updated_at < until, oldest first."""
+        lo = 0 if since is None else np.searchsorted(self.updated_sorted, np.datetime64(since, "s"), side="left")
+        hi = len(self) if until is None else np.searchsorted(self.updated_sorted, np.datetime64(until, "s"), side="left")
+        return self.by_updated[lo:hi]
+
+    def select(self, q: FacetQuery) -> Tuple[np.ndarray, List[str]]:
+        """
+        Rows matching every given facet, newest first, plus any authors or
+        categories that matched nothing. Posting lists and the date range are
+        turned into bitsets and ANDed with the category bitset.
+        """
+        n = len(self)
+        bits: Optional[np.ndarray] = None
+        unknown: List[str] = []
+        with instrument.span("query.intersect"):
+            if q.categories:
+                bits, missing = self.category_bitset(q.categories)
+                unknown += missing
+            if q.since is not None or q.until is not None:
+                b = _bitset(self.updated_rows(q.since, q.until), n)
+                bits = b if bits is None else bits & b
+            if q.authors:
+                rows, missing = self.author_rows(q.authors)
+                unknown += missing
+                b = _bitset(rows, n)
+                bits = b if bits is None else bits & b
+            rows = np.arange(n) if bits is None else np.nonzero(np.unpackbits(bits, count=n))[0]
+        # newest first, via the position of each row in the updated_at order
+        rank = np.empty(n, dtype=np.int64)
+        rank[self.by_updated] = np.arange(n)
+        instrument.count("query.rows_selected", len(rows))
+        return rows[np.argsort(-rank[rows], kind="stable")], unknown
+
+
+def load_or_build(store, path: Path | str | None = None) -> Tuple[FacetIndex, bool]:
+    """(index for `store`, whether it had to be rebuilt). Rebuilt whenever the store's contents changed."""
+    key = store.state_key()
+    idx = FacetIndex.load(path)
+    if idx is not None and idx.store_key == key:
+        return idx, False
+    with instrument.span("query.build_index"):
+        idx = FacetIndex.build(store.facet_rows(), store_key=key)
+    idx.save(path)
+    return idx, True
@@ -0,0 +1,176 @@
+# mercurial/instrument.py
+from __future__ import annotations
+
+import io
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Process-wide named spans (calls + seconds) and counters, off by default.
+# When disabled, span() hands back one shared no-op context manager and
+# count()/record() return after a single global check, so call sites can stay
+# in hot paths. Call sites should still count per page/batch, not per item.
+
+_enabled = False
+_lock = threading.Lock()
+_spans: Dict[str, List[float]] = {}
+_counters: Dict[str, float] = {}
+_started = 0.0
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    global _started
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _started = time.perf_counter()
+
+
+def enable() -> None:
+    global _enabled
+    reset()
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def record(name: str, seconds: float, calls: int = 1) -> None:
+    """Add time to a span measured elsewhere (e.g. a rate-limit wait)."""
+    if not _enabled:
+        return
+    with _lock:
+        s = _spans.get(name)
+        if s is None:
+            _spans[name] = [calls, seconds]
+        else:
+            s[0] += calls
+            s[1] += seconds
+
+
+def count(name: str, n: float = 1) -> None:
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        record(self.name, time.perf_counter() - self.t0)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str):
+    """Time a block under `name`: `with span("arxiv.http"): ...`."""
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def timed_iter(name: str, it: Iterable[T]) -> Iterator[T]:
+    """
+    Charge the time spent producing each item of `it` (not the consumer's time
+    between items) to span `name`. Returns `it` untouched when disabled.
+    """
+    if not _enabled:
+        return iter(it)
+    return _timed(name, iter(it))
+
+
+def _timed(name: str, it: Iterator[T]) -> Iterator[T]:
+    spent = 0.0
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                spent += time.perf_counter() - t0
+                return
+            spent += time.perf_counter() - t0
+            yield item
+    finally:
+        record(name, spent)
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "wall_seconds": time.perf_counter() - _started,
+            "spans": {k: {"calls": int(v[0]), "seconds": v[1]} for k, v in sorted(_spans.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def format_report(snap: Optional[dict] = None) -> str:
+    snap = snap or snapshot()
+    wall = snap["wall_seconds"] or 1e-9
+    lines = [f"Stats (wall {snap['wall_seconds']:.3f}s; concurrent spans may add up to more)"]
+    spans = sorted(snap["spans"].items(), key=lambda kv: kv[1]["seconds"], reverse=True)
+    for name, s in spans:
+        lines.append(f"  {name:<28} {s['seconds']:9.3f}s {100 * s['seconds'] / wall:6.1f}%  x{s['calls']}")
+    for name, v in snap["counters"].items():
+        value = f"{v:,.0f}" if float(v).is_integer() else f"{v:,.3f}"
+        lines.append(f"  {name:<28} {value:>10}")
+    return "\n".join(lines)
+
+
+def write_json(path: str | Path, snap: Optional[dict] = None) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(snap or snapshot(), indent=2), encoding="utf-8")
+
+
+@contextmanager
+def profiled(path: str | Path | None, top: int = 25):
+    """cProfile the block and dump pstats to `path` (no-op if path is None); prints the top entries."""
+    if path is None:
+        yield
+        return
+    import cProfile
+    import pstats
+
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        prof.dump_stats(str(path))
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(top)
+        print(out.getvalue())
+        print(f"cProfile stats written to {path} (inspect with: python -m pstats {path})")
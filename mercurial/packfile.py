@@ -0,0 +1,321 @@
+# mercurial/packfile.py
+from __future__ import annotations
+
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from . import instrument
+from .types import Paper
+
+if TYPE_CHECKING:
+    from .ranker.matcher import KeywordMatcher
+
+
+# Binary, memory-mapped snapshot of a Paper collection ("pack" file):
+#
+#   header     magic, format version, paper count, column count, directory offset
+#   columns    8-byte aligned; fixed-width arrays (arxiv_id as S<w>, version,
+#              published/updated as int64 epoch seconds, category codes) and
+#              UTF-8 string arenas (titles, abstracts, authors) addressed by
+#              uint64 offset arrays of length n + 1
+#   directory  (name, dtype, offset, nbytes) per column
+#
+# Opening a pack maps the file and wraps every column in a zero-copy NumPy
+# view; nothing is parsed up front. A Paper is only decoded when indexed, and
+# the keyword ranker scans the arenas in place: texts that are pure ASCII and
+# contain no keyword (a bytes-regex prefilter) are never decoded at all.
+PACK_MAGIC = b"MRCPACK\x00"
+PACK_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIQQ")          # magic, version, n_columns, n_papers, directory offset
+_ENTRY = struct.Struct("<16s8sQQ")          # name, dtype, offset, nbytes
+_SEP = "\x1f"                               # joins authors / category names inside one arena entry
+_EPOCH = datetime(1970, 1, 1)
+_TEXT_FIELDS = ("title", "abstract")
+_SCAN_ROWS = 4096                           # texts lowercased and scanned per prefilter pass
+_PREFILTER_GIVE_UP = 0.5                    # stop prefiltering once this share of texts are candidates
+
+
+def _epoch_seconds(dt: datetime) -> int:
+    return int((dt - _EPOCH).total_seconds())
+
+
+class _Arena:
+    """UTF-8 strings appended to a temp file, with offsets and a per-entry ASCII flag."""
+
+    def __init__(self, directory: Path):
+        self.f: IO[bytes] = tempfile.TemporaryFile(dir=directory)
+        self.offsets = array("Q", [0])
+        self.ascii = array("B")
+
+    def append(self, s: str) -> None:
+        b = s.encode("utf-8")
+        self.f.write(b)
+        self.offsets.append(self.offsets[-1] + len(b))
+        self.ascii.append(len(b) == len(s))
+
+
+def write_pack(papers: Iterable[Paper], path: str | Path) -> int:
+    """
+    Stream `papers` into a pack file at `path` (written to a temp file, then
+    renamed). Text goes to temporary arena files as it arrives, so memory holds
+    only the fixed-width columns. Returns the number of papers written.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arenas = {name: _Arena(path.parent) for name in ("title", "abstract", "authors")}
+    ids: List[bytes] = []
+    versions = array("i")
+    published = array("q")
+    updated = array("q")
+    cat_table: Dict[str, int] = {}
+    cat_codes = array("i")
+    cat_offsets = array("Q", [0])
+
+    try:
+        for p in papers:
+            ids.append(p.arxiv_id.encode("ascii"))
+            versions.append(p.version)
+            published.append(_epoch_seconds(p.published_at))
+            updated.append(_epoch_seconds(p.updated_at))
+            arenas["title"].append(p.title)
+            arenas["abstract"].append(p.abstract)
+            arenas["authors"].append(_SEP.join(p.authors))
+            cat_codes.extend(cat_table.setdefault(c, len(cat_table)) for c in p.categories)
+            cat_offsets.append(len(cat_codes))
+
+        n = len(ids)
+        width = max((len(i) for i in ids), default=1)
+        columns: List[tuple] = [
+            ("arxiv_id", np.array(ids, dtype=f"S{width}") if ids else np.empty(0, dtype="S1")),
+            ("version", np.frombuffer(versions, dtype=np.int32)),
+            ("published", np.frombuffer(published, dtype=np.int64)),
+            ("updated", np.frombuffer(updated, dtype=np.int64)),
+            ("cat_table", np.frombuffer(_SEP.join(cat_table).encode("utf-8"), dtype=np.uint8)),
+            ("cat_codes", np.frombuffer(cat_codes, dtype=np.int32)),
+            ("cat_off", np.frombuffer(cat_offsets, dtype=np.uint64)),
+        ]
+        for name, arena in arenas.items():
+            columns.append((f"{name}_off", np.frombuffer(arena.offsets, dtype=np.uint64)))
+            columns.append((f"{name}_ascii", np.frombuffer(arena.ascii, dtype=np.uint8)))
+            columns.append((name, arena))
+
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as out:
+            out.write(b"\0" * _HEADER.size)
+            entries = []
+            for name, col in columns:
+                out.write(b"\0" * (-out.tell() % 8))
+                offset = out.tell()
+                if isinstance(col, _Arena):
+                    col.f.seek(0)
+                    shutil.copyfileobj(col.f, out, 1 << 20)
+                    dtype = "u1"
+                else:
+                    out.write(col.tobytes())
+                    dtype = col.dtype.str
+                entries.append((name, dtype, offset, out.tell() - offset))
+            out.write(b"\0" * (-out.tell() % 8))
+            directory = out.tell()
+            for name, dtype, offset, nbytes in entries:
+                out.write(_ENTRY.pack(name.encode("ascii"), dtype.encode("ascii"), offset, nbytes))
+            out.seek(0)
+            out.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(entries), n, directory))
+        os.replace(tmp, path)
+    finally:
+        for arena in arenas.values():
+            arena.f.close()
+    return n
+
+
+class PackedPapers(Sequence[Paper]):
+    """
+    Read-only view of a pack file (or of a subset of its rows, see window()).
+    Columns are NumPy views over the mapped file; indexing decodes one Paper.
+    """
+
+    def __init__(self, path: str | Path, _base: Optional["PackedPapers"] = None, rows: Optional[np.ndarray] = None):
+        if _base is not None:
+            self.path, self._mm, self._cols, self._n = _base.path, _base._mm, _base._cols, _base._n
+            self._at = _base._at
+            self._cat_table = _base._cat_table
+            self._file = None
+        else:
+            self.path = Path(path)
+            self._file = open(self.path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._cols, self._at, self._n = self._read_directory()
+            raw = self._cols["cat_table"].tobytes().decode("utf-8")
+            self._cat_table = raw.split(_SEP) if raw else []
+        self.rows = rows                     # None = every row, in file order
+
+    def _read_directory(self):
+        if len(self._mm) < _HEADER.size:
+            raise ValueError(f"{self.path} is not a pack file")
+        magic, version, n_columns, n, directory = _HEADER.unpack_from(self._mm, 0)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"{self.path} is not a pack file")
+        if version != PACK_VERSION:
+            raise ValueError(f"{self.path}: pack format {version} is not supported (expected {PACK_VERSION})")
+        cols: Dict[str, np.ndarray] = {}
+        at: Dict[str, int] = {}             # file offset of each column (arena offsets are relative to it)
+        for k in range(n_columns):
+            name, dtype, offset, nbytes = _ENTRY.unpack_from(self._mm, directory + k * _ENTRY.size)
+            key = name.rstrip(b"\0").decode("ascii")
+            dt = np.dtype(dtype.rstrip(b"\0").decode("ascii"))
+            cols[key] = np.frombuffer(self._mm, dtype=dt, count=nbytes // dt.itemsize, offset=offset)
+            at[key] = offset
+        return cols, at, n
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._cols = {}
+            try:
+                self._mm.close()
+            except BufferError:
+                # column views handed out (or window()s) are still alive; the
+                # mapping goes away with the last of them
+                pass
+
+    def __enter__(self) -> "PackedPapers":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---- columns (selected rows only) ----
+
+    def _sel(self, col: np.ndarray) -> np.ndarray:
+        return col if self.rows is None else col[self.rows]
+
+    def __len__(self) -> int:
+        return self._n if self.rows is None else len(self.rows)
+
+    @property
+    def updated(self) -> np.ndarray:
+        return self._sel(self._cols["updated"]).astype("datetime64[s]")
+
+    @property
+    def versions(self) -> np.ndarray:
+        return self._sel(self._cols["version"])
+
+    @property
+    def arxiv_ids(self) -> List[str]:
+        return [b.decode("ascii") for b in self._sel(self._cols["arxiv_id"])]
+
+    def window(self, since: datetime, categories: Optional[Sequence[str]] = None) -> "PackedPapers":
+        """The rows updated at or after `since`, optionally in any of `categories` (no data is copied)."""
+        keep = self._sel(self._cols["updated"]) >= _epoch_seconds(since)
+        if categories:
+            keep &= self.has_any_category(categories)
+        rows = np.nonzero(keep)[0] if self.rows is None else self.rows[keep]
+        return PackedPapers(self.path, _base=self, rows=rows)
+
+    def has_any_category(self, categories: Iterable[str]) -> np.ndarray:
+        """Boolean mask: paper i is cross-listed in at least one of `categories`."""
+        cats = set(categories)
+        wanted = [i for i, c in enumerate(self._cat_table) if c in cats]
+        codes, off = self._cols["cat_codes"], self._cols["cat_off"].astype(np.int64)
+        if not wanted or len(codes) == 0:
+            return np.zeros(len(self), dtype=bool)
+        csum = np.concatenate(([0], np.cumsum(np.isin(codes, wanted), dtype=np.int64)))
+        return self._sel((csum[off[1:]] - csum[off[:-1]]) > 0)
+
+    # ---- text ----
+
+    def _text(self, field: str, j: int) -> str:
+        off, base = self._cols[f"{field}_off"], self._at[field]
+        return self._mm[base + int(off[j]):base + int(off[j + 1])].decode("utf-8")
+
+    def match_counts(self, field: str, matcher: KeywordMatcher) -> np.ndarray:
+        """
+        len(matcher.match_indices(text)) for the title or abstract of every
+        selected row. The matcher's byte prefilter runs over lowercased arena
+        chunks (one regex pass per chunk); only texts it hits, or that are not
+        ASCII, are decoded and matched exactly.
+        """
+        if field not in _TEXT_FIELDS:
+            raise ValueError(f"Unknown text field: {field}")
+        rows = np.arange(self._n) if self.rows is None else self.rows
+        off = self._cols[f"{field}_off"].astype(np.int64)
+        base = self._at[field]
+        pre = matcher.byte_prefilter()
+
+        candidate = np.ones(len(rows), dtype=bool)
+        if pre is not None:
+            candidate = self._cols[f"{field}_ascii"][rows] == 0
+            for k0 in range(0, len(rows), _SCAN_ROWS):
+                block = rows[k0:k0 + _SCAN_ROWS]
+                first, last = int(block[0]), int(block[-1]) + 1
+                lo = int(off[first])
+                buf = self._mm[base + lo:base + int(off[last])].lower()
+                spans = np.array([m.span() for m in pre.finditer(buf)], dtype=np.int64).reshape(-1, 2)
+                if not len(spans):
+                    continue
+                # every text a hit touches is a candidate: hits may run across a
+                # text boundary and hide a real hit at the start of the next text
+                rel = off[first:last + 1] - lo
+                a = np.searchsorted(rel, spans[:, 0], side="right") - 1
+                b = np.searchsorted(rel, np.maximum(spans[:, 1] - 1, spans[:, 0]), side="right") - 1
+                hit = np.zeros(last - first + 1, dtype=np.int64)
+                np.add.at(hit, a, 1)
+                np.add.at(hit, b + 1, -1)
+                candidate[k0:k0 + len(block)] |= np.cumsum(hit)[block - first] > 0
+                if candidate[:k0 + len(block)].mean() > _PREFILTER_GIVE_UP:
+                    # most texts match anyway; the extra pass would only cost time
+                    candidate[k0 + len(block):] = True
+                    break
+
+        counts = np.zeros(len(rows), dtype=np.int32)
+        idx = np.nonzero(candidate)[0]
+        for k in idx.tolist():
+            counts[k] = len(matcher.match_indices(self._text(field, int(rows[k]))))
+        instrument.count(f"pack.{field}s_decoded", len(idx))
+        instrument.count(f"pack.{field}s_skipped", len(rows) - len(idx))
+        return counts
+
+    # ---- records ----
+
+    def paper(self, i: int) -> Paper:
+        j = int(i if self.rows is None else self.rows[i])
+        c = self._cols
+        lo, hi = int(c["cat_off"][j]), int(c["cat_off"][j + 1])
+        authors = self._text("authors", j)
+        return Paper(
+            arxiv_id=c["arxiv_id"][j].decode("ascii"),
+            version=int(c["version"][j]),
+            title=self._text("title", j),
+            authors=authors.split(_SEP) if authors else [],
+            abstract=self._text("abstract", j),
+            categories=[self._cat_table[k] for k in c["cat_codes"][lo:hi]],
+            published_at=datetime.utcfromtimestamp(int(c["published"][j])),
+            updated_at=datetime.utcfromtimestamp(int(c["updated"][j])),
+        )
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self.paper(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.paper(i)
+
+    def __iter__(self) -> Iterator[Paper]:
+        for i in range(len(self)):
+            yield self.paper(i)
+
+
+def open_pack(path: str | Path) -> PackedPapers:
+    return PackedPapers(path)
@@ -0,0 +1,255 @@
+# mercurial/pipeline.py
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, Dict, List
+
+from . import instrument
+from .columnar import PaperBatch
+from .ranker.batch_ranker import RunningTopK
+from .ranker.simple_ranker import RankerConfig
+from .sources.arxiv_client import PAGE_SIZE, _fetch_page, build_search_query
+from .sources.atom_parser import parse_feed
+from .types import RankedPaper
+
+if TYPE_CHECKING:
+    from .sources.arxiv_client import ArxivClient
+    from .sources.http_cache import ResponseCache
+
+
+# fetch -> parse -> rank as three threads joined by bounded queues:
+#
+#   fetcher --(raw pages, page_queue)--> parser --(papers per page, batch_queue)--> ranker
+#
+# While page N is parsed and page N-1 is scored, page N+1 is downloading. The
+# fetcher cannot know where the lookback cutoff is until the parser has seen
+# it, so it may download up to page_queue + 1 pages past the end; those are
+# counted as wasted and a download still in flight is not waited for. A failed
+# download is queued like a page and only raised if the parser gets to it, so
+# an error on a page past the end cannot fail a run whose window is complete.
+# Parsing and scoring share the GIL, so the overlap that matters is network
+# wait vs CPU work.
+
+_DONE = object()
+_POLL = 0.05
+_JOIN_TIMEOUT = 1.0    # how long to wait for a fetcher that may still be downloading
+
+
+class _FetchFailed:
+    """Queued in place of a page whose download raised."""
+
+    def __init__(self, start: int, error: BaseException):
+        self.start = start
+        self.error = error
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    busy: float = 0.0      # doing its own work
+    starved: float = 0.0   # waiting for input
+    blocked: float = 0.0   # waiting for room in the downstream queue
+
+
+@dataclass
+class PipelineStats:
+    wall: float = 0.0
+    stages: List[StageStats] = field(default_factory=list)
+    queue_peak: Dict[str, int] = field(default_factory=dict)
+    queue_size: Dict[str, int] = field(default_factory=dict)
+    wasted_pages: int = 0
+
+    def summary(self) -> str:
+        wall = self.wall or 1e-9
+        lines = [f"Pipeline (wall {self.wall:.2f}s): busy / starved / blocked as % of wall"]
+        for st in self.stages:
+            lines.append(
+                f"  {st.name:<6} {100 * st.busy / wall:5.1f}% / {100 * st.starved / wall:5.1f}% / "
+                f"{100 * st.blocked / wall:5.1f}%  ({st.items} items)"
+            )
+        queues = ", ".join(f"{q} {self.queue_peak.get(q, 0)}/{n}" for q, n in self.queue_size.items())
+        lines.append(f"  queue peaks: {queues}; pages fetched past the cutoff: {self.wasted_pages}")
+        return "\n".join(lines)
+
+
+@dataclass
+class PipelineResult:
+    ranked: List[RankedPaper]
+    papers_seen: int
+    stats: PipelineStats
+
+
+class _Pipe:
+    """A bounded queue plus the halt flag every stage checks while waiting."""
+
+    def __init__(self, name: str, size: int, halt: threading.Event, stats: PipelineStats):
+        self.name = name
+        self.q: queue.Queue = queue.Queue(maxsize=max(1, size))
+        self.halt = halt
+        self.stats = stats
+        stats.queue_size[name] = self.q.maxsize
+
+    def put(self, item, st: StageStats) -> bool:
+        t0 = time.perf_counter()
+        try:
+            while not self.halt.is_set():
+                try:
+                    self.q.put(item, timeout=_POLL)
+                except queue.Full:
+                    continue
+                depth = self.q.qsize()
+                if depth > self.stats.queue_peak.get(self.name, 0):
+                    self.stats.queue_peak[self.name] = depth
+                return True
+            return False
+        finally:
+            st.blocked += time.perf_counter() - t0
+
+    def get(self, st: StageStats):
+        t0 = time.perf_counter()
+        try:
+            while not self.halt.is_set():
+                try:
+                    return self.q.get(timeout=_POLL)
+                except queue.Empty:
+                    continue
+            return _DONE
+        finally:
+            st.starved += time.perf_counter() - t0
+
+
+def rank_pipelined(
+    categories: List[str],
+    keywords: List[str],
+    lookback_hours: int,
+    max_fetch: int,
+    cfg: RankerConfig,
+    k: int,
+    page_size: int = PAGE_SIZE,
+    page_queue: int = 2,
+    batch_queue: int = 4,
+    cache: ResponseCache | None = None,
+    client: ArxivClient | None = None,
+    now: datetime | None = None,
+) -> PipelineResult:
+    """
+    Same papers as arxiv_client.iter_recent and the same top-k as
+    batch_ranker.rank_top_k, but download, parse and scoring overlap.
+    Memory is bounded by page_queue raw pages + batch_queue parsed pages + k.
+    """
+    q = build_search_query(categories, keywords)
+    halt = threading.Event()      # abort: error anywhere, or the consumer is done
+    enough = threading.Event()    # the parser has seen the end of the window
+    errors: List[BaseException] = []
+
+    stats = PipelineStats()
+    fetch_st, parse_st, rank_st = StageStats("fetch"), StageStats("parse"), StageStats("rank")
+    stats.stages = [fetch_st, parse_st, rank_st]
+    pages = _Pipe("pages", page_queue, halt, stats)
+    batches = _Pipe("papers", batch_queue, halt, stats)
+
+    def fetcher() -> None:
+        cutoff: datetime | None = None
+        start = 0
+        while start < max_fetch and not enough.is_set():
+            n = min(page_size, max_fetch - start)
+            params = {
+                "search_query": q,
+                "start": start,
+                "max_results": n,
+                "sortBy": "lastUpdatedDate",
+                "sortOrder": "descending",
+            }
+            t0 = time.perf_counter()
+            try:
+                with instrument.span("arxiv.fetch_page"):
+                    body, fetched_at = _fetch_page(params, cache, client)
+            except Exception as e:
+                # the parser raises it only if it still needs this page
+                fetch_st.busy += time.perf_counter() - t0
+                if not enough.is_set():
+                    pages.put(_FetchFailed(start, e), fetch_st)
+                return
+            if cutoff is None:
+                anchor = fetched_at if cache is not None and cache.replay else datetime.utcnow()
+                cutoff = anchor - timedelta(hours=lookback_hours)
+            fetch_st.busy += time.perf_counter() - t0
+            fetch_st.items += 1
+            if not pages.put((n, body, cutoff), fetch_st):
+                return
+            start += n
+        pages.put(_DONE, fetch_st)
+
+    def parser() -> None:
+        while True:
+            item = pages.get(parse_st)
+            if item is _DONE:
+                break
+            if isinstance(item, _FetchFailed):
+                raise item.error
+            n, body, cutoff = item
+            t0 = time.perf_counter()
+            papers = []
+            n_entries = 0
+            for p in instrument.timed_iter("arxiv.parse", parse_feed(body)):
+                n_entries += 1
+                if p.updated_at >= cutoff:
+                    papers.append(p)
+            del body
+            n_dropped = n_entries - len(papers)
+            instrument.count("arxiv.entries_parsed", n_entries)
+            instrument.count("arxiv.entries_dropped_cutoff", n_dropped)
+            batch = PaperBatch.from_papers(papers) if papers else None
+            parse_st.busy += time.perf_counter() - t0
+            parse_st.items += 1
+
+            if batch is not None and not batches.put(batch, parse_st):
+                return
+            if n_dropped > 0 or n_entries < n:
+                # end of the window; a page the fetcher has in flight is not waited for
+                enough.set()
+                break
+        batches.put(_DONE, parse_st)
+
+    def guarded(fn: Callable[[], None]) -> Callable[[], None]:
+        def run() -> None:
+            try:
+                fn()
+            except BaseException as e:  # re-raised in the caller's thread
+                errors.append(e)
+                halt.set()
+        return run
+
+    top = RunningTopK(cfg, k, now)
+    fetch_thread = threading.Thread(target=guarded(fetcher), name="pipeline-fetch", daemon=True)
+    parse_thread = threading.Thread(target=guarded(parser), name="pipeline-parse", daemon=True)
+    t_start = time.perf_counter()
+    fetch_thread.start()
+    parse_thread.start()
+    try:
+        while True:
+            batch = batches.get(rank_st)
+            if batch is _DONE:
+                break
+            t0 = time.perf_counter()
+            top.add(batch)
+            rank_st.busy += time.perf_counter() - t0
+            rank_st.items += 1
+    finally:
+        # releases a fetcher blocked on a full queue; one still downloading exits at its next put()
+        halt.set()
+        parse_thread.join()
+        fetch_thread.join(_JOIN_TIMEOUT)
+    stats.wall = time.perf_counter() - t_start
+    stats.wasted_pages = fetch_st.items - parse_st.items
+
+    if errors:
+        raise errors[0]
+    for st in stats.stages:
+        instrument.record(f"pipeline.{st.name}", st.busy, st.items)
+    return PipelineResult(ranked=top.result(), papers_seen=top.seen, stats=stats)
@@ -5,8 +5,6 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Optional
 
-from dotenv import dotenv_values
-
 
 def _split_csv(s: str) -> List[str]:
     return [x.strip() for x in s.split(",") if x.strip()]
@@ -37,11 +35,11 @@ def list_profiles() -> List[str]:
 
 
 def load_profile(name: str) -> Profile:
-    path = profiles_dir() / f"{name}.env"
-    if not path.exists():
-        raise FileNotFoundError(f"Profile not found: {name} ({path})")
+    from .settings_cache import profile_values
 
-    data: Dict[str, str] = {k: v for k, v in dotenv_values(path).items() if v is not None}
+    data: Optional[Dict[str, str]] = profile_values(name)
+    if data is None:
+        raise FileNotFoundError(f"Profile not found: {name} ({profiles_dir() / f'{name}.env'})")
 
     cats = _split_csv(data.get("ARXIV_CATEGORIES", ""))
     kws = _split_csv(data.get("KEYWORDS", ""))
@@ -0,0 +1,248 @@
+# mercurial/ranker/batch_ranker.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .. import instrument
+from ..columnar import PaperBatch
+from ..packfile import PackedPapers
+from ..types import Paper, RankedPaper
+from .simple_ranker import RankerConfig
+
+
+@dataclass(frozen=True)
+class BatchScores:
+    """Per-paper score components as parallel arrays (index = position in the input)."""
+    title_hits: np.ndarray     # int32
+    abstract_hits: np.ndarray  # int32
+    hours_ago: np.ndarray      # float64
+    bonus_flag: np.ndarray     # bool
+    kw_score: np.ndarray
+    recency: np.ndarray
+    cat_bonus: np.ndarray
+    score: np.ndarray
+    updated: np.ndarray        # datetime64[us], tie-breaker
+
+
+def recency_array(hours_ago: np.ndarray, half_life_hours: float) -> np.ndarray:
+    # exp decay: score = 2^(-t/half_life)
+    if half_life_hours <= 0:
+        return np.ones_like(hours_ago, dtype=np.float64)
+    return np.exp2(-hours_ago / half_life_hours)
+
+
+def combine(
+    title_hits: np.ndarray,
+    abstract_hits: np.ndarray,
+    hours_ago: np.ndarray,
+    bonus_flag: np.ndarray,
+    cfg: RankerConfig,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized form of the simple_ranker formula. Returns (kw_score, recency, cat_bonus, score)."""
+    kw_score = cfg.title_weight * title_hits + cfg.abstract_weight * abstract_hits
+    recency = recency_array(hours_ago, cfg.recency_half_life_hours)
+    cat_bonus = np.where(bonus_flag, cfg.category_bonus, 0.0)
+    score = kw_score * recency + cat_bonus
+    return kw_score, recency, cat_bonus, score
+
+
+def score_batch(
+    papers: Sequence[Paper] | PaperBatch | PackedPapers,
+    cfg: RankerConfig,
+    now: datetime | None = None,
+) -> BatchScores:
+    now = now or datetime.utcnow()
+    n = len(papers)
+    matcher = cfg.matcher()
+    instrument.count("rank.papers_scored", n)
+    # (text, keyword) pairs checked; the matcher covers each text in a single scan
+    instrument.count("rank.keyword_comparisons", 2 * n * len(matcher.keywords))
+
+    if isinstance(papers, PaperBatch):
+        # columnar input: read the text columns directly, never build Paper objects
+        title_hits = np.fromiter((len(matcher.match_indices(t)) for t in papers.titles), dtype=np.int32, count=n)
+        abstract_hits = np.fromiter(
+            (len(matcher.match_indices(a)) for a in papers.abstracts), dtype=np.int32, count=n
+        )
+        bonus_flag = papers.has_any_category(cfg.bonus_categories)
+        updated = papers.updated.astype("datetime64[us]")
+        return _finish(title_hits, abstract_hits, bonus_flag, updated, cfg, now)
+
+    if isinstance(papers, PackedPapers):
+        # mapped pack file: scan the text arenas in place, decode only candidate texts
+        title_hits = papers.match_counts("title", matcher)
+        abstract_hits = papers.match_counts("abstract", matcher)
+        bonus_flag = papers.has_any_category(cfg.bonus_categories)
+        updated = papers.updated.astype("datetime64[us]")
+        return _finish(title_hits, abstract_hits, bonus_flag, updated, cfg, now)
+
+    bonus = frozenset(cfg.bonus_categories)
+
+    title_hits = np.empty(n, dtype=np.int32)
+    abstract_hits = np.empty(n, dtype=np.int32)
+    bonus_flag = np.empty(n, dtype=bool)
+    updated = np.empty(n, dtype="datetime64[us]")
+
+    for i, p in enumerate(papers):
+        title_hits[i] = len(matcher.match_indices(p.title))
+        abstract_hits[i] = len(matcher.match_indices(p.abstract))
+        bonus_flag[i] = not bonus.isdisjoint(p.categories)
+        updated[i] = p.updated_at
+
+    return _finish(title_hits, abstract_hits, bonus_flag, updated, cfg, now)
+
+
+def _finish(
+    title_hits: np.ndarray,
+    abstract_hits: np.ndarray,
+    bonus_flag: np.ndarray,
+    updated: np.ndarray,
+    cfg: RankerConfig,
+    now: datetime,
+) -> BatchScores:
+    hours_ago = np.maximum((np.datetime64(now, "us") - updated) / np.timedelta64(1, "h"), 0.0)
+    kw_score, recency, cat_bonus, score = combine(title_hits, abstract_hits, hours_ago, bonus_flag, cfg)
+
+    return BatchScores(
+        title_hits=title_hits,
+        abstract_hits=abstract_hits,
+        hours_ago=hours_ago,
+        bonus_flag=bonus_flag,
+        kw_score=kw_score,
+        recency=recency,
+        cat_bonus=cat_bonus,
+        score=score,
+        updated=updated,
+    )
+
+
+def top_k_indices(score: np.ndarray, updated: np.ndarray, k: Optional[int]) -> np.ndarray:
+    """
+    Indices of the k best entries ordered like rank_papers: (score, updated) descending,
+    input order among exact ties. Uses argpartition so only the candidates get sorted.
+    """
+    n = len(score)
+    if k is None or k >= n:
+        cand = np.arange(n)
+    elif k <= 0:
+        return np.empty(0, dtype=np.intp)
+    else:
+        part = np.argpartition(-score, k - 1)[:k]
+        # include every entry tied with the k-th score so tie-breaking stays exact
+        cand = np.nonzero(score >= score[part].min())[0]
+
+    upd = updated[cand].astype(np.int64)
+    order = np.lexsort((-upd, -score[cand]))
+    return cand[order][:k] if k is not None else cand[order]
+
+
+def _ranked(p: Paper, cfg: RankerConfig, s: BatchScores, i: int) -> RankedPaper:
+    matcher = cfg.matcher()
+    uniq_hits = list(dict.fromkeys(matcher.hits(p.title) + matcher.hits(p.abstract)))
+    return RankedPaper(
+        paper=p,
+        score=float(s.score[i]),
+        matched_keywords=uniq_hits,
+        score_breakdown={
+            "kw_score": float(s.kw_score[i]),
+            "recency": float(s.recency[i]),
+            "cat_bonus": float(s.cat_bonus[i]),
+            "hours_ago": float(s.hours_ago[i]),
+        },
+    )
+
+
+def rank_top_k(
+    papers: Sequence[Paper] | PaperBatch | PackedPapers,
+    cfg: RankerConfig,
+    k: Optional[int] = None,
+    now: datetime | None = None,
+) -> List[RankedPaper]:
+    """
+    Same ranking as simple_ranker.rank_papers (up to float rounding of the decay),
+    but scored in NumPy and only the top-k RankedPaper objects (with their
+    keyword lists) are materialized. Accepts a PaperBatch or PackedPapers, in
+    which case Paper objects are only created for the returned top-k.
+    """
+    with instrument.span("rank.score"):
+        s = score_batch(papers, cfg, now=now)
+    with instrument.span("rank.top_k"):
+        top = top_k_indices(s.score, s.updated, k)
+    with instrument.span("rank.materialize"):
+        return [_ranked(papers[i], cfg, s, int(i)) for i in top]
+
+
+def _chunks(papers: Iterable[Paper], size: int) -> Iterator[PaperBatch]:
+    chunk: List[Paper] = []
+    for p in papers:
+        chunk.append(p)
+        if len(chunk) >= size:
+            yield PaperBatch.from_papers(chunk)
+            chunk = []
+    if chunk:
+        yield PaperBatch.from_papers(chunk)
+
+
+class RunningTopK:
+    """
+    Top-k over papers that arrive in batches. Each batch is scored on its own
+    and merged into the best k so far, so memory is O(k + batch). The result
+    has the same order as rank_top_k over all batches concatenated (earlier
+    papers win exact ties).
+    """
+
+    def __init__(self, cfg: RankerConfig, k: int, now: datetime | None = None):
+        self.cfg = cfg
+        self.k = k
+        self.now = now or datetime.utcnow()
+        self.seen = 0
+        self.best: List[RankedPaper] = []
+
+    def add(self, batch: PaperBatch) -> None:
+        self.seen += len(batch)
+        with instrument.span("rank.score"):
+            s = score_batch(batch, self.cfg, now=self.now)
+        with instrument.span("rank.top_k"):
+            top = top_k_indices(s.score, s.updated, self.k)
+            # sort is stable, so on exact ties earlier batches stay ahead
+            self.best = sorted(
+                self.best + [_ranked(batch[int(i)], self.cfg, s, int(i)) for i in top],
+                key=lambda rp: (rp.score, rp.paper.updated_at),
+                reverse=True,
+            )[: self.k]
+
+    def result(self) -> List[RankedPaper]:
+        return list(self.best)
+
+
+def rank_stream(
+    papers: Iterable[Paper],
+    cfg: RankerConfig,
+    k: int,
+    now: datetime | None = None,
+    chunk_size: int = 10_000,
+) -> List[RankedPaper]:
+    """rank_top_k over a stream of any length: scored chunk by chunk into a RunningTopK."""
+    top = RunningTopK(cfg, k, now)
+    for batch in _chunks(papers, chunk_size):
+        top.add(batch)
+    return top.result()
+
+
+def score_stream(
+    papers: Iterable[Paper],
+    cfg: RankerConfig,
+    now: datetime | None = None,
+    chunk_size: int = 10_000,
+) -> Iterator[RankedPaper]:
+    """Score a stream chunk by chunk and yield every paper with its score, in input order (not ranked)."""
+    now = now or datetime.utcnow()
+    for batch in _chunks(papers, chunk_size):
+        with instrument.span("rank.score"):
+            s = score_batch(batch, cfg, now=now)
+        for i in range(len(batch)):
+            yield _ranked(batch[i], cfg, s, i)
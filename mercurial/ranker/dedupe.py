@@ -0,0 +1,301 @@
+# mercurial/ranker/dedupe.py
+from __future__ import annotations
+
+import itertools
+import sqlite3
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .. import instrument
+from ..columnar import PaperBatch
+from ..config import data_dir
+from ..types import Paper, RankedPaper
+from .batch_ranker import _ranked, score_batch, top_k_indices
+from .index_ranker import tokenize
+from .simple_ranker import RankerConfig
+
+
+# Near-duplicate collapsing for ranked output (workshop/full-version pairs,
+# renamed resubmissions, template abstracts):
+#   1. each abstract becomes a set of word 3-gram shingles, hashed to 32 bits
+#   2. a MinHash signature of NUM_PERM minima under multiply-shift hashes
+#      ((a*x + b) mod 2^64) >> 32 estimates the Jaccard similarity of two
+#      shingle sets as the fraction of equal slots
+#   3. LSH banding: papers whose signatures agree on all rows of any band
+#      become candidate pairs; only those pairs are compared, so clustering is
+#      roughly linear in the window instead of quadratic
+#   4. candidate pairs at or above the threshold are unioned into clusters, and
+#      the best-scoring member of each cluster is kept
+# Signatures depend only on the abstract, so they are cached per
+# (arxiv_id, version) in data/minhash.db.
+NUM_PERM = 128
+BANDS = 32              # 32 bands x 4 rows: pairs at Jaccard 0.6 collide with p ~ 0.99
+SHINGLE = 3
+MINHASH_VERSION = 1
+
+_MAX = np.uint32(0xFFFFFFFF)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    params   TEXT    NOT NULL,
+    arxiv_id TEXT    NOT NULL,
+    version  INTEGER NOT NULL,
+    sig      BLOB    NOT NULL,   -- NUM_PERM little-endian uint32
+    PRIMARY KEY (params, arxiv_id, version)
+) WITHOUT ROWID;
+"""
+
+
+def default_signature_cache_path() -> Path:
+    return data_dir() / "minhash.db"
+
+
+def shingle_sets(texts: Sequence[str], k: int = SHINGLE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Unique 32-bit hashes of the word k-grams of each text (its tokens if it has
+    fewer than k), as CSR (values, offsets). Hashed for all texts at once.
+    """
+    toks = [tokenize(t) for t in texts]
+    n = len(toks)
+    lens = np.fromiter((len(t) for t in toks), dtype=np.int64, count=n)
+    # crc32 once per distinct token, then gathered
+    vocab: Dict[str, int] = {}
+    codes = np.fromiter(
+        (vocab.setdefault(t, len(vocab)) for t in itertools.chain.from_iterable(toks)),
+        dtype=np.int64,
+        count=int(lens.sum()),
+    )
+    vocab_hash = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in vocab), dtype=np.uint64, count=len(vocab))
+    h1 = vocab_hash[codes]
+    m = len(h1)
+    doc = np.repeat(np.arange(n, dtype=np.int64), lens)
+    end = np.cumsum(lens)[doc] if m else doc
+
+    gram = np.zeros(m, dtype=np.uint64)
+    for j in range(k):
+        nxt = np.zeros(m, dtype=np.uint64)
+        nxt[:m - j] = h1[j:]
+        gram = gram * np.uint64(0x9E3779B1) + nxt
+    short = lens[doc] < k
+    keep = short | (np.arange(m) + k <= end)
+    vals = np.where(short, h1, gram & np.uint64(0xFFFFFFFF))[keep]
+
+    key = np.sort((doc[keep].astype(np.uint64) << np.uint64(32)) | vals)
+    key = key[np.concatenate(([True], key[1:] != key[:-1]))]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount((key >> np.uint64(32)).astype(np.int64), minlength=n))
+    return key & np.uint64(0xFFFFFFFF), offsets
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.seed = seed
+        self.a = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+
+    @property
+    def params(self) -> str:
+        return f"v{MINHASH_VERSION}:perm{self.num_perm}:seed{self.seed}:shingle{SHINGLE}"
+
+    def signatures(self, texts: Sequence[str], chunk_shingles: int = 32768) -> np.ndarray:
+        """(len(texts), num_perm) uint32; a text without tokens gets all-max slots (see is_empty)."""
+        out = np.full((len(texts), self.num_perm), _MAX, dtype=np.uint32)
+        vals, offsets = shingle_sets(texts)
+        sizes = np.diff(offsets)
+        i = 0
+        while i < len(texts):
+            # as many texts as fit in one (num_perm, chunk_shingles) product
+            j = max(i + 1, int(np.searchsorted(offsets, offsets[i] + chunk_shingles, side="right")) - 1)
+            rows = i + np.nonzero(sizes[i:j])[0]
+            if len(rows):
+                x = vals[offsets[i]:offsets[j]]
+                h = (self.a[:, None] * x[None, :] + self.b[:, None]) >> np.uint64(32)
+                mins = np.minimum.reduceat(h, offsets[rows] - offsets[i], axis=1)
+                out[rows] = mins.T.astype(np.uint32)
+            i = j
+        return out
+
+
+def is_empty(sigs: np.ndarray) -> np.ndarray:
+    return (sigs == _MAX).all(axis=1)
+
+
+class SignatureCache:
+    """SQLite memo of MinHash signatures per (arxiv_id, version)."""
+
+    def __init__(self, path: Path | str | None = None):
+        self.path = Path(path) if path is not None else default_signature_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "SignatureCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def lookup(
+        self, params: str, num_perm: int, arxiv_ids: Sequence[str], versions: Sequence[int]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(signatures, found) aligned with arxiv_ids."""
+        n = len(arxiv_ids)
+        sigs = np.full((n, num_perm), _MAX, dtype=np.uint32)
+        found = np.zeros(n, dtype=bool)
+        if n == 0:
+            return sigs, found
+        self.conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS _want (pos INTEGER PRIMARY KEY, arxiv_id TEXT, version INTEGER)"
+        )
+        self.conn.execute("DELETE FROM _want")
+        self.conn.executemany(
+            "INSERT INTO _want (pos, arxiv_id, version) VALUES (?, ?, ?)",
+            zip(range(n), arxiv_ids, (int(v) for v in versions)),
+        )
+        for pos, blob in self.conn.execute(
+            "SELECT w.pos, s.sig FROM _want w "
+            "JOIN signatures s ON s.params = ? AND s.arxiv_id = w.arxiv_id AND s.version = w.version",
+            (params,),
+        ):
+            sigs[pos] = np.frombuffer(blob, dtype="<u4")
+            found[pos] = True
+        return sigs, found
+
+    def put(self, params: str, arxiv_ids: Sequence[str], versions: Sequence[int], sigs: np.ndarray) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO signatures (params, arxiv_id, version, sig) VALUES (?, ?, ?, ?)",
+                [
+                    (params, a, int(v), sigs[i].astype("<u4").tobytes())
+                    for i, (a, v) in enumerate(zip(arxiv_ids, versions))
+                ],
+            )
+
+
+def signatures_for(
+    batch: PaperBatch, hasher: MinHasher, cache: SignatureCache | None = None
+) -> np.ndarray:
+    """Signatures of every paper in `batch`; with a cache, only new versions are hashed."""
+    if cache is None:
+        instrument.count("dedupe.signatures_computed", len(batch))
+        return hasher.signatures(batch.abstracts)
+    sigs, found = cache.lookup(hasher.params, hasher.num_perm, batch.arxiv_ids, batch.versions)
+    missing = np.nonzero(~found)[0]
+    instrument.count("dedupe.signature_cache_hits", len(batch) - len(missing))
+    instrument.count("dedupe.signatures_computed", len(missing))
+    if len(missing):
+        new = hasher.signatures([batch.abstracts[int(i)] for i in missing])
+        sigs[missing] = new
+        cache.put(hasher.params, [batch.arxiv_ids[int(i)] for i in missing], batch.versions[missing], new)
+    return sigs
+
+
+def _find(parent: np.ndarray, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster(sigs: np.ndarray, threshold: float = 0.6, bands: int = BANDS, max_bucket: int = 64) -> np.ndarray:
+    """
+    Cluster label per row: rows whose estimated Jaccard similarity is at least
+    `threshold` (directly or through a chain) share a label. Only rows that
+    collide in some LSH band are compared; inside a bucket larger than
+    `max_bucket` each row is only compared with the bucket's first row.
+    """
+    n, num_perm = sigs.shape
+    rows_per_band = num_perm // bands
+    parent = np.arange(n)
+    valid = np.nonzero(~is_empty(sigs))[0]
+    if len(valid) < 2:
+        return parent
+
+    mult = np.random.default_rng(7).integers(1, 1 << 62, rows_per_band, dtype=np.uint64) | np.uint64(1)
+    pairs_i: List[np.ndarray] = []
+    pairs_j: List[np.ndarray] = []
+    for b in range(bands):
+        band = sigs[valid, b * rows_per_band:(b + 1) * rows_per_band].astype(np.uint64)
+        key = (band * mult).sum(axis=1)          # wraps mod 2^64, a hash of the band
+        order = np.argsort(key, kind="stable")
+        skey = key[order]
+        # bucket boundaries among sorted keys; only buckets with 2+ members matter
+        starts = np.nonzero(np.concatenate(([True], skey[1:] != skey[:-1])))[0]
+        sizes = np.diff(np.concatenate((starts, [len(skey)])))
+        for s, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+            members = valid[order[s:s + size]]
+            if size <= max_bucket:
+                ii, jj = np.triu_indices(size, k=1)
+                pairs_i.append(members[ii])
+                pairs_j.append(members[jj])
+            else:
+                pairs_i.append(np.full(size - 1, members[0]))
+                pairs_j.append(members[1:])
+    if not pairs_i:
+        return parent
+
+    pi, pj = np.concatenate(pairs_i), np.concatenate(pairs_j)
+    pair = np.unique(np.stack([pi, pj], axis=1), axis=0)
+    instrument.count("dedupe.candidate_pairs", len(pair))
+    est = (sigs[pair[:, 0]] == sigs[pair[:, 1]]).mean(axis=1)
+    for i, j in pair[est >= threshold]:
+        ri, rj = _find(parent, int(i)), _find(parent, int(j))
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    return np.array([_find(parent, i) for i in range(n)])
+
+
+def rank_deduped(
+    papers: Sequence[Paper] | PaperBatch,
+    cfg: RankerConfig,
+    k: Optional[int] = None,
+    threshold: float = 0.6,
+    cache: SignatureCache | None = None,
+    now: datetime | None = None,
+) -> List[RankedPaper]:
+    """
+    rank_top_k, then collapse near-duplicate abstracts: the window is clustered
+    and only the best-ranked member of each cluster is returned, with
+    score_breakdown["cluster_size"] set to the cluster's size (1 = unique).
+    """
+    batch = papers if isinstance(papers, PaperBatch) else PaperBatch.from_papers(papers)
+    with instrument.span("rank.score"):
+        s = score_batch(batch, cfg, now=now)
+    with instrument.span("dedupe.minhash"):
+        sigs = signatures_for(batch, MinHasher(), cache)
+    with instrument.span("dedupe.cluster"):
+        labels = cluster(sigs, threshold)
+    sizes = np.bincount(labels, minlength=len(batch))
+
+    with instrument.span("rank.top_k"):
+        order = top_k_indices(s.score, s.updated, None)
+    keep: List[int] = []
+    seen = set()
+    for i in order:
+        lab = int(labels[i])
+        if lab in seen:
+            continue
+        seen.add(lab)
+        keep.append(int(i))
+        if k is not None and len(keep) >= k:
+            break
+    instrument.count("dedupe.clusters_collapsed", int((sizes > 1).sum()))
+
+    out: List[RankedPaper] = []
+    with instrument.span("rank.materialize"):
+        for i in keep:
+            rp = _ranked(batch[i], cfg, s, i)
+            rp.score_breakdown["cluster_size"] = float(sizes[labels[i]])
+            out.append(rp)
+    return out
@@ -0,0 +1,183 @@
+# mercurial/ranker/feature_store.py
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .. import instrument
+from ..columnar import PaperBatch
+from ..config import data_dir
+from ..types import Paper
+from .batch_ranker import recency_array, score_batch, top_k_indices
+from .score_cache import ScoreCache, config_fingerprint, score_cached
+from .simple_ranker import RankerConfig
+
+
+# The keyword score is kw_score * recency + cat_bonus, where every term is a
+# weight times a per-paper feature: title hits, abstract hits, hours since the
+# last update and the bonus-category flag. A FeatureTable stores those
+# features for one window (one .npz per profile selection), so any choice of
+# title/abstract weight, half-life and bonus amount is re-ranked with a few
+# vectorized passes and no keyword matching.
+#
+# Recency is measured from the table's computed_at (when the window was
+# fetched), so a sweep over a saved table is reproducible. `source` records
+# where the window came from and its lookback, so a table is only reused for
+# the same window.
+
+FEATURES_VERSION = 2
+
+
+def default_features_dir() -> Path:
+    return data_dir() / "features"
+
+
+def features_path(profiles: Sequence[str]) -> Path:
+    name = "+".join(sorted(profiles)) if profiles else "base"
+    return default_features_dir() / f"{name}.npz"
+
+
+@dataclass(frozen=True)
+class FeatureTable:
+    fingerprint: str              # score_cache.config_fingerprint of the matching config
+    computed_at: datetime
+    arxiv_ids: np.ndarray         # str
+    versions: np.ndarray          # int32
+    titles: np.ndarray            # str, for display only
+    title_hits: np.ndarray        # int32
+    abstract_hits: np.ndarray     # int32
+    bonus: np.ndarray             # bool
+    updated: np.ndarray           # datetime64[us]
+    source: str = ""              # e.g. "arxiv, lookback 48h"
+
+    def __len__(self) -> int:
+        return len(self.arxiv_ids)
+
+    def hours_ago(self, now: datetime | None = None) -> np.ndarray:
+        now = now or self.computed_at
+        return np.maximum((np.datetime64(now, "us") - self.updated) / np.timedelta64(1, "h"), 0.0)
+
+    def save(self, path: Path | str) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            meta=np.array([str(FEATURES_VERSION), self.fingerprint, self.computed_at.isoformat(), self.source]),
+            arxiv_ids=self.arxiv_ids.astype(str),
+            versions=self.versions,
+            titles=self.titles.astype(str),
+            title_hits=self.title_hits,
+            abstract_hits=self.abstract_hits,
+            bonus=self.bonus,
+            updated=self.updated.astype(np.int64),
+        )
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path | str) -> Optional["FeatureTable"]:
+        """The table saved at `path`, or None if there is none or it was written by another version."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        with np.load(path, allow_pickle=False) as z:
+            meta = [str(x) for x in z["meta"]]
+            if meta[0] != str(FEATURES_VERSION):
+                return None
+            _, fingerprint, computed_at, source = meta
+            return cls(
+                fingerprint=fingerprint,
+                computed_at=datetime.fromisoformat(computed_at),
+                arxiv_ids=z["arxiv_ids"],
+                versions=z["versions"],
+                titles=z["titles"],
+                title_hits=z["title_hits"],
+                abstract_hits=z["abstract_hits"],
+                bonus=z["bonus"],
+                updated=z["updated"].astype("datetime64[us]"),
+                source=source,
+            )
+
+
+def build_features(
+    papers: Sequence[Paper] | PaperBatch,
+    cfg: RankerConfig,
+    cache: ScoreCache | None = None,
+    now: datetime | None = None,
+    source: str = "",
+) -> FeatureTable:
+    """Match `papers` once (only new versions, with a ScoreCache) and keep the features."""
+    now = now or datetime.utcnow()
+    batch = papers if isinstance(papers, PaperBatch) else PaperBatch.from_papers(papers)
+    with instrument.span("rank.features"):
+        s = score_cached(batch, cfg, cache, now=now) if cache is not None else score_batch(batch, cfg, now=now)
+    return FeatureTable(
+        fingerprint=config_fingerprint(cfg),
+        computed_at=now,
+        arxiv_ids=np.array(batch.arxiv_ids, dtype=str),
+        versions=np.asarray(batch.versions, dtype=np.int32),
+        titles=np.array(batch.titles, dtype=str),
+        title_hits=s.title_hits.astype(np.int32),
+        abstract_hits=s.abstract_hits.astype(np.int32),
+        bonus=s.bonus_flag.astype(bool),
+        updated=s.updated,
+        source=source,
+    )
+
+
+def sweep_configs(
+    cfg: RankerConfig,
+    title_weights: Sequence[float] = (),
+    abstract_weights: Sequence[float] = (),
+    half_lives: Sequence[float] = (),
+    bonuses: Sequence[float] = (),
+) -> List[RankerConfig]:
+    """Every combination of the given values; an empty list keeps cfg's value."""
+    return [
+        replace(cfg, title_weight=tw, abstract_weight=aw, recency_half_life_hours=hl, category_bonus=cb)
+        for tw, aw, hl, cb in itertools.product(
+            title_weights or (cfg.title_weight,),
+            abstract_weights or (cfg.abstract_weight,),
+            half_lives or (cfg.recency_half_life_hours,),
+            bonuses or (cfg.category_bonus,),
+        )
+    ]
+
+
+class Reranker:
+    """
+    Scores a FeatureTable under many configs. hours_ago is computed once and
+    recency once per distinct half-life, so each further config costs two
+    multiply-adds over the window plus a top-k.
+    """
+
+    def __init__(self, features: FeatureTable, now: datetime | None = None):
+        self.features = features
+        self.hours_ago = features.hours_ago(now)
+        self._title = features.title_hits.astype(np.float64)
+        self._abstract = features.abstract_hits.astype(np.float64)
+        self._recency: Dict[float, np.ndarray] = {}
+
+    def recency(self, half_life_hours: float) -> np.ndarray:
+        rec = self._recency.get(half_life_hours)
+        if rec is None:
+            rec = self._recency[half_life_hours] = recency_array(self.hours_ago, half_life_hours)
+        return rec
+
+    def scores(self, cfg: RankerConfig) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(kw_score, recency, score), the batch_ranker.combine formula."""
+        kw_score = cfg.title_weight * self._title + cfg.abstract_weight * self._abstract
+        recency = self.recency(cfg.recency_half_life_hours)
+        score = kw_score * recency + np.where(self.features.bonus, cfg.category_bonus, 0.0)
+        return kw_score, recency, score
+
+    def top(self, cfg: RankerConfig, k: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """(indices of the top k in rank order, score of every paper)."""
+        _, _, score = self.scores(cfg)
+        return top_k_indices(score, self.features.updated, k), score
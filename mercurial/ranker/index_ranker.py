@@ -0,0 +1,283 @@
+# mercurial/ranker/index_ranker.py
+from __future__ import annotations
+
+import math
+import re
+import sqlite3
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .. import instrument
+from ..columnar import PaperBatch
+from ..config import data_dir
+from ..types import Paper, RankedPaper
+from .batch_ranker import recency_array, top_k_indices
+from .simple_ranker import RankerConfig
+
+
+_TOKEN = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc          INTEGER PRIMARY KEY,
+    arxiv_id     TEXT    NOT NULL UNIQUE,
+    version      INTEGER NOT NULL,
+    title_len    INTEGER NOT NULL,
+    abstract_len INTEGER NOT NULL
+);
+
+-- one row per (term, doc); term frequencies kept per field for BM25F
+CREATE TABLE IF NOT EXISTS postings (
+    term        TEXT    NOT NULL,
+    doc         INTEGER NOT NULL,
+    title_tf    INTEGER NOT NULL,
+    abstract_tf INTEGER NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings (doc);
+
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    df   INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS stats (
+    key   TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall((text or "").lower())
+
+
+def default_index_path() -> Path:
+    return data_dir() / "index.db"
+
+
+class InvertedIndex:
+    """
+    Incremental, SQLite-persisted inverted index over paper titles and abstracts.
+
+    Postings carry per-field term frequencies; doc lengths, document frequencies
+    and corpus totals are maintained on every add, so new papers update the
+    index in place. A paper seen again with a higher version replaces its
+    previous postings; the same version is skipped.
+    """
+
+    def __init__(self, path: Path | str | None = None):
+        self.path = Path(path) if path is not None else default_index_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "InvertedIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---- stats ----
+
+    def _stat(self, key: str) -> float:
+        row = self.conn.execute("SELECT value FROM stats WHERE key = ?", (key,)).fetchone()
+        return float(row[0]) if row else 0.0
+
+    def _bump_stats(self, n_docs: int, title_len: int, abstract_len: int) -> None:
+        self.conn.executemany(
+            "INSERT INTO stats (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+            [("n_docs", n_docs), ("title_len", title_len), ("abstract_len", abstract_len)],
+        )
+
+    @property
+    def n_docs(self) -> int:
+        return int(self._stat("n_docs"))
+
+    # ---- writes ----
+
+    def _remove_doc(self, doc: int, title_len: int, abstract_len: int) -> None:
+        terms = [r[0] for r in self.conn.execute("SELECT term FROM postings WHERE doc = ?", (doc,))]
+        self.conn.executemany("UPDATE terms SET df = df - 1 WHERE term = ?", [(t,) for t in terms])
+        self.conn.execute("DELETE FROM postings WHERE doc = ?", (doc,))
+        self.conn.execute("DELETE FROM docs WHERE doc = ?", (doc,))
+        self._bump_stats(-1, -title_len, -abstract_len)
+
+    def add(self, papers: Iterable[Paper]) -> int:
+        """Index new papers (or newer versions) in one transaction. Returns how many were (re)indexed."""
+        n = 0
+        with self.conn:
+            for p in papers:
+                row = self.conn.execute(
+                    "SELECT doc, version, title_len, abstract_len FROM docs WHERE arxiv_id = ?", (p.arxiv_id,)
+                ).fetchone()
+                if row is not None:
+                    if row[1] >= p.version:
+                        continue
+                    self._remove_doc(row[0], row[2], row[3])
+
+                t_tokens = tokenize(p.title)
+                a_tokens = tokenize(p.abstract)
+                t_tf, a_tf = Counter(t_tokens), Counter(a_tokens)
+
+                cur = self.conn.execute(
+                    "INSERT INTO docs (arxiv_id, version, title_len, abstract_len) VALUES (?, ?, ?, ?)",
+                    (p.arxiv_id, p.version, len(t_tokens), len(a_tokens)),
+                )
+                doc = cur.lastrowid
+                terms = set(t_tf) | set(a_tf)
+                self.conn.executemany(
+                    "INSERT INTO postings (term, doc, title_tf, abstract_tf) VALUES (?, ?, ?, ?)",
+                    [(t, doc, t_tf.get(t, 0), a_tf.get(t, 0)) for t in terms],
+                )
+                self.conn.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                    [(t,) for t in terms],
+                )
+                self._bump_stats(1, len(t_tokens), len(a_tokens))
+                n += 1
+        return n
+
+    # ---- reads ----
+
+    def doc_ids(self, arxiv_ids: Sequence[str]) -> np.ndarray:
+        """Index doc ids for arxiv_ids (-1 where not indexed)."""
+        out = np.full(len(arxiv_ids), -1, dtype=np.int64)
+        pos: Dict[str, int] = {a: i for i, a in enumerate(arxiv_ids)}
+        ids = list(pos)
+        for lo in range(0, len(ids), 500):
+            chunk = ids[lo:lo + 500]
+            marks = ", ".join("?" for _ in chunk)
+            for arxiv_id, doc in self.conn.execute(
+                f"SELECT arxiv_id, doc FROM docs WHERE arxiv_id IN ({marks})", chunk
+            ):
+                out[pos[arxiv_id]] = doc
+        return out
+
+    def bm25(
+        self,
+        terms: Iterable[str],
+        docs: np.ndarray,
+        title_weight: float = 3.0,
+        abstract_weight: float = 1.0,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> np.ndarray:
+        """
+        BM25F scores of `docs` (index doc ids) for a bag of query terms.
+
+        Title and abstract term frequencies are length-normalized per field,
+        weighted, summed and then saturated once, so a term repeated in the
+        title cannot dominate. Only postings of the given docs are read.
+        """
+        scores = np.zeros(len(docs), dtype=np.float64)
+        n_docs = self.n_docs
+        if n_docs == 0 or len(docs) == 0:
+            return scores
+
+        avg_t = max(self._stat("title_len") / n_docs, 1e-9)
+        avg_a = max(self._stat("abstract_len") / n_docs, 1e-9)
+
+        pos = {int(d): i for i, d in enumerate(docs) if d >= 0}
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS _window (doc INTEGER PRIMARY KEY)")
+        self.conn.execute("DELETE FROM _window")
+        self.conn.executemany("INSERT INTO _window (doc) VALUES (?)", [(d,) for d in pos])
+
+        lens = {
+            doc: (tl, al)
+            for doc, tl, al in self.conn.execute(
+                "SELECT d.doc, d.title_len, d.abstract_len FROM docs d JOIN _window w ON d.doc = w.doc"
+            )
+        }
+
+        for term in set(terms):
+            row = self.conn.execute("SELECT df FROM terms WHERE term = ?", (term,)).fetchone()
+            if not row or row[0] <= 0:
+                continue
+            df = row[0]
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+            for doc, ttf, atf in self.conn.execute(
+                "SELECT p.doc, p.title_tf, p.abstract_tf FROM postings p JOIN _window w ON p.doc = w.doc "
+                "WHERE p.term = ?",
+                (term,),
+            ):
+                tl, al = lens[doc]
+                tf = title_weight * ttf / (1 - b + b * tl / avg_t) + abstract_weight * atf / (1 - b + b * al / avg_a)
+                scores[pos[doc]] += idf * tf * (k1 + 1) / (tf + k1)
+
+        return scores
+
+
+def rank_bm25(
+    papers: Sequence[Paper] | PaperBatch,
+    cfg: RankerConfig,
+    index: InvertedIndex,
+    k: Optional[int] = None,
+    now: datetime | None = None,
+) -> List[RankedPaper]:
+    """
+    Add `papers` to the index, then rank them by BM25F over the profile
+    keywords (using corpus-wide document frequencies) combined with the usual
+    recency decay and category bonus: score = bm25 * recency + cat_bonus.
+    """
+    now = now or datetime.utcnow()
+    with instrument.span("rank.index_add"):
+        instrument.count("rank.docs_indexed", index.add(papers))
+    instrument.count("rank.papers_scored", len(papers))
+
+    if isinstance(papers, PaperBatch):
+        ids = papers.arxiv_ids
+        updated = papers.updated.astype("datetime64[us]")
+        bonus_flag = papers.has_any_category(cfg.bonus_categories)
+    else:
+        bonus = frozenset(cfg.bonus_categories)
+        ids = [p.arxiv_id for p in papers]
+        updated = np.array([p.updated_at for p in papers], dtype="datetime64[us]")
+        bonus_flag = np.array([not bonus.isdisjoint(p.categories) for p in papers], dtype=bool)
+
+    query_terms = [t for kw in cfg.keywords for t in tokenize(kw)]
+    with instrument.span("rank.bm25"):
+        kw_score = index.bm25(
+            query_terms,
+            index.doc_ids(ids),
+            title_weight=cfg.title_weight,
+            abstract_weight=cfg.abstract_weight,
+        )
+
+    hours_ago = np.maximum((np.datetime64(now, "us") - updated) / np.timedelta64(1, "h"), 0.0)
+    recency = recency_array(hours_ago, cfg.recency_half_life_hours)
+    cat_bonus = np.where(bonus_flag, cfg.category_bonus, 0.0)
+    score = kw_score * recency + cat_bonus
+
+    kw_tokens = [(kw, set(tokenize(kw))) for kw in cfg.keywords]
+    out: List[RankedPaper] = []
+    for i in top_k_indices(score, updated, k):
+        p = papers[int(i)]
+        doc_terms = set(tokenize(p.title)) | set(tokenize(p.abstract))
+        matched = list(dict.fromkeys(kw for kw, toks in kw_tokens if toks and toks <= doc_terms))
+        out.append(
+            RankedPaper(
+                paper=p,
+                score=float(score[i]),
+                matched_keywords=matched,
+                score_breakdown={
+                    "kw_score": float(kw_score[i]),
+                    "recency": float(recency[i]),
+                    "cat_bonus": float(cat_bonus[i]),
+                    "hours_ago": float(hours_ago[i]),
+                },
+            )
+        )
+    return out
+
@@ -0,0 +1,125 @@
+# mercurial/ranker/matcher.py
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+def _normalize(text: str) -> str:
+    # lower + collapse spaces
+    return re.sub(r"\s+", " ", (text or "").lower()).strip()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _trie_pattern(terms: Sequence[str], atom: Callable[[str], str] = re.escape) -> str:
+    """
+    Build a regex for `terms` shaped like a trie: common prefixes are factored out,
+    so each text position costs at most one branch per character instead of one
+    attempt per keyword. Optional suffixes are greedy, so the longest term wins.
+    `atom` turns one character into its sub-pattern.
+    """
+    trie: Dict[str, dict] = {}
+    for t in terms:
+        node = trie
+        for ch in t:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        kids = [(ch, sub) for ch, sub in node.items() if ch]
+        if not kids:
+            return ""
+        parts = [atom(ch) + emit(sub) for ch, sub in sorted(kids)]
+        body = parts[0] if len(parts) == 1 else "(?:" + "|".join(parts) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    """
+    All keywords compiled into one regex; each text is normalized and scanned once.
+
+    Matching is substring containment on normalized text (same as checking
+    `kw in text` per keyword). With word_boundary=True a hit must not be
+    glued to other word characters, so "rl" no longer matches inside "world".
+    """
+
+    def __init__(self, keywords: Sequence[str], word_boundary: bool = False):
+        self.keywords: List[str] = list(keywords)
+        self.word_boundary = word_boundary
+
+        # normalized term -> indices of the original keywords (duplicates are kept)
+        self._term_index: Dict[str, List[int]] = {}
+        for i, kw in enumerate(self.keywords):
+            k = _normalize(kw)
+            if k:
+                self._term_index.setdefault(k, []).append(i)
+
+        terms = sorted(self._term_index, key=len, reverse=True)
+
+        # The regex reports one (longest) term per start position; shorter terms
+        # that are prefixes of it match at the same position too (with word
+        # boundaries: only if the longer term continues with a non-word char).
+        self._prefixes: Dict[str, List[str]] = {
+            t: [
+                u
+                for u in terms
+                if len(u) < len(t) and t.startswith(u) and (not word_boundary or not _is_word_char(t[len(u)]))
+            ]
+            for t in terms
+        }
+
+        if not terms:
+            self._re = None
+        elif word_boundary:
+            self._re = re.compile(r"(?<!\w)(?=(" + _trie_pattern(terms) + r")(?!\w))")
+        else:
+            self._re = re.compile(r"(?=(" + _trie_pattern(terms) + r"))")
+
+    def match_indices(self, text: str) -> List[int]:
+        """Indices (into `keywords`) of every keyword found in text, in keyword order."""
+        if self._re is None:
+            return []
+        t = _normalize(text)
+
+        found = set()
+        for m in self._re.finditer(t):
+            term = m.group(1)
+            if term in found:
+                continue
+            found.add(term)
+            found.update(self._prefixes[term])
+
+        idx: List[int] = []
+        for term in found:
+            idx.extend(self._term_index[term])
+        idx.sort()
+        return idx
+
+    def hits(self, text: str) -> List[str]:
+        """Matched keywords (original spelling), in keyword order."""
+        return [self.keywords[i] for i in self.match_indices(text)]
+
+    def byte_prefilter(self) -> Optional[re.Pattern[bytes]]:
+        """
+        Regex over lowercased raw UTF-8 that finds something in every ASCII
+        text where match_indices() would (any whitespace run between words, no
+        boundary checks), so texts it finds nothing in need not be decoded.
+        None if there are no keywords or one of them is not ASCII.
+        """
+        terms = list(self._term_index)
+        if not terms or not all(t.isascii() for t in terms):
+            return None
+        # str \s also matches \x1c-\x1f, bytes \s does not
+        pattern = _trie_pattern(terms, lambda ch: r"[\s\x1c-\x1f]+" if ch == " " else re.escape(ch))
+        return re.compile(pattern.encode("ascii"))
+
+
+@lru_cache(maxsize=32)
+def compile_keywords(keywords: Tuple[str, ...], word_boundary: bool = False) -> KeywordMatcher:
+    return KeywordMatcher(keywords, word_boundary=word_boundary)
@@ -0,0 +1,162 @@
+# mercurial/ranker/multi_ranker.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .. import instrument
+from ..columnar import PaperBatch
+from ..profiles import Profile
+from ..types import Paper, RankedPaper
+from .batch_ranker import recency_array, top_k_indices
+from .matcher import compile_keywords
+from .simple_ranker import RankerConfig
+
+
+@dataclass(frozen=True)
+class ProfileScores:
+    """Per-(paper, profile) score components; column j belongs to names[j]."""
+    names: List[str]
+    keywords: List[str]         # union of all profiles' keywords (matcher order)
+    membership: np.ndarray      # int32 (n_keywords, n_profiles): times keyword k is listed by profile j
+    title_hits: np.ndarray      # int32 (n, n_profiles)
+    abstract_hits: np.ndarray   # int32 (n, n_profiles)
+    eligible: np.ndarray        # bool  (n, n_profiles)
+    hours_ago: np.ndarray       # float64 (n,)
+    recency: np.ndarray         # float64 (n,)
+    cat_bonus: np.ndarray       # float64 (n,)
+    kw_score: np.ndarray        # float64 (n, n_profiles)
+    score: np.ndarray           # float64 (n, n_profiles)
+    updated: np.ndarray         # datetime64[us] (n,)
+
+
+def keyword_membership(groups: Sequence[Profile]) -> Tuple[List[str], np.ndarray]:
+    """Union of the groups' keywords (first-seen order) and the keyword x profile membership counts."""
+    keywords: List[str] = list(dict.fromkeys(kw for g in groups for kw in g.keywords))
+    pos = {kw: i for i, kw in enumerate(keywords)}
+    membership = np.zeros((len(keywords), len(groups)), dtype=np.int32)
+    for j, g in enumerate(groups):
+        for kw in g.keywords:
+            membership[pos[kw], j] += 1
+    return keywords, membership
+
+
+def _hit_counts(texts: Sequence[str], matcher, membership: np.ndarray) -> np.ndarray:
+    # one scan per text against the combined keyword set; hits are spread to
+    # profiles through the membership matrix
+    rows: List[int] = []
+    cols: List[int] = []
+    for i, t in enumerate(texts):
+        idx = matcher.match_indices(t)
+        if idx:
+            rows.extend([i] * len(idx))
+            cols.extend(idx)
+    counts = np.zeros((len(texts), membership.shape[1]), dtype=np.int32)
+    if rows:
+        np.add.at(counts, np.asarray(rows, dtype=np.intp), membership[np.asarray(cols, dtype=np.intp)])
+    return counts
+
+
+def score_profiles(
+    papers: PaperBatch,
+    groups: Sequence[Profile],
+    cfg: RankerConfig,
+    now: datetime | None = None,
+) -> ProfileScores:
+    """
+    Match every paper once against the union of the groups' keywords, then
+    score it for each group with the usual formula using only that group's
+    keywords (cfg supplies weights, decay and bonus categories; cfg.keywords
+    is ignored).
+
+    A paper is eligible for a group if it hits one of the group's keywords (if
+    it has any) and is listed in one of its categories (if it has any), i.e.
+    what the group's own arXiv query would return; serve's feeds filter the same way.
+    """
+    now = now or datetime.utcnow()
+    n = len(papers)
+    keywords, membership = keyword_membership(groups)
+    matcher = compile_keywords(tuple(keywords), cfg.word_boundary)
+    instrument.count("rank.papers_scored", n)
+    instrument.count("rank.keyword_comparisons", 2 * n * len(keywords))
+
+    title_hits = _hit_counts(papers.titles, matcher, membership)
+    abstract_hits = _hit_counts(papers.abstracts, matcher, membership)
+
+    eligible = (title_hits + abstract_hits) > 0
+    for j, g in enumerate(groups):
+        if not g.keywords:
+            eligible[:, j] = True
+        if g.arxiv_categories:
+            eligible[:, j] &= papers.has_any_category(g.arxiv_categories)
+
+    updated = papers.updated.astype("datetime64[us]")
+    hours_ago = np.maximum((np.datetime64(now, "us") - updated) / np.timedelta64(1, "h"), 0.0)
+    recency = recency_array(hours_ago, cfg.recency_half_life_hours)
+    cat_bonus = np.where(papers.has_any_category(cfg.bonus_categories), cfg.category_bonus, 0.0)
+
+    kw_score = cfg.title_weight * title_hits + cfg.abstract_weight * abstract_hits
+    score = kw_score * recency[:, None] + cat_bonus[:, None]
+
+    return ProfileScores(
+        names=[g.name for g in groups],
+        keywords=keywords,
+        membership=membership,
+        title_hits=title_hits,
+        abstract_hits=abstract_hits,
+        eligible=eligible,
+        hours_ago=hours_ago,
+        recency=recency,
+        cat_bonus=cat_bonus,
+        kw_score=kw_score,
+        score=score,
+        updated=updated,
+    )
+
+
+def _ranked(p: Paper, s: ProfileScores, matcher, i: int, j: int) -> RankedPaper:
+    own = s.membership[:, j]
+    hits = [s.keywords[k] for k in matcher.match_indices(p.title) + matcher.match_indices(p.abstract) if own[k]]
+    return RankedPaper(
+        paper=p,
+        score=float(s.score[i, j]),
+        matched_keywords=list(dict.fromkeys(hits)),
+        score_breakdown={
+            "kw_score": float(s.kw_score[i, j]),
+            "recency": float(s.recency[i]),
+            "cat_bonus": float(s.cat_bonus[i]),
+            "hours_ago": float(s.hours_ago[i]),
+        },
+    )
+
+
+def rank_by_profile(
+    papers: Sequence[Paper] | PaperBatch,
+    groups: Sequence[Profile],
+    cfg: RankerConfig,
+    k: Optional[int] = None,
+    now: datetime | None = None,
+) -> Dict[str, List[RankedPaper]]:
+    """
+    Rank one fetched window for several profiles in a single pass. Returns
+    {profile name: its top-k}, in group order; each list is ordered like
+    rank_papers run with that profile's keywords over its eligible papers.
+    """
+    if not isinstance(papers, PaperBatch):
+        papers = PaperBatch.from_papers(papers)
+
+    with instrument.span("rank.score"):
+        s = score_profiles(papers, groups, cfg, now=now)
+
+    matcher = compile_keywords(tuple(s.keywords), cfg.word_boundary)
+    out: Dict[str, List[RankedPaper]] = {}
+    for j, name in enumerate(s.names):
+        with instrument.span("rank.top_k"):
+            cand = np.nonzero(s.eligible[:, j])[0]
+            top = cand[top_k_indices(s.score[cand, j], s.updated[cand], k)]
+        with instrument.span("rank.materialize"):
+            out[name] = [_ranked(papers[int(i)], s, matcher, int(i), j) for i in top]
+    return out
@@ -0,0 +1,216 @@
+# mercurial/ranker/score_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .. import instrument
+from ..columnar import PaperBatch
+from ..config import data_dir
+from ..types import Paper, RankedPaper
+from .batch_ranker import BatchScores, _ranked, combine, top_k_indices
+from .simple_ranker import RankerConfig
+
+
+# bump when matching semantics change so old cached hit counts are not reused
+MATCHER_VERSION = 1
+
+# prune() keeps this many recently used configs besides the current one, so
+# switching between a few profile selections does not start over each time
+KEEP_RECENT_CONFIGS = 8
+
+SCHEMA = """
+-- recency-independent score parts per (config fingerprint, paper version)
+CREATE TABLE IF NOT EXISTS scores (
+    fingerprint   TEXT    NOT NULL,
+    arxiv_id      TEXT    NOT NULL,
+    version       INTEGER NOT NULL,
+    title_hits    INTEGER NOT NULL,
+    abstract_hits INTEGER NOT NULL,
+    bonus         INTEGER NOT NULL,
+    PRIMARY KEY (fingerprint, arxiv_id, version)
+) WITHOUT ROWID;
+
+-- when each config fingerprint was last looked up (for prune)
+CREATE TABLE IF NOT EXISTS configs (
+    fingerprint TEXT PRIMARY KEY,
+    last_used   TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def default_score_cache_path() -> Path:
+    return data_dir() / "scores.db"
+
+
+def config_fingerprint(cfg: RankerConfig) -> str:
+    """
+    Hash of everything that decides keyword hits and the bonus flag. Weights,
+    half-life and the bonus amount are applied after the lookup, so changing
+    them keeps the cache valid.
+    """
+    key = {
+        "matcher": MATCHER_VERSION,
+        "keywords": list(cfg.keywords),
+        "word_boundary": cfg.word_boundary,
+        "bonus_categories": sorted(cfg.bonus_categories),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class ScoreCache:
+    """SQLite memo of per-version keyword hit counts and bonus flags."""
+
+    def __init__(self, path: Path | str | None = None):
+        self.path = Path(path) if path is not None else default_score_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ScoreCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def lookup(
+        self, fingerprint: str, arxiv_ids: Sequence[str], versions: Sequence[int]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(title_hits, abstract_hits, bonus_flag, found) arrays aligned with arxiv_ids."""
+        n = len(arxiv_ids)
+        title_hits = np.zeros(n, dtype=np.int32)
+        abstract_hits = np.zeros(n, dtype=np.int32)
+        bonus = np.zeros(n, dtype=bool)
+        found = np.zeros(n, dtype=bool)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO configs (fingerprint, last_used) VALUES (?, ?)",
+                (fingerprint, datetime.utcnow().isoformat()),
+            )
+        if n == 0:
+            return title_hits, abstract_hits, bonus, found
+
+        self.conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS _want (pos INTEGER PRIMARY KEY, arxiv_id TEXT, version INTEGER)"
+        )
+        self.conn.execute("DELETE FROM _want")
+        self.conn.executemany(
+            "INSERT INTO _want (pos, arxiv_id, version) VALUES (?, ?, ?)",
+            zip(range(n), arxiv_ids, (int(v) for v in versions)),
+        )
+        for pos, th, ah, b in self.conn.execute(
+            "SELECT w.pos, s.title_hits, s.abstract_hits, s.bonus FROM _want w "
+            "JOIN scores s ON s.fingerprint = ? AND s.arxiv_id = w.arxiv_id AND s.version = w.version",
+            (fingerprint,),
+        ):
+            title_hits[pos] = th
+            abstract_hits[pos] = ah
+            bonus[pos] = bool(b)
+            found[pos] = True
+        return title_hits, abstract_hits, bonus, found
+
+    def put(self, fingerprint: str, rows: Sequence[Tuple[str, int, int, int, bool]]) -> None:
+        """rows: (arxiv_id, version, title_hits, abstract_hits, bonus)."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO scores "
+                "(fingerprint, arxiv_id, version, title_hits, abstract_hits, bonus) VALUES (?, ?, ?, ?, ?, ?)",
+                [(fingerprint, a, int(v), int(th), int(ah), int(b)) for a, v, th, ah, b in rows],
+            )
+
+    def prune(self, keep_fingerprint: str, keep_recent: int = 0) -> int:
+        """
+        Drop entries of every other config except the `keep_recent` most
+        recently looked up ones. Returns rows removed.
+        """
+        keep = {keep_fingerprint}
+        keep.update(
+            fp
+            for (fp,) in self.conn.execute(
+                "SELECT fingerprint FROM configs WHERE fingerprint != ? ORDER BY last_used DESC LIMIT ?",
+                (keep_fingerprint, keep_recent),
+            )
+        )
+        marks = ",".join("?" * len(keep))
+        with self.conn:
+            cur = self.conn.execute(f"DELETE FROM scores WHERE fingerprint NOT IN ({marks})", tuple(keep))
+            self.conn.execute(f"DELETE FROM configs WHERE fingerprint NOT IN ({marks})", tuple(keep))
+        return cur.rowcount
+
+
+def score_cached(
+    papers: Sequence[Paper] | PaperBatch,
+    cfg: RankerConfig,
+    cache: ScoreCache,
+    now: datetime | None = None,
+) -> BatchScores:
+    """
+    Same BatchScores as batch_ranker.score_batch, but keyword hits and the bonus
+    flag come from the cache where (arxiv_id, version, config) was seen before;
+    only new papers and new versions are matched (and then cached). Recency is
+    always recomputed for `now`.
+    """
+    now = now or datetime.utcnow()
+    batch = papers if isinstance(papers, PaperBatch) else PaperBatch.from_papers(papers)
+    fp = config_fingerprint(cfg)
+
+    title_hits, abstract_hits, bonus_flag, found = cache.lookup(fp, batch.arxiv_ids, batch.versions)
+    missing = np.nonzero(~found)[0]
+    instrument.count("rank.score_cache_hits", len(batch) - len(missing))
+    instrument.count("rank.score_cache_misses", len(missing))
+
+    if len(missing):
+        matcher = cfg.matcher()
+        instrument.count("rank.papers_scored", len(missing))
+        instrument.count("rank.keyword_comparisons", 2 * len(missing) * len(matcher.keywords))
+        bonus_all = batch.has_any_category(cfg.bonus_categories)
+        rows = []
+        for i in missing:
+            i = int(i)
+            th = len(matcher.match_indices(batch.titles[i]))
+            ah = len(matcher.match_indices(batch.abstracts[i]))
+            title_hits[i], abstract_hits[i], bonus_flag[i] = th, ah, bonus_all[i]
+            rows.append((batch.arxiv_ids[i], int(batch.versions[i]), th, ah, bool(bonus_all[i])))
+        cache.put(fp, rows)
+
+    updated = batch.updated.astype("datetime64[us]")
+    hours_ago = np.maximum((np.datetime64(now, "us") - updated) / np.timedelta64(1, "h"), 0.0)
+    kw_score, recency, cat_bonus, score = combine(title_hits, abstract_hits, hours_ago, bonus_flag, cfg)
+    return BatchScores(
+        title_hits=title_hits,
+        abstract_hits=abstract_hits,
+        hours_ago=hours_ago,
+        bonus_flag=bonus_flag,
+        kw_score=kw_score,
+        recency=recency,
+        cat_bonus=cat_bonus,
+        score=score,
+        updated=updated,
+    )
+
+
+def rank_cached(
+    papers: Sequence[Paper] | PaperBatch,
+    cfg: RankerConfig,
+    cache: ScoreCache,
+    k: Optional[int] = None,
+    now: datetime | None = None,
+) -> List[RankedPaper]:
+    """rank_top_k backed by the score cache: matching cost scales with new/changed papers only."""
+    with instrument.span("rank.score"):
+        s = score_cached(papers, cfg, cache, now=now)
+    with instrument.span("rank.top_k"):
+        top = top_k_indices(s.score, s.updated, k)
+    with instrument.span("rank.materialize"):
+        return [_ranked(papers[int(i)], cfg, s, int(i)) for i in top]
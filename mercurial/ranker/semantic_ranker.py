@@ -0,0 +1,458 @@
+# mercurial/ranker/semantic_ranker.py
+from __future__ import annotations
+
+import math
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .. import instrument
+from ..columnar import PaperBatch
+from ..config import data_dir
+from ..types import Paper, RankedPaper
+from .batch_ranker import recency_array, top_k_indices
+from .index_ranker import tokenize
+from .simple_ranker import RankerConfig
+
+
+# "More like this" ranking, fully offline:
+#   1. hashed TF-IDF: tokens are hashed (crc32, stable across runs) into a
+#      2^20 term-id space; document frequencies are counted per term id over
+#      the corpus; the sublinear tf * idf weights are then folded into `dim`
+#      columns with a sign hash (a count-sketch projection, which preserves
+#      dot products in expectation), L2-normalised and stored as float16.
+#   2. random-hyperplane LSH over those vectors: `tables` tables of `bits`-bit
+#      signatures; a query (plus one-bit-flip probes) only scores papers that
+#      share a bucket with it in at least one table.
+#
+# A SemanticIndex keeps term counts, document frequencies, vectors and LSH
+# signatures per (arxiv_id, version) in data/semantic/, so a query only
+# tokenizes and embeds papers it has not seen and probes the saved buckets.
+# New papers are embedded with the idf of the moment; once the corpus has grown
+# by REEMBED_GROWTH every vector is recomputed from the stored term counts
+# (no re-tokenizing) and the LSH tables are rebuilt for the new size.
+HASH_BITS = 20
+HASH_SPACE = 1 << HASH_BITS
+SEMANTIC_VERSION = 1
+REEMBED_GROWTH = 2.0
+
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by can do for from has have in into is it its of on or our "
+    "such that the their then there these this to was we were which while with".split()
+)
+
+@lru_cache(maxsize=1 << 16)
+def _term_id(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8")) & (HASH_SPACE - 1)
+
+
+class HashedTfidf:
+    """Hashed TF-IDF vectorizer; fit() counts document frequencies, transform() embeds."""
+
+    def __init__(self, dim: int = 512, title_weight: float = 2.0):
+        if dim & (dim - 1) or not 16 <= dim <= 1 << 16:
+            raise ValueError(f"dim must be a power of two between 16 and 65536, got {dim}")
+        self.dim = dim
+        self.title_weight = title_weight
+        self.df = np.zeros(HASH_SPACE, dtype=np.int32)
+        self.n_docs = 0
+
+    def term_counts(self, title: str, abstract: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(unique term ids, term frequencies) of one paper; title tokens count title_weight times."""
+        counts: Dict[int, float] = {}
+        for weight, text in ((self.title_weight, title), (1.0, abstract)):
+            for tok in tokenize(text):
+                if len(tok) < 2 or tok in _STOPWORDS:
+                    continue
+                tid = _term_id(tok)
+                counts[tid] = counts.get(tid, 0.0) + weight
+        ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        return ids, tf
+
+    def fit(self, docs: Sequence[Tuple[np.ndarray, np.ndarray]], chunk: int = 4096) -> "HashedTfidf":
+        for lo in range(0, len(docs), chunk):
+            ids = [ids for ids, _ in docs[lo:lo + chunk]]
+            if ids:
+                self.df += np.bincount(np.concatenate(ids), minlength=HASH_SPACE).astype(np.int32)
+        self.n_docs += len(docs)
+        return self
+
+    def idf(self) -> np.ndarray:
+        return np.log((1.0 + self.n_docs) / (1.0 + self.df)) + 1.0
+
+    def transform(self, docs: Sequence[Tuple[np.ndarray, np.ndarray]], chunk: int = 4096) -> np.ndarray:
+        """float16 matrix (len(docs), dim) of L2-normalised vectors."""
+        idf = self.idf()
+        out = np.zeros((len(docs), self.dim), dtype=np.float16)
+        for lo in range(0, len(docs), chunk):
+            part = docs[lo:lo + chunk]
+            lens = np.fromiter((len(ids) for ids, _ in part), dtype=np.int64, count=len(part))
+            if not lens.sum():
+                continue
+            ids = np.concatenate([ids for ids, _ in part])
+            tf = np.concatenate([tf for _, tf in part])
+            rows = np.repeat(np.arange(len(part), dtype=np.int64), lens)
+            # low bits pick the column, the top bit the sign
+            sign = 1.0 - 2.0 * ((ids >> (HASH_BITS - 1)) & 1)
+            w = sign * (1.0 + np.log(tf)) * idf[ids]
+            m = np.bincount(rows * self.dim + (ids & (self.dim - 1)), weights=w, minlength=len(part) * self.dim)
+            m = m.reshape(len(part), self.dim)
+            norms = np.linalg.norm(m, axis=1, keepdims=True)
+            out[lo:lo + len(part)] = m / np.where(norms > 0, norms, 1.0)
+        return out
+
+
+class LSHIndex:
+    """
+    Random-hyperplane LSH over unit vectors. Each table stores its signatures
+    sorted, so a bucket lookup is a binary search and no per-bucket Python
+    objects are kept. Rows are added incrementally (merged into the sorted
+    tables); the hyperplanes depend only on (dim, bits, tables, seed).
+    """
+
+    def __init__(self, dim: int, bits: int, tables: int = 16, seed: int = 0):
+        self.bits = bits
+        self.tables = tables
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((tables * bits, dim)).astype(np.float32)
+        self._weights = (1 << np.arange(bits, dtype=np.int64))
+        self.order = np.empty((tables, 0), dtype=np.int64)
+        self.sorted_codes = np.empty((tables, 0), dtype=np.int64)
+
+    @staticmethod
+    def bits_for(n: int) -> int:
+        # ~32 papers per bucket on average
+        return int(min(20, max(1, round(math.log2(max(n, 2) / 32)))))
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, tables: int = 16, bits: Optional[int] = None, seed: int = 0) -> "LSHIndex":
+        index = cls(vectors.shape[1], bits or cls.bits_for(len(vectors)), tables, seed)
+        index.add(vectors, 0)
+        return index
+
+    def __len__(self) -> int:
+        return self.order.shape[1]
+
+    def add(self, vectors: np.ndarray, first_row: int) -> None:
+        """Index `vectors` as rows first_row, first_row + 1, ..."""
+        if not len(vectors):
+            return
+        codes = self.signatures(vectors)
+        rows = np.arange(first_row, first_row + len(vectors), dtype=np.int64)
+        order, sorted_codes = [], []
+        for t in range(self.tables):
+            new = np.argsort(codes[:, t], kind="stable")
+            at = np.searchsorted(self.sorted_codes[t], codes[new, t], side="right")
+            order.append(np.insert(self.order[t], at, rows[new]))
+            sorted_codes.append(np.insert(self.sorted_codes[t], at, codes[new, t]))
+        self.order = np.stack(order)
+        self.sorted_codes = np.stack(sorted_codes)
+
+    def signatures(self, vectors: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        out = np.empty((len(vectors), self.tables), dtype=np.int64)
+        for lo in range(0, len(vectors), chunk):
+            x = vectors[lo:lo + chunk].astype(np.float32)
+            above = (x @ self.planes.T > 0).reshape(len(x), self.tables, self.bits)
+            out[lo:lo + len(x)] = above @ self._weights
+        return out
+
+    def candidates(self, queries: np.ndarray, multiprobe: bool = True) -> np.ndarray:
+        """Sorted unique row ids sharing a bucket with any query (or a one-bit neighbour of it) in any table."""
+        codes = self.signatures(queries)
+        flips = np.concatenate(([0], self._weights)) if multiprobe else np.zeros(1, dtype=np.int64)
+        found: List[np.ndarray] = []
+        for t in range(self.tables):
+            probe = np.unique((codes[:, t, None] ^ flips[None, :]).ravel())
+            lo = np.searchsorted(self.sorted_codes[t], probe, side="left")
+            hi = np.searchsorted(self.sorted_codes[t], probe, side="right")
+            for a, b in zip(lo, hi):
+                if b > a:
+                    found.append(self.order[t, a:b])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+
+def default_semantic_dir() -> Path:
+    return data_dir() / "semantic"
+
+
+def semantic_path(dim: int, title_weight: float) -> Path:
+    return default_semantic_dir() / f"tfidf-{dim}-tw{title_weight:g}.npz"
+
+
+class SemanticIndex:
+    """
+    Hashed TF-IDF vectors and LSH signatures for every paper version seen,
+    saved to `path` (None: in memory only). update() embeds only new papers or
+    new versions; a replaced version's row stays behind as dead until the next
+    full re-embed compacts it away. With lsh=False no LSH tables are kept and
+    only exact scans are possible.
+    """
+
+    def __init__(
+        self, dim: int = 512, title_weight: float = 2.0, path: Path | str | None = None, lsh: bool = True
+    ):
+        self.vec = HashedTfidf(dim=dim, title_weight=title_weight)
+        self.path = Path(path) if path is not None else None
+        self.arxiv_ids: List[str] = []
+        self.versions = np.empty(0, dtype=np.int32)
+        self.live = np.empty(0, dtype=bool)
+        self.term_ids = np.empty(0, dtype=np.int32)       # CSR term counts per row
+        self.tfs = np.empty(0, dtype=np.float32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.vectors = np.empty((0, dim), dtype=np.float16)
+        self.use_lsh = lsh
+        self.lsh: Optional[LSHIndex] = None
+        self.embedded_docs = 0                             # n_docs at the last full re-embed
+        self.row_of: Dict[str, int] = {}
+        self.dirty = False
+
+    @classmethod
+    def open(cls, dim: int = 512, title_weight: float = 2.0, path: Path | str | None = None) -> "SemanticIndex":
+        """The saved index for (dim, title_weight), or an empty one."""
+        path = Path(path) if path is not None else semantic_path(dim, title_weight)
+        index = cls(dim, title_weight, path)
+        if not path.exists():
+            return index
+        with np.load(path, allow_pickle=False) as z:
+            version, n_docs, embedded_docs, bits = (int(x) for x in z["meta"])
+            if version != SEMANTIC_VERSION or z["vectors"].shape[1] != dim:
+                return index
+            index.vec.df = z["df"]
+            index.vec.n_docs = n_docs
+            index.embedded_docs = embedded_docs
+            index.arxiv_ids = [str(a) for a in z["arxiv_ids"]]
+            index.versions = z["versions"]
+            index.live = z["live"]
+            index.term_ids, index.tfs, index.offsets = z["term_ids"], z["tfs"], z["offsets"]
+            index.vectors = z["vectors"]
+            if bits:
+                index.lsh = LSHIndex(dim, bits)
+                index.lsh.order, index.lsh.sorted_codes = z["lsh_order"], z["lsh_codes"]
+        index.row_of = {a: i for i, a in enumerate(index.arxiv_ids) if index.live[i]}
+        return index
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp.npz")
+        lsh = self.lsh
+        np.savez(
+            tmp,
+            meta=np.array([SEMANTIC_VERSION, self.vec.n_docs, self.embedded_docs, lsh.bits if lsh else 0]),
+            df=self.vec.df,
+            arxiv_ids=np.array(self.arxiv_ids, dtype=str) if self.arxiv_ids else np.empty(0, dtype=str),
+            versions=self.versions,
+            live=self.live,
+            term_ids=self.term_ids,
+            tfs=self.tfs,
+            offsets=self.offsets,
+            vectors=self.vectors,
+            lsh_order=lsh.order if lsh else np.empty((0, 0), dtype=np.int64),
+            lsh_codes=lsh.sorted_codes if lsh else np.empty((0, 0), dtype=np.int64),
+        )
+        tmp.replace(self.path)
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    def _docs(self, rows: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+        off = self.offsets
+        return [(self.term_ids[off[r]:off[r + 1]].astype(np.int64), self.tfs[off[r]:off[r + 1]]) for r in rows]
+
+    def update(
+        self, arxiv_ids: Sequence[str], versions: Sequence[int], titles: Sequence[str], abstracts: Sequence[str]
+    ) -> np.ndarray:
+        """Row of every given paper, embedding (and indexing) the ones not seen at this version."""
+        rows = np.empty(len(arxiv_ids), dtype=np.int64)
+        new: List[int] = []
+        replaced: List[int] = []
+        pending: Dict[str, int] = {}
+        for i, (a, v) in enumerate(zip(arxiv_ids, versions)):
+            r = self.row_of.get(a)
+            if r is not None and int(self.versions[r]) == int(v):
+                rows[i] = r
+            elif a in pending:
+                rows[i] = -1 - pending[a]                   # duplicate in this call: resolved below
+            else:
+                pending[a] = len(new)
+                new.append(i)
+                if r is not None:
+                    replaced.append(r)
+        if not new:
+            return rows
+
+        with instrument.span("rank.embed"):
+            docs = [self.vec.term_counts(titles[i], abstracts[i]) for i in new]
+        instrument.count("rank.papers_embedded", len(new))
+        if replaced:
+            old = self._docs(np.asarray(replaced))
+            self.vec.df -= np.bincount(np.concatenate([ids for ids, _ in old]), minlength=HASH_SPACE).astype(np.int32)
+            self.live[replaced] = False
+        self.vec.fit(docs)
+        self.vec.n_docs -= len(replaced)
+
+        first = len(self.arxiv_ids)
+        lens = np.fromiter((len(ids) for ids, _ in docs), dtype=np.int64, count=len(docs))
+        self.arxiv_ids.extend(arxiv_ids[i] for i in new)
+        self.versions = np.concatenate([self.versions, np.asarray([versions[i] for i in new], dtype=np.int32)])
+        self.live = np.concatenate([self.live, np.ones(len(new), dtype=bool)])
+        self.term_ids = np.concatenate([self.term_ids] + [ids.astype(np.int32) for ids, _ in docs])
+        self.tfs = np.concatenate([self.tfs] + [tf.astype(np.float32) for _, tf in docs])
+        self.offsets = np.concatenate([self.offsets, self.offsets[-1] + np.cumsum(lens)])
+        for j, i in enumerate(new):
+            self.row_of[arxiv_ids[i]] = first + j
+        dup = rows < 0
+        rows[dup] = first - 1 - rows[dup]
+        rows[new] = first + np.arange(len(new))
+
+        if not self.embedded_docs or self.vec.n_docs >= REEMBED_GROWTH * self.embedded_docs:
+            rows = self._reembed(rows)
+        else:
+            with instrument.span("rank.embed"):
+                vectors = self.vec.transform(docs)
+            self.vectors = np.concatenate([self.vectors, vectors])
+            if self.lsh is not None:
+                with instrument.span("rank.lsh_build"):
+                    self.lsh.add(vectors, first)
+        self.dirty = True
+        return rows
+
+    def _reembed(self, rows: np.ndarray) -> np.ndarray:
+        """Drop dead rows, re-embed everything with the current idf and rebuild the LSH tables."""
+        keep = np.nonzero(self.live)[0]
+        remap = np.full(len(self.live), -1, dtype=np.int64)
+        remap[keep] = np.arange(len(keep))
+        docs = self._docs(keep)
+        off = np.zeros(len(keep) + 1, dtype=np.int64)
+        off[1:] = np.cumsum([len(ids) for ids, _ in docs])
+        self.term_ids = np.concatenate([np.empty(0, dtype=np.int32)] + [ids.astype(np.int32) for ids, _ in docs])
+        self.tfs = np.concatenate([np.empty(0, dtype=np.float32)] + [tf for _, tf in docs])
+        self.offsets = off
+        self.arxiv_ids = [self.arxiv_ids[r] for r in keep]
+        self.versions = self.versions[keep]
+        self.live = np.ones(len(keep), dtype=bool)
+        self.row_of = {a: i for i, a in enumerate(self.arxiv_ids)}
+        with instrument.span("rank.embed"):
+            self.vectors = self.vec.transform(docs)
+        if self.use_lsh:
+            with instrument.span("rank.lsh_build"):
+                self.lsh = LSHIndex.build(self.vectors)
+        self.embedded_docs = self.vec.n_docs
+        instrument.count("rank.semantic_reembeds")
+        return remap[rows]
+
+
+def _texts(papers: Sequence[Paper] | PaperBatch) -> Tuple[Sequence[str], Sequence[str]]:
+    if isinstance(papers, PaperBatch):
+        return papers.titles, papers.abstracts
+    return [p.title for p in papers], [p.abstract for p in papers]
+
+
+def rank_similar(
+    papers: Sequence[Paper] | PaperBatch,
+    seeds: Sequence[Paper],
+    cfg: RankerConfig,
+    k: Optional[int] = None,
+    now: datetime | None = None,
+    dim: int = 512,
+    exact: Optional[bool] = None,
+    exact_below: int = 20_000,
+    index: Optional[SemanticIndex] = None,
+) -> List[RankedPaper]:
+    """
+    Rank `papers` by cosine similarity to the closest seed paper, decayed by
+    recency: score = similarity * recency. Seeds themselves are not returned.
+
+    With a persisted `index` (see SemanticIndex.open) papers and seeds are
+    embedded only if the index has not seen them at this version, document
+    frequencies cover everything the index holds, and candidates are looked
+    up through its saved LSH tables unless `exact` (default: only for windows
+    smaller than `exact_below`, where a full scan is cheaper). LSH trades
+    recall for speed: papers only weakly similar to every seed may be missed.
+    Without one, everything is embedded in memory and scanned exactly.
+    Matched keywords are still reported for the returned papers.
+    """
+    now = now or datetime.utcnow()
+    n = len(papers)
+    if n == 0 or not seeds:
+        return []
+
+    if index is None:
+        index = SemanticIndex(dim, cfg.title_weight / max(cfg.abstract_weight, 1e-9), lsh=False)
+    titles, abstracts = _texts(papers)
+    if isinstance(papers, PaperBatch):
+        ids, versions = papers.arxiv_ids, papers.versions
+    else:
+        ids, versions = [p.arxiv_id for p in papers], [p.version for p in papers]
+    index.update(ids, versions, titles, abstracts)
+    seed_rows = index.update(
+        [s.arxiv_id for s in seeds], [s.version for s in seeds], [s.title for s in seeds], [s.abstract for s in seeds]
+    )
+    # re-read: a full re-embed during the seeds' update renumbers rows
+    rows = np.fromiter((index.row_of[a] for a in ids), dtype=np.int64, count=n)
+    index.save()
+    queries = index.vectors[seed_rows].astype(np.float32)
+
+    if exact is None:
+        exact = index.lsh is None or n < exact_below
+    if exact:
+        cand = np.arange(n)
+    else:
+        pos = np.full(len(index.vectors), -1, dtype=np.int64)
+        pos[rows] = np.arange(n)
+        with instrument.span("rank.lsh_query"):
+            cand = pos[index.lsh.candidates(queries)]
+        cand = np.sort(cand[cand >= 0])
+    cand = cand[~np.isin(rows[cand], seed_rows)]
+    instrument.count("rank.papers_scored", len(cand))
+    corpus = index.vectors
+
+    with instrument.span("rank.score"):
+        sim = np.zeros(len(cand), dtype=np.float64)
+        for lo in range(0, len(cand), 65536):
+            block = corpus[rows[cand[lo:lo + 65536]]].astype(np.float32) @ queries.T
+            sim[lo:lo + len(block)] = block.max(axis=1)
+        keep = sim > 0
+        cand, sim = cand[keep], sim[keep]
+
+        if isinstance(papers, PaperBatch):
+            updated = papers.updated[cand].astype("datetime64[us]")
+        else:
+            updated = np.array([papers[int(i)].updated_at for i in cand], dtype="datetime64[us]")
+        hours_ago = np.maximum((np.datetime64(now, "us") - updated) / np.timedelta64(1, "h"), 0.0)
+        recency = recency_array(hours_ago, cfg.recency_half_life_hours)
+        score = sim * recency
+
+    matcher = cfg.matcher()
+    out: List[RankedPaper] = []
+    with instrument.span("rank.top_k"):
+        top = top_k_indices(score, updated, k)
+    with instrument.span("rank.materialize"):
+        for j in top:
+            j = int(j)
+            p = papers[int(cand[j])]
+            out.append(
+                RankedPaper(
+                    paper=p,
+                    score=float(score[j]),
+                    matched_keywords=list(dict.fromkeys(matcher.hits(p.title) + matcher.hits(p.abstract))),
+                    score_breakdown={
+                        "kw_score": 0.0,
+                        "similarity": float(sim[j]),
+                        "recency": float(recency[j]),
+                        "cat_bonus": 0.0,
+                        "hours_ago": float(hours_ago[j]),
+                    },
+                )
+            )
+    return out
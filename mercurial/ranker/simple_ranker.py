@@ -2,30 +2,17 @@
 from __future__ import annotations
 
 import math
-import re
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Iterable, List, Tuple
 
+from .. import instrument
 from ..types import Paper, RankedPaper
+from .matcher import KeywordMatcher, compile_keywords
 
 
-def _normalize(text: str) -> str:
-    # lower + collapse spaces
-    return re.sub(r"\s+", " ", (text or "").lower()).strip()
-
-
-def _keyword_hits(text: str, keywords: Iterable[str]) -> List[str]:
-    t = _normalize(text)
-    hits = []
-    for kw in keywords:
-        k = _normalize(kw)
-        if not k:
-            continue
-        # TODO： update to token/regex
-        if k in t:
-            hits.append(kw)
-    return hits
+def _keyword_hits(text: str, keywords: Iterable[str], word_boundary: bool = False) -> List[str]:
+    return compile_keywords(tuple(keywords), word_boundary).hits(text)
 
 
 def _hours_ago(now: datetime, past: datetime) -> float:
@@ -47,6 +34,7 @@ class RankerConfig:
     abstract_weight: float = 1.0
     recency_half_life_hours: float = 48.0
     category_bonus: float = 0.2
+    word_boundary: bool = False
     bonus_categories: Tuple[str, ...] = (
         # TODO: modify according to personal interest
         "cs.AI", "cs.LG", "cs.CL", "cs.CV", "cs.RO",
@@ -54,49 +42,71 @@ class RankerConfig:
         "stat.ML", "math.OC", "eess.SY",
     )
 
+    @classmethod
+    def from_settings(cls, s) -> "RankerConfig":
+        return cls(
+            keywords=s.keywords,
+            title_weight=getattr(s, "kw_title_weight", 3.0),
+            abstract_weight=getattr(s, "kw_abstract_weight", 1.0),
+            recency_half_life_hours=getattr(s, "recency_half_life_hours", 48.0),
+            category_bonus=getattr(s, "category_bonus", 0.2),
+            word_boundary=getattr(s, "kw_word_boundary", False),
+        )
+
+    def matcher(self) -> KeywordMatcher:
+        # compiled once per distinct keyword set and cached
+        return compile_keywords(tuple(self.keywords), self.word_boundary)
+
 
 def rank_papers(papers: List[Paper], cfg: RankerConfig, now: datetime | None = None) -> List[RankedPaper]:
     now = now or datetime.utcnow()
 
     ranked: List[RankedPaper] = []
-
-    for p in papers:
-        title_hits = _keyword_hits(p.title, cfg.keywords)
-        abs_hits = _keyword_hits(p.abstract, cfg.keywords)
-
-        uniq_hits = []
-        seen = set()
-        for k in title_hits + abs_hits:
-            if k not in seen:
-                uniq_hits.append(k)
-                seen.add(k)
-
-        kw_score = cfg.title_weight * len(title_hits) + cfg.abstract_weight * len(abs_hits)
-
-        hrs = _hours_ago(now, p.updated_at)
-        recency = _recency_score(hrs, cfg.recency_half_life_hours)
-
-        cat_bonus = 0.0
-        if any(c in cfg.bonus_categories for c in p.categories):
-            cat_bonus = cfg.category_bonus
-
-        score = kw_score * recency + cat_bonus
-
-        breakdown = {
-            "kw_score": float(kw_score),
-            "recency": float(recency),
-            "cat_bonus": float(cat_bonus),
-            "hours_ago": float(hrs),
-        }
-
-        ranked.append(
-            RankedPaper(
-                paper=p,
-                score=float(score),
-                matched_keywords=uniq_hits,
-                score_breakdown=breakdown,
+    matcher = cfg.matcher()
+
+    with instrument.span("rank.score"):
+        for p in papers:
+            title_hits = matcher.hits(p.title)
+            abs_hits = matcher.hits(p.abstract)
+
+            uniq_hits = []
+            seen = set()
+            for k in title_hits + abs_hits:
+                if k not in seen:
+                    uniq_hits.append(k)
+                    seen.add(k)
+
+            kw_score = cfg.title_weight * len(title_hits) + cfg.abstract_weight * len(abs_hits)
+
+            hrs = _hours_ago(now, p.updated_at)
+            recency = _recency_score(hrs, cfg.recency_half_life_hours)
+
+            cat_bonus = 0.0
+            if any(c in cfg.bonus_categories for c in p.categories):
+                cat_bonus = cfg.category_bonus
+
+            score = kw_score * recency + cat_bonus
+
+            breakdown = {
+                "kw_score": float(kw_score),
+                "recency": float(recency),
+                "cat_bonus": float(cat_bonus),
+                "hours_ago": float(hrs),
+            }
+
+            ranked.append(
+                RankedPaper(
+                    paper=p,
+                    score=float(score),
+                    matched_keywords=uniq_hits,
+                    score_breakdown=breakdown,
+                )
             )
-        )
 
-    ranked.sort(key=lambda rp: (rp.score, rp.paper.updated_at), reverse=True)
+    with instrument.span("rank.sort"):
+        ranked.sort(key=lambda rp: (rp.score, rp.paper.updated_at), reverse=True)
+
+    instrument.count("rank.papers_scored", len(papers))
+    # (text, keyword) pairs checked; the matcher covers each text in a single scan
+    instrument.count("rank.keyword_comparisons", 2 * len(papers) * len(matcher.keywords))
     return ranked
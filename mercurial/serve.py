@@ -0,0 +1,339 @@
+# mercurial/serve.py
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from .config import Settings, load_settings
+from .export import ALL_FIELDS, ranked_record
+from .profiles import list_profiles
+from .ranker.batch_ranker import combine, top_k_indices
+from .ranker.matcher import compile_keywords
+from .ranker.simple_ranker import RankerConfig
+from .sources.arxiv_client import ArxivClient, FetchStatus, advance_high_water, build_search_query, iter_recent
+from .types import Paper, RankedPaper
+
+
+# Local HTTP API over precomputed ranked feeds. One background thread fetches
+# the window for the union of all served profiles (incrementally, from the
+# newest paper already seen) and matches every new paper or version once
+# against the union of their keywords. A feed for any profile combination is
+# then a sparse sum over those stored hits, computed at most once per refresh;
+# responses are cached per (combination, top) and carry a weak ETag over the
+# ranked ids, so a client polling an unchanged feed gets 304 Not Modified.
+MAX_TOP = 1000
+
+
+@dataclass(frozen=True)
+class _Matched:
+    paper: Paper
+    title_idx: Tuple[int, ...]      # indices into the refresh's keyword list
+    abstract_idx: Tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class Feed:
+    names: Tuple[str, ...]
+    computed_at: datetime
+    ranked: List[RankedPaper]       # best MAX_TOP, in rank order
+
+
+def _csr(lists: List[Tuple[int, ...]]) -> Tuple[np.ndarray, np.ndarray]:
+    off = np.zeros(len(lists) + 1, dtype=np.int64)
+    off[1:] = np.cumsum([len(x) for x in lists])
+    idx = np.fromiter((i for x in lists for i in x), dtype=np.int64, count=int(off[-1]))
+    return idx, off
+
+
+def _row_sums(weights: np.ndarray, idx: np.ndarray, off: np.ndarray) -> np.ndarray:
+    # sum of weights[k] over each paper's matched keyword indices
+    csum = np.concatenate(([0.0], np.cumsum(weights[idx])))
+    return csum[off[1:]] - csum[off[:-1]]
+
+
+class Snapshot:
+    """The window as of one refresh, with keyword hits against the union of all served keywords."""
+
+    def __init__(self, version: int, keywords: List[str], matched: List[_Matched], computed_at: datetime):
+        self.version = version
+        self.keywords = keywords
+        self.kw_pos = {kw: i for i, kw in enumerate(keywords)}
+        self.matched = matched
+        self.computed_at = computed_at
+        self.updated = np.array([m.paper.updated_at for m in matched], dtype="datetime64[us]")
+        self.hours_ago = np.maximum(
+            (np.datetime64(computed_at, "us") - self.updated) / np.timedelta64(1, "h"), 0.0
+        )
+        self.title_idx, self.title_off = _csr([m.title_idx for m in matched])
+        self.abstract_idx, self.abstract_off = _csr([m.abstract_idx for m in matched])
+        self._feeds: Dict[Tuple[str, ...], Feed] = {}
+        self._responses: Dict[Tuple[Tuple[str, ...], int], Tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def feed(self, names: Tuple[str, ...]) -> Feed:
+        with self._lock:
+            feed = self._feeds.get(names)
+            if feed is None:
+                feed = self._feeds[names] = self._rank(names, load_settings(selected_profiles=list(names)))
+            return feed
+
+    def _rank(self, names: Tuple[str, ...], s: Settings) -> Feed:
+        cfg = RankerConfig.from_settings(s)
+        n = len(self.matched)
+        if n == 0:
+            return Feed(names, self.computed_at, [])
+
+        # keywords added to a profile since this refresh are picked up by the next one
+        weights = np.zeros(len(self.keywords), dtype=np.float64)
+        for kw in s.keywords:
+            if kw in self.kw_pos:
+                weights[self.kw_pos[kw]] = 1.0
+        title_hits = _row_sums(weights, self.title_idx, self.title_off)
+        abstract_hits = _row_sums(weights, self.abstract_idx, self.abstract_off)
+
+        # what arXiv would have returned for this combination's own query, lookback
+        # and max_fetch (keywords are matched on title and abstract only)
+        cats = frozenset(s.arxiv_categories)
+        bonus_cats = frozenset(cfg.bonus_categories)
+        eligible = self.updated >= np.datetime64(self.computed_at - timedelta(hours=s.lookback_hours), "us")
+        if s.keywords:
+            eligible &= (title_hits + abstract_hits) > 0
+        if cats:
+            eligible &= np.fromiter(
+                (not cats.isdisjoint(m.paper.categories) for m in self.matched), dtype=bool, count=n
+            )
+        bonus = np.fromiter((not bonus_cats.isdisjoint(m.paper.categories) for m in self.matched), dtype=bool, count=n)
+
+        kw_score, recency, cat_bonus, score = combine(title_hits, abstract_hits, self.hours_ago, bonus, cfg)
+        cand = np.nonzero(eligible)[0]
+        if len(cand) > s.max_fetch:
+            # arXiv would have stopped after the newest max_fetch of them
+            cand = np.sort(cand[np.argsort(self.updated[cand], kind="stable")[::-1][: s.max_fetch]])
+        top = cand[top_k_indices(score[cand], self.updated[cand], MAX_TOP)]
+
+        ranked: List[RankedPaper] = []
+        for i in top:
+            m = self.matched[int(i)]
+            hits = [self.keywords[k] for k in m.title_idx + m.abstract_idx if weights[k]]
+            ranked.append(
+                RankedPaper(
+                    paper=m.paper,
+                    score=float(score[i]),
+                    matched_keywords=list(dict.fromkeys(hits)),
+                    score_breakdown={
+                        "kw_score": float(kw_score[i]),
+                        "recency": float(recency[i]),
+                        "cat_bonus": float(cat_bonus[i]),
+                        "hours_ago": float(self.hours_ago[i]),
+                    },
+                )
+            )
+        return Feed(names, self.computed_at, ranked)
+
+    def response(self, names: Tuple[str, ...], top: int) -> Tuple[str, bytes]:
+        """(weak ETag, JSON body) for a feed, built once per refresh."""
+        key = (names, top)
+        with self._lock:
+            cached = self._responses.get(key)
+        if cached is not None:
+            return cached
+
+        feed = self.feed(names)
+        ranked = feed.ranked[:top]
+        # the ETag covers which papers (and versions) are listed, in order; scores
+        # drift with recency on every refresh without changing the feed's meaning
+        h = hashlib.sha1(json.dumps([names, top]).encode("utf-8"))
+        for rp in ranked:
+            h.update(f"{rp.paper.arxiv_id}v{rp.paper.version};".encode("utf-8"))
+        etag = f'W/"{h.hexdigest()[:20]}"'
+        body = json.dumps(
+            {
+                "profiles": list(names),
+                "computed_at": feed.computed_at.isoformat(timespec="seconds"),
+                "count": len(ranked),
+                "papers": [ranked_record(i, rp, ALL_FIELDS) for i, rp in enumerate(ranked, 1)],
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        with self._lock:
+            self._responses[key] = (etag, body)
+        return etag, body
+
+
+class FeedService:
+    """Keeps the window and the current Snapshot; refresh() is called from a background thread."""
+
+    def __init__(self, profiles: List[str], client: ArxivClient | None = None):
+        self.profiles = profiles
+        self.client = client
+        self.snapshot: Optional[Snapshot] = None
+        self.last_error: Optional[str] = None
+        self.refreshes = 0
+        self._window: Dict[str, _Matched] = {}
+        self._keywords: Tuple[Tuple[str, ...], bool] = ((), False)
+        self._high_water: Dict[str, datetime] = {}
+
+    def settings(self) -> Settings:
+        return load_settings(selected_profiles=self.profiles)
+
+    def refresh(self) -> Snapshot:
+        s = self.settings()
+        client = self.client or ArxivClient(s.arxiv_api_url, delay_seconds=s.arxiv_delay_seconds)
+        self.client = client
+
+        q = build_search_query(s.arxiv_categories, s.keywords)
+        since = self._high_water.get(q)
+        # each profile's own query returns at most max_fetch papers, so their union at most this many
+        max_fetch = s.max_fetch * max(1, len(self.profiles))
+        status = FetchStatus()
+        fetched = list(
+            iter_recent(
+                s.arxiv_categories, s.keywords, s.lookback_hours, max_fetch, since=since, client=client, status=status
+            )
+        )
+        mark = advance_high_water(since, status)
+        if mark is not None:
+            self._high_water[q] = mark
+
+        keywords = (tuple(s.keywords), s.kw_word_boundary)
+        matcher = compile_keywords(*keywords)
+        if keywords != self._keywords:
+            # the served keyword set changed (profile edited): re-match the window
+            self._window = {
+                k: _Matched(m.paper, tuple(matcher.match_indices(m.paper.title)),
+                            tuple(matcher.match_indices(m.paper.abstract)))
+                for k, m in self._window.items()
+            }
+            self._keywords = keywords
+        for p in fetched:
+            cur = self._window.get(p.arxiv_id)
+            if cur is not None and (cur.paper.version, cur.paper.updated_at) >= (p.version, p.updated_at):
+                continue
+            self._window[p.arxiv_id] = _Matched(
+                p, tuple(matcher.match_indices(p.title)), tuple(matcher.match_indices(p.abstract))
+            )
+
+        now = datetime.utcnow()
+        cutoff = now - timedelta(hours=s.lookback_hours)
+        self._window = {k: m for k, m in self._window.items() if m.paper.updated_at >= cutoff}
+
+        self.refreshes += 1
+        snap = Snapshot(self.refreshes, list(s.keywords), list(self._window.values()), now)
+        self.snapshot = snap
+        self.last_error = None
+        return snap
+
+    def run(self, interval_seconds: float, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                snap = self.refresh()
+                print(
+                    f"[{snap.computed_at:%Y-%m-%d %H:%M:%S}] refreshed: {len(snap.matched)} papers in window",
+                    flush=True,
+                )
+            except Exception as e:  # keep serving the previous snapshot
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Refresh failed, serving previous results: {self.last_error}", flush=True)
+            stop.wait(interval_seconds)
+
+
+def _handler(service: FeedService, default_top: int):
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, status: int, obj) -> None:
+            body = json.dumps(obj).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            q = parse_qs(url.query)
+            snap = service.snapshot
+
+            if url.path == "/status":
+                self._json(
+                    200,
+                    {
+                        "profiles": service.profiles,
+                        "refreshes": service.refreshes,
+                        "computed_at": snap.computed_at.isoformat(timespec="seconds") if snap else None,
+                        "papers": len(snap.matched) if snap else 0,
+                        "last_error": service.last_error,
+                    },
+                )
+                return
+            if url.path != "/ranked":
+                self._json(404, {"error": "not found; try /ranked?profiles=a,b&top=50 or /status"})
+                return
+            if snap is None:
+                self._json(503, {"error": "first refresh still running", "last_error": service.last_error})
+                return
+
+            names = [x.strip() for v in q.get("profiles", []) for x in v.split(",") if x.strip()]
+            names = sorted(set(names or service.profiles))
+            unknown = [n for n in names if n not in service.profiles]
+            if unknown:
+                self._json(404, {"error": f"not served: {', '.join(unknown)}", "served": service.profiles})
+                return
+            try:
+                top = int(q.get("top", [default_top])[0])
+            except ValueError:
+                self._json(400, {"error": "top must be an integer"})
+                return
+            top = max(0, min(top, MAX_TOP))
+
+            etag, body = snap.response(tuple(names), top)
+            if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return Handler
+
+
+def serve(
+    profiles: Optional[List[str]] = None,
+    host: str = "127.0.0.1",
+    port: int = 8700,
+    interval_seconds: float = 900.0,
+    top: Optional[int] = None,
+) -> int:
+    """Serve /ranked and /status until interrupted, refreshing every `interval_seconds` in the background."""
+    names = profiles or list_profiles()
+    service = FeedService(names)
+    s = service.settings()
+    stop = threading.Event()
+    refresher = threading.Thread(target=service.run, args=(interval_seconds, stop), name="serve-refresh", daemon=True)
+
+    httpd = ThreadingHTTPServer((host, port), _handler(service, top if top is not None else s.top_picks))
+    print(f"Serving {', '.join(names) or '(no profiles)'} on http://{host}:{httpd.server_address[1]}/ranked", flush=True)
+    refresher.start()
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        httpd.server_close()
+    return 0
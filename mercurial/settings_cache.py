@@ -0,0 +1,107 @@
+# mercurial/settings_cache.py
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+# Parsed .env and profiles/*.env, cached in data/settings_cache.json and keyed
+# by the files' mtimes (plus the profiles directory's, so added or removed
+# profiles are noticed). A warm run neither imports python-dotenv nor re-parses
+# any file. Only file contents are cached; process environment variables are
+# applied on top at load time, exactly like load_dotenv(override=False).
+
+CACHE_VERSION = 1
+
+_parsed: Optional[dict] = None
+
+
+def _project_root() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+def cache_path() -> Path:
+    # same place as config.data_dir(); not imported to keep this module dependency-free
+    return _project_root() / "data" / "settings_cache.json"
+
+
+def find_env_file() -> Optional[Path]:
+    # what dotenv.find_dotenv() finds when called from this package: walk up from mercurial/
+    d = Path(__file__).resolve().parent
+    for parent in (d, *d.parents):
+        candidate = parent / ".env"
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _mtime(path: Path) -> Optional[list]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _fingerprint(env_file: Optional[Path], profiles: Path) -> dict:
+    files: Dict[str, Optional[list]] = {}
+    if env_file is not None:
+        files[str(env_file)] = _mtime(env_file)
+    files[str(profiles)] = _mtime(profiles)
+    if profiles.is_dir():
+        for p in profiles.glob("*.env"):
+            files[str(p)] = _mtime(p)
+    return {"version": CACHE_VERSION, "files": files}
+
+
+def _parse(env_file: Optional[Path], profiles: Path) -> dict:
+    from dotenv import dotenv_values
+
+    def _values(path: Path) -> Dict[str, str]:
+        return {k: v for k, v in dotenv_values(path).items() if v is not None}
+
+    return {
+        "env": _values(env_file) if env_file is not None else {},
+        "profiles": {p.stem: _values(p) for p in sorted(profiles.glob("*.env"))} if profiles.is_dir() else {},
+    }
+
+
+def parsed_files() -> dict:
+    """{"env": {...}, "profiles": {name: {...}}} for the current files, from the cache when still valid."""
+    global _parsed
+    from .profiles import profiles_dir
+
+    env_file = find_env_file()
+    key = _fingerprint(env_file, profiles_dir())
+    if _parsed is not None and _parsed["key"] == key:
+        return _parsed
+
+    path = cache_path()
+    try:
+        cached = json.loads(path.read_text(encoding="utf-8"))
+        if cached.get("key") == key:
+            _parsed = cached
+            return cached
+    except (OSError, ValueError):
+        pass
+
+    _parsed = {"key": key, **_parse(env_file, profiles_dir())}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(_parsed), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass  # read-only checkout: just parse every time
+    return _parsed
+
+
+def apply_env() -> None:
+    """Export .env values that are not already set in the environment (load_dotenv semantics)."""
+    for k, v in parsed_files()["env"].items():
+        os.environ.setdefault(k, v)
+
+
+def profile_values(name: str) -> Optional[Dict[str, str]]:
+    return parsed_files()["profiles"].get(name)
@@ -1,39 +1,166 @@
 # mercurial/sources/arxiv_client.py
 from __future__ import annotations
 
+import random
 import re
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
-from typing import List
+from email.utils import parsedate_to_datetime
+from typing import Iterator, List, Optional
 
-import feedparser
 import requests
+from requests.adapters import HTTPAdapter
 
+from .. import instrument
 from ..types import Paper
+from .atom_parser import _dt, _parse_arxiv_id_and_version, parse_feed
+from .http_cache import CacheMiss, ResponseCache
+from .ratelimit import ARXIV_DELAY_SECONDS, RateLimiter
 
 
 ARXIV_API = "https://export.arxiv.org/api/query"
 
+# arXiv asks for at most a few thousand results per call; smaller pages let us
+# stop early once the lookback cutoff is reached.
+PAGE_SIZE = 200
 
-def _parse_arxiv_id_and_version(entry_id: str) -> tuple[str, int]:
-    # entry_id typically like: "http://arxiv.org/abs/1706.03762"
-    m = re.search(r"/abs/([^v/]+)(?:v(\d+))?$", entry_id)
-    if not m:
-        # fallback: try last segment
-        tail = entry_id.rstrip("/").split("/")[-1]
-        m2 = re.match(r"([^v]+)v(\d+)", tail)
-        if m2:
-            return m2.group(1), int(m2.group(2))
-        return tail, 1
-    arxiv_id = m.group(1)
-    ver = int(m.group(2) or "1")
-    return arxiv_id, ver
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
 
 
-def _dt(s: str) -> datetime:
-    # e.g. "2026-01-31T01:23:45Z"
-    if s.endswith("Z"):
-        s = s[:-1] + "+00:00"
-    return datetime.fromisoformat(s).astimezone(timezone.utc).replace(tzinfo=None)
+@dataclass
+class ClientStats:
+    requests: int = 0
+    retries: int = 0
+    wait_seconds: float = 0.0      # rate limiting + backoff sleeps
+    bytes_received: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.requests} requests, {self.retries} retries, "
+            f"{self.wait_seconds:.1f}s waited, {self.bytes_received / 1024:.0f} KiB"
+        )
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    # Retry-After is either delta-seconds or an HTTP-date
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return max((dt - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class ArxivClient:
+    """
+    Reusable arXiv API client: one keep-alive requests.Session, a token-bucket
+    rate limit (arXiv asks for one request every 3 seconds) shared by every
+    thread using the client, and jittered exponential backoff on connection
+    errors, 429 and 5xx that honors Retry-After.
+    """
+
+    def __init__(
+        self,
+        base_url: str = ARXIV_API,
+        delay_seconds: float = ARXIV_DELAY_SECONDS,
+        max_retries: int = 4,
+        backoff_base: float = 2.0,
+        backoff_max: float = 60.0,
+        timeout: float = 30.0,
+        pool_size: int = 8,
+    ):
+        self.base_url = base_url
+        self.limiter = RateLimiter.every(delay_seconds)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.stats = ClientStats()
+        self._stats_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "ArxivClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _count(self, requests_: int = 0, retries: int = 0, wait: float = 0.0, nbytes: int = 0) -> None:
+        with self._stats_lock:
+            self.stats.requests += requests_
+            self.stats.retries += retries
+            self.stats.wait_seconds += wait
+            self.stats.bytes_received += nbytes
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        # "equal jitter": keep half the delay, randomize the rest
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max * 5))
+        return delay
+
+    def get(self, params: dict, headers: Optional[dict] = None) -> requests.Response:
+        """GET the API with rate limiting and retries. Raises for non-retryable or exhausted errors."""
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                waited = self.limiter.acquire()
+                self._count(wait=waited)
+                instrument.record("arxiv.rate_limit_wait", waited)
+
+            retry_after: Optional[float] = None
+            try:
+                with instrument.span("arxiv.http"):
+                    r = self.session.get(self.base_url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self._count(requests_=1)
+                instrument.count("arxiv.requests")
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                self._count(requests_=1, nbytes=len(r.content))
+                instrument.count("arxiv.requests")
+                instrument.count("arxiv.bytes_downloaded", len(r.content))
+                if r.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    if r.status_code != 304:
+                        r.raise_for_status()
+                    return r
+                retry_after = _retry_after_seconds(r.headers.get("Retry-After"))
+
+            delay = self._backoff(attempt, retry_after)
+            self._count(retries=1, wait=delay)
+            instrument.count("arxiv.retries")
+            instrument.record("arxiv.backoff_wait", delay)
+            time.sleep(delay)
+            attempt += 1
+
+
+_default_client: Optional[ArxivClient] = None
+_default_client_lock = threading.Lock()
+
+
+def default_client() -> ArxivClient:
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = ArxivClient()
+        return _default_client
 
 
 def build_search_query(categories: List[str], keywords: List[str]) -> str:
@@ -55,64 +182,195 @@ def build_search_query(categories: List[str], keywords: List[str]) -> str:
     return "all:*"
 
 
-def fetch_recent(
+def _entry_to_paper(e) -> Paper:
+    # feedparser entry -> Paper (fallback path; see atom_parser for the fast path)
+    entry_id = getattr(e, "id", "")
+    arxiv_id, version = _parse_arxiv_id_and_version(entry_id)
+
+    title = re.sub(r"\s+", " ", (getattr(e, "title", "") or "")).strip()
+    abstract = re.sub(r"\s+", " ", (getattr(e, "summary", "") or "")).strip()
+
+    authors = [a.name for a in getattr(e, "authors", []) if getattr(a, "name", None)]
+    categories_list = [t.term for t in getattr(e, "tags", []) if getattr(t, "term", None)]
+
+    published_at = _dt(getattr(e, "published", "1970-01-01T00:00:00Z"))
+    updated_at = _dt(getattr(e, "updated", getattr(e, "published", "1970-01-01T00:00:00Z")))
+
+    return Paper(
+        arxiv_id=arxiv_id,
+        version=version,
+        title=title,
+        authors=authors,
+        abstract=abstract,
+        categories=categories_list,
+        published_at=published_at,
+        updated_at=updated_at,
+    )
+
+
+def _fetch_page(
+    params: dict,
+    cache: ResponseCache | None = None,
+    client: ArxivClient | None = None,
+) -> tuple[bytes, datetime]:
+    """Return (raw Atom body, time it was fetched from arXiv) for one page, going through the cache if any."""
+    if cache is None:
+        r = (client or default_client()).get(params)
+        return r.content, datetime.utcnow()
+
+    entry = cache.get(params)
+    if cache.replay:
+        if entry is None:
+            raise CacheMiss(f"No recorded response for {params}")
+        instrument.count("arxiv.cache_hits")
+        return entry.body, datetime.utcfromtimestamp(entry.fetched_at)
+
+    if entry is not None and cache.is_fresh(entry):
+        instrument.count("arxiv.cache_hits")
+        return entry.body, datetime.utcfromtimestamp(entry.fetched_at)
+
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    r = (client or default_client()).get(params, headers=headers)
+    if r.status_code == 304:
+        if entry is not None:
+            cache.mark_revalidated(params)
+            instrument.count("arxiv.cache_revalidated")
+            return entry.body, datetime.utcnow()
+        r.raise_for_status()
+
+    cache.put(params, r.content, etag=r.headers.get("ETag"), last_modified=r.headers.get("Last-Modified"))
+    return r.content, datetime.utcnow()
+
+
+@dataclass
+class FetchStatus:
+    """Filled in by iter_recent as it pages (pass one in to find out how the fetch ended)."""
+    newest: Optional[datetime] = None   # newest updated_at yielded
+    fetched: int = 0
+    complete: bool = False              # reached the cutoff or the end of the results, not max_fetch
+
+
+def advance_high_water(prev: Optional[datetime], status: FetchStatus) -> Optional[datetime]:
+    """
+    The incremental-sync mark to keep after a fetch: its newest entry, but only
+    if the fetch got back to the cutoff. A fetch stopped by max_fetch has a gap
+    below its oldest entry; moving the mark past that gap would lose those
+    papers for good, so the mark stays at `prev` and the next fetch covers it.
+    """
+    if not status.complete or status.newest is None:
+        return prev
+    return status.newest if prev is None else max(prev, status.newest)
+
+
+def iter_recent(
     categories: List[str],
     keywords: List[str],
     lookback_hours: int,
     max_fetch: int,
-) -> List[Paper]:
-    """Fetch 'recently updated' papers, then locally filter by updated_at within lookback_hours."""
+    page_size: int = PAGE_SIZE,
+    since: datetime | None = None,
+    cache: ResponseCache | None = None,
+    client: ArxivClient | None = None,
+    parser: str = "etree",
+    status: FetchStatus | None = None,
+) -> Iterator[Paper]:
+    """
+    Page through 'recently updated' papers and yield those within lookback_hours.
+
+    Results are sorted by lastUpdatedDate descending, so once a page contains an
+    entry older than the cutoff no later page can contain anything newer and we
+    stop requesting. Only one page of feed text is held at a time.
+
+    If `since` is given (an incremental-sync high-water mark) the cutoff is
+    raised to it, so only entries updated at or after it are requested, and
+    paging goes on past max_fetch until the mark is reached: stopping early
+    would leave a gap between the mark and the oldest entry fetched.
+
+    `status`, if given, records the newest entry and whether the fetch was
+    complete (see advance_high_water).
+
+    With a replaying cache the lookback window is anchored at the time the
+    first page was recorded, so a replayed run sees the same papers.
+
+    Pages are parsed with the streaming etree parser; parser="feedparser"
+    forces the old feedparser path.
+    """
     q = build_search_query(categories, keywords)
 
-    params = {
-        "search_query": q,
-        "start": 0,
-        "max_results": max_fetch,
-        "sortBy": "lastUpdatedDate",
-        "sortOrder": "descending",
-    }
-
-    r = requests.get(ARXIV_API, params=params, timeout=30)
-    r.raise_for_status()
-
-    feed = feedparser.parse(r.text)
-    now = datetime.utcnow()
-    cutoff = now - timedelta(hours=lookback_hours)
-
-    papers: List[Paper] = []
-
-    for e in feed.entries:
-        entry_id = getattr(e, "id", "")
-        arxiv_id, version = _parse_arxiv_id_and_version(entry_id)
-
-        title = re.sub(r"\s+", " ", (getattr(e, "title", "") or "")).strip()
-        abstract = re.sub(r"\s+", " ", (getattr(e, "summary", "") or "")).strip()
-
-        authors = [a.name for a in getattr(e, "authors", []) if getattr(a, "name", None)]
-        categories_list = [t.term for t in getattr(e, "tags", []) if getattr(t, "term", None)]
-
-        published_at = _dt(getattr(e, "published", "1970-01-01T00:00:00Z"))
-        updated_at = _dt(getattr(e, "updated", getattr(e, "published", "1970-01-01T00:00:00Z")))
-
-        if updated_at < cutoff:
-            continue
-
-        abs_url = f"https://arxiv.org/abs/{arxiv_id}"
-        pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-
-        papers.append(
-            Paper(
-                arxiv_id=arxiv_id,
-                version=version,
-                title=title,
-                authors=authors,
-                abstract=abstract,
-                categories=categories_list,
-                published_at=published_at,
-                updated_at=updated_at,
-                abs_url=abs_url,
-                pdf_url=pdf_url,
-            )
-        )
+    cutoff: datetime | None = None
+
+    status = status if status is not None else FetchStatus()
+    start = 0
+    while start < max_fetch or since is not None:
+        n = min(page_size, max_fetch - start) if start < max_fetch else page_size
+        params = {
+            "search_query": q,
+            "start": start,
+            "max_results": n,
+            "sortBy": "lastUpdatedDate",
+            "sortOrder": "descending",
+        }
 
-    return papers
+        with instrument.span("arxiv.fetch_page"):
+            body, fetched_at = _fetch_page(params, cache, client)
+        if cutoff is None:
+            now = fetched_at if cache is not None and cache.replay else datetime.utcnow()
+            cutoff = now - timedelta(hours=lookback_hours)
+            if since is not None and since > cutoff:
+                cutoff = since
+
+        n_entries = 0
+        n_dropped = 0
+        for p in instrument.timed_iter("arxiv.parse", parse_feed(body, parser)):
+            n_entries += 1
+            if p.updated_at < cutoff:
+                n_dropped += 1
+                continue
+            status.fetched += 1
+            if status.newest is None or p.updated_at > status.newest:
+                status.newest = p.updated_at
+            yield p
+        del body
+        instrument.count("arxiv.entries_parsed", n_entries)
+        instrument.count("arxiv.entries_dropped_cutoff", n_dropped)
+
+        reached_cutoff = n_dropped > 0
+
+        if reached_cutoff or n_entries < n:
+            status.complete = True
+            return
+        start += n
+
+
+def fetch_by_ids(
+    arxiv_ids: List[str],
+    cache: ResponseCache | None = None,
+    client: ArxivClient | None = None,
+) -> List[Paper]:
+    """Look papers up by id (arXiv `id_list`), latest version each."""
+    out: List[Paper] = []
+    for lo in range(0, len(arxiv_ids), PAGE_SIZE):
+        chunk = arxiv_ids[lo:lo + PAGE_SIZE]
+        params = {"id_list": ",".join(chunk), "start": 0, "max_results": len(chunk)}
+        with instrument.span("arxiv.fetch_page"):
+            body, _ = _fetch_page(params, cache, client)
+        out.extend(instrument.timed_iter("arxiv.parse", parse_feed(body)))
+    return out
+
+
+def fetch_recent(
+    categories: List[str],
+    keywords: List[str],
+    lookback_hours: int,
+    max_fetch: int,
+    cache: ResponseCache | None = None,
+    client: ArxivClient | None = None,
+) -> List[Paper]:
+    """Fetch 'recently updated' papers, then locally filter by updated_at within lookback_hours."""
+    return list(iter_recent(categories, keywords, lookback_hours, max_fetch, cache=cache, client=client))
@@ -0,0 +1,137 @@
+# mercurial/sources/atom_parser.py
+from __future__ import annotations
+
+import io
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import IO, Iterator, List, Union
+
+from ..types import Paper
+
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+_ENTRY = ATOM_NS + "entry"
+_ID = ATOM_NS + "id"
+_TITLE = ATOM_NS + "title"
+_SUMMARY = ATOM_NS + "summary"
+_PUBLISHED = ATOM_NS + "published"
+_UPDATED = ATOM_NS + "updated"
+_AUTHOR = ATOM_NS + "author"
+_NAME = ATOM_NS + "name"
+_CATEGORY = ATOM_NS + "category"
+
+_EPOCH = "1970-01-01T00:00:00Z"
+_WS = re.compile(r"\s+")
+
+
+def _parse_arxiv_id_and_version(entry_id: str) -> tuple[str, int]:
+    # entry_id typically like: "http://arxiv.org/abs/1706.03762"
+    m = re.search(r"/abs/([^v/]+)(?:v(\d+))?$", entry_id)
+    if not m:
+        # fallback: try last segment
+        tail = entry_id.rstrip("/").split("/")[-1]
+        m2 = re.match(r"([^v]+)v(\d+)", tail)
+        if m2:
+            return m2.group(1), int(m2.group(2))
+        return tail, 1
+    arxiv_id = m.group(1)
+    ver = int(m.group(2) or "1")
+    return arxiv_id, ver
+
+
+def _dt(s: str) -> datetime:
+    # e.g. "2026-01-31T01:23:45Z"
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    return datetime.fromisoformat(s).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _fast_dt(s: str) -> datetime:
+    # arXiv always sends UTC with a trailing Z; skip the tz round-trip for that case
+    if len(s) == 20 and s[-1] == "Z":
+        return datetime.fromisoformat(s[:-1])
+    return _dt(s)
+
+
+def _clean(text: str | None) -> str:
+    return _WS.sub(" ", text or "").strip()
+
+
+def _entry_to_paper(entry: ET.Element) -> Paper:
+    arxiv_id, version = _parse_arxiv_id_and_version((entry.findtext(_ID) or "").strip())
+
+    published = (entry.findtext(_PUBLISHED) or "").strip() or _EPOCH
+    updated = (entry.findtext(_UPDATED) or "").strip() or published
+
+    authors: List[str] = []
+    for a in entry.iter(_AUTHOR):
+        name = (a.findtext(_NAME) or "").strip()
+        if name:
+            authors.append(name)
+
+    categories = [c.get("term") for c in entry.iter(_CATEGORY) if c.get("term")]
+
+    return Paper(
+        arxiv_id=arxiv_id,
+        version=version,
+        title=_clean(entry.findtext(_TITLE)),
+        authors=authors,
+        abstract=_clean(entry.findtext(_SUMMARY)),
+        categories=categories,
+        published_at=_fast_dt(published),
+        updated_at=_fast_dt(updated),
+    )
+
+
+def iter_atom_papers(source: Union[bytes, IO[bytes]]) -> Iterator[Paper]:
+    """
+    Incrementally parse an arXiv Atom feed into Paper objects with iterparse.
+
+    Each <entry> is converted as soon as its end tag is seen and then cleared,
+    so memory stays flat regardless of feed size. Raises ET.ParseError on
+    malformed XML.
+    """
+    stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+    root = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        if elem.tag == _ENTRY:
+            yield _entry_to_paper(elem)
+            elem.clear()
+            root.clear()
+
+
+def _feedparser_papers(body: bytes) -> Iterator[Paper]:
+    import feedparser
+
+    from .arxiv_client import _entry_to_paper as _feedparser_entry_to_paper
+
+    for e in feedparser.parse(body).entries:
+        yield _feedparser_entry_to_paper(e)
+
+
+def parse_feed(body: bytes, parser: str = "etree") -> Iterator[Paper]:
+    """
+    Yield Papers from one Atom response. The etree parser is the fast path;
+    feedparser is the fallback (or can be forced with parser="feedparser").
+    If etree fails mid-document, feedparser takes over and skips the entries
+    already yielded.
+    """
+    if parser == "feedparser":
+        yield from _feedparser_papers(body)
+        return
+
+    n = 0
+    try:
+        for p in iter_atom_papers(body):
+            n += 1
+            yield p
+    except ET.ParseError:
+        for i, p in enumerate(_feedparser_papers(body)):
+            if i >= n:
+                yield p
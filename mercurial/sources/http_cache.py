@@ -0,0 +1,159 @@
+# mercurial/sources/http_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+from ..config import data_dir
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    fetched_at: float              # unix seconds of the last (re)validation
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def default_cache_dir() -> Path:
+    return data_dir() / "http_cache"
+
+
+def normalize_params(params: Mapping[str, object]) -> Dict[str, str]:
+    # key order and whitespace inside the query must not change the cache key
+    return {k: " ".join(str(v).split()) for k, v in sorted(params.items())}
+
+
+def cache_key(params: Mapping[str, object]) -> str:
+    raw = json.dumps(normalize_params(params), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk store of raw Atom responses keyed by normalized query params.
+
+    Each entry is a body file plus a small JSON sidecar (params, validators,
+    timestamps). Entries older than `ttl_seconds` are revalidated with
+    If-None-Match / If-Modified-Since by the caller; the total body size is
+    kept under `max_bytes` by evicting least-recently-used entries.
+
+    In replay mode only recorded responses are served (regardless of age) and
+    anything else raises CacheMiss, so runs are offline and deterministic.
+    """
+
+    def __init__(
+        self,
+        root: Path | str | None = None,
+        ttl_seconds: float = 3600.0,
+        max_bytes: int = 256 * 1024 * 1024,
+        replay: bool = False,
+    ):
+        self.root = Path(root) if root is not None else default_cache_dir()
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.root / f"{key}.atom", self.root / f"{key}.json"
+
+    def _read_meta(self, meta_path: Path) -> Optional[dict]:
+        try:
+            return json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta_path: Path, meta: dict) -> None:
+        tmp = meta_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, meta_path)
+
+    def get(self, params: Mapping[str, object]) -> Optional[CachedResponse]:
+        body_path, meta_path = self._paths(cache_key(params))
+        meta = self._read_meta(meta_path)
+        if meta is None:
+            return None
+        try:
+            body = body_path.read_bytes()
+        except OSError:
+            return None
+
+        meta["last_used"] = time.time()
+        self._write_meta(meta_path, meta)
+
+        return CachedResponse(
+            body=body,
+            fetched_at=float(meta["fetched_at"]),
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+        )
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return (time.time() - entry.fetched_at) < self.ttl_seconds
+
+    def put(
+        self,
+        params: Mapping[str, object],
+        body: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> CachedResponse:
+        body_path, meta_path = self._paths(cache_key(params))
+        now = time.time()
+
+        tmp = body_path.with_suffix(".atom.tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, body_path)
+        self._write_meta(
+            meta_path,
+            {
+                "params": normalize_params(params),
+                "fetched_at": now,
+                "last_used": now,
+                "etag": etag,
+                "last_modified": last_modified,
+                "size": len(body),
+            },
+        )
+        self._evict()
+        return CachedResponse(body=body, fetched_at=now, etag=etag, last_modified=last_modified)
+
+    def mark_revalidated(self, params: Mapping[str, object]) -> None:
+        """Reset the TTL of an entry after the server answered 304 Not Modified."""
+        _, meta_path = self._paths(cache_key(params))
+        meta = self._read_meta(meta_path)
+        if meta is not None:
+            meta["fetched_at"] = meta["last_used"] = time.time()
+            self._write_meta(meta_path, meta)
+
+    def _evict(self) -> None:
+        entries: List[tuple[float, int, str]] = []
+        total = 0
+        for meta_path in self.root.glob("*.json"):
+            meta = self._read_meta(meta_path)
+            if meta is None:
+                continue
+            size = int(meta.get("size", 0))
+            total += size
+            entries.append((float(meta.get("last_used", 0.0)), size, meta_path.stem))
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,142 @@
+# mercurial/sources/planner.py
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
+
+from ..profiles import load_profile
+from ..types import Paper
+
+# the CLI imports SHARD_STRATEGIES while building its parser; the HTTP client
+# (and requests) is only imported once a shard actually runs
+if TYPE_CHECKING:
+    from .arxiv_client import ArxivClient, FetchStatus
+    from .http_cache import ResponseCache
+
+
+SHARD_STRATEGIES = ("profile", "category")
+
+
+@dataclass(frozen=True)
+class Shard:
+    name: str
+    categories: List[str]
+    keywords: List[str]
+
+    @property
+    def query(self) -> str:
+        from .arxiv_client import build_search_query
+
+        return build_search_query(self.categories, self.keywords)
+
+
+@dataclass(frozen=True)
+class ShardResult:
+    shard: Shard
+    papers: List[Paper] = field(repr=False)
+    seconds: float
+    status: Optional[FetchStatus] = field(default=None, repr=False)   # how the fetch ended (set by run_shards)
+
+    @property
+    def fetched(self) -> int:
+        return len(self.papers)
+
+
+def _chunks(seq: Sequence[str], size: int) -> List[List[str]]:
+    if not seq:
+        return [[]]
+    size = max(1, size)
+    return [list(seq[i:i + size]) for i in range(0, len(seq), size)]
+
+
+def plan_by_profile(
+    profiles: Sequence[str],
+    base_categories: Sequence[str] = (),
+    base_keywords: Sequence[str] = (),
+) -> List[Shard]:
+    """
+    One shard per profile (its own categories AND its own keywords), plus a
+    'base' shard for legacy .env ARXIV_CATEGORIES/KEYWORDS if any are set.
+
+    Unlike the merged query this does not pair one profile's categories with
+    another profile's keywords, which is usually what profiles mean anyway.
+    """
+    shards: List[Shard] = []
+    if base_categories or base_keywords:
+        shards.append(Shard("base", list(base_categories), list(base_keywords)))
+    for name in profiles:
+        p = load_profile(name)
+        shards.append(Shard(name, list(p.arxiv_categories), list(p.keywords)))
+    return shards
+
+
+def plan_by_category(
+    categories: Sequence[str],
+    keywords: Sequence[str],
+    max_categories: int = 4,
+    max_keywords: int = 20,
+) -> List[Shard]:
+    """
+    Split the merged (cats) AND (kws) query into groups of categories x groups
+    of keywords. AND distributes over OR, so the union of the shards returns
+    exactly what the merged query would, with much shorter URLs.
+    """
+    shards: List[Shard] = []
+    for ci, cats in enumerate(_chunks(categories, max_categories)):
+        for ki, kws in enumerate(_chunks(keywords, max_keywords)):
+            shards.append(Shard(f"c{ci}k{ki}", cats, kws))
+    return shards
+
+
+def run_shards(
+    shards: Sequence[Shard],
+    lookback_hours: int,
+    max_fetch: int,
+    max_workers: int = 4,
+    client: ArxivClient | None = None,
+    cache: ResponseCache | None = None,
+    since: Optional[Dict[str, datetime]] = None,
+) -> List[ShardResult]:
+    """
+    Fetch every shard on a bounded thread pool. All workers share one client
+    (session + rate limiter), so the pool never exceeds the global arXiv
+    request rate. `since` maps a shard query to its incremental-sync high-water mark.
+    """
+    from .arxiv_client import FetchStatus, default_client, iter_recent
+
+    since = since or {}
+    client = client or default_client()
+
+    def _run(shard: Shard) -> ShardResult:
+        t0 = time.perf_counter()
+        status = FetchStatus()
+        papers = list(
+            iter_recent(
+                shard.categories,
+                shard.keywords,
+                lookback_hours,
+                max_fetch,
+                since=since.get(shard.query),
+                cache=cache,
+                client=client,
+                status=status,
+            )
+        )
+        return ShardResult(shard=shard, papers=papers, seconds=time.perf_counter() - t0, status=status)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="arxiv-shard") as pool:
+        return list(pool.map(_run, shards))
+
+
+def merge_results(results: Iterable[ShardResult]) -> List[Paper]:
+    """Dedupe by arxiv_id keeping the highest version; newest updated first."""
+    best: Dict[str, Paper] = {}
+    for res in results:
+        for p in res.papers:
+            cur = best.get(p.arxiv_id)
+            if cur is None or (p.version, p.updated_at) > (cur.version, cur.updated_at):
+                best[p.arxiv_id] = p
+    return sorted(best.values(), key=lambda p: p.updated_at, reverse=True)
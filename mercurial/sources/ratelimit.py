@@ -0,0 +1,49 @@
+# mercurial/sources/ratelimit.py
+from __future__ import annotations
+
+import threading
+import time
+
+
+# arXiv API terms of use: no more than one request every three seconds
+ARXIV_DELAY_SECONDS = 3.0
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket. `rate` tokens per second, at most `burst` banked.
+
+    One instance is shared by every thread talking to the same host, so
+    concurrent shards still respect a single global request rate.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def every(cls, seconds: float, burst: int = 1) -> "RateLimiter | None":
+        """One request per `seconds` (None when seconds <= 0, i.e. unlimited)."""
+        if seconds <= 0:
+            return None
+        return cls(rate=1.0 / seconds, burst=burst)
+
+    def acquire(self) -> float:
+        """Block until a token is available. Returns the time spent waiting, in seconds."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
@@ -0,0 +1,274 @@
+# mercurial/sources/snapshot.py
+from __future__ import annotations
+
+import gzip
+import json
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, FrozenSet, Iterable, Iterator, List, Optional
+
+from ..types import Paper
+
+if TYPE_CHECKING:
+    import xml.etree.ElementTree as ET
+
+
+# Offline arXiv metadata snapshots:
+#   jsonl - the line-delimited JSON dump (Kaggle "arxiv-metadata-oai-snapshot.json")
+#   oai   - OAI-PMH ListRecords XML (metadataPrefix arXiv or arXivRaw)
+# Both may be gzip-compressed. Files are cut into chunks of raw records here;
+# chunks are parsed (possibly in worker processes) by parse_chunk().
+SNAPSHOT_FORMATS = ("jsonl", "oai")
+
+_READ_BLOCK = 1 << 20
+_EPOCH = datetime(1970, 1, 1)
+_MONTHS = {m: i for i, m in enumerate(("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                       "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+
+# wraps a chunk of <record> fragments; declares the prefixes records may use
+# without declaring them (they are normally declared on the response root)
+_OAI_WRAP_OPEN = b'<records xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+_OAI_WRAP_CLOSE = b"</records>"
+
+
+def open_snapshot(path: str | Path) -> IO[bytes]:
+    """Open a snapshot file for binary reading, transparently gunzipping."""
+    path = Path(path)
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def detect_format(path: str | Path) -> str:
+    name = Path(path).name.lower().removesuffix(".gz")
+    if name.endswith((".json", ".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(".xml"):
+        return "oai"
+    with open_snapshot(path) as f:
+        head = f.read(4096).lstrip()
+    return "oai" if head.startswith(b"<") else "jsonl"
+
+
+def wants(categories: Iterable[str], wanted: Optional[FrozenSet[str]]) -> bool:
+    """Category filter: exact category ("cs.LG") or whole archive ("cs", "math")."""
+    if not wanted:
+        return True
+    for c in categories:
+        if c in wanted or c.split(".", 1)[0] in wanted:
+            return True
+    return False
+
+
+def _clean(text: Optional[str]) -> str:
+    # same result as collapsing \s+ with a regex, several times faster on abstracts
+    return " ".join((text or "").split())
+
+
+def _rfc2822(s: str) -> datetime:
+    # "Mon, 2 Apr 2007 19:18:42 GMT"; the dump always uses this shape, anything else goes through email.utils
+    parts = s.split()
+    if len(parts) == 6 and parts[5] == "GMT" and parts[2] in _MONTHS:
+        hh, mm, ss = parts[4].split(":")
+        return datetime(int(parts[3]), _MONTHS[parts[2]], int(parts[1]), int(hh), int(mm), int(ss))
+    from email.utils import parsedate_to_datetime
+
+    dt = parsedate_to_datetime(s)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _day(s: Optional[str]) -> Optional[datetime]:
+    # "2008-11-13"
+    s = (s or "").strip()
+    return datetime.fromisoformat(s[:10]) if s else None
+
+
+# ---- jsonl ----
+
+def _kaggle_paper(obj: dict) -> Paper:
+    versions = obj.get("versions") or []
+    created = [_rfc2822(v["created"]) for v in versions if v.get("created")]
+    version = len(versions) or 1
+    if versions and str(versions[-1].get("version", "")).lstrip("v").isdigit():
+        version = int(str(versions[-1]["version"]).lstrip("v"))
+
+    published = created[0] if created else (_day(obj.get("update_date")) or _EPOCH)
+    updated = created[-1] if created else published
+
+    parsed = obj.get("authors_parsed")
+    if parsed:
+        # [keyname, forenames, suffix] -> "forenames keyname suffix"
+        authors = [" ".join(x for x in (*a[1:2], a[0], *a[2:3]) if x) for a in parsed]
+    else:
+        authors = [a.strip() for a in re.split(r",| and ", obj.get("authors") or "") if a.strip()]
+
+    return Paper(
+        arxiv_id=str(obj["id"]).strip(),
+        version=version,
+        title=_clean(obj.get("title")),
+        authors=authors,
+        abstract=_clean(obj.get("abstract")),
+        categories=(obj.get("categories") or "").split(),
+        published_at=published,
+        updated_at=updated,
+    )
+
+
+def iter_jsonl_chunks(stream: IO[bytes], chunk_records: int = 5000) -> Iterator[List[bytes]]:
+    chunk: List[bytes] = []
+    for line in stream:
+        if not line.strip():
+            continue
+        chunk.append(line)
+        if len(chunk) >= chunk_records:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_jsonl_chunk(lines: List[bytes], wanted: Optional[FrozenSet[str]] = None) -> List[Paper]:
+    out: List[Paper] = []
+    for line in lines:
+        obj = json.loads(line)
+        if wanted and not wants((obj.get("categories") or "").split(), wanted):
+            continue
+        out.append(_kaggle_paper(obj))
+    return out
+
+
+# ---- OAI-PMH XML ----
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child(elem: ET.Element, name: str) -> Optional[ET.Element]:
+    for c in elem:
+        if _local(c.tag) == name:
+            return c
+    return None
+
+
+def _text(elem: ET.Element, name: str) -> Optional[str]:
+    c = _child(elem, name)
+    return c.text if c is not None else None
+
+
+def _oai_paper(meta: ET.Element) -> Paper:
+    # meta is <arXiv> (id/created/updated/authors) or <arXivRaw> (id/version*/authors as text)
+    authors: List[str] = []
+    authors_el = _child(meta, "authors")
+    if authors_el is not None and len(authors_el):
+        for a in authors_el:
+            parts = [_text(a, "forenames"), _text(a, "keyname"), _text(a, "suffix")]
+            name = " ".join(_clean(x) for x in parts if x and x.strip())
+            if name:
+                authors.append(name)
+    elif authors_el is not None:
+        authors = [a.strip() for a in re.split(r",| and ", _clean(authors_el.text)) if a.strip()]
+
+    versions = [c for c in meta if _local(c.tag) == "version"]
+    created = [_rfc2822(d) for d in (_text(v, "date") for v in versions) if d]
+    version = 1
+    if versions and (versions[-1].get("version") or "").lstrip("v").isdigit():
+        version = int(versions[-1].get("version").lstrip("v"))
+
+    published = created[0] if created else (_day(_text(meta, "created")) or _EPOCH)
+    updated = created[-1] if created else (_day(_text(meta, "updated")) or published)
+
+    return Paper(
+        arxiv_id=(_text(meta, "id") or "").strip(),
+        version=version,
+        title=_clean(_text(meta, "title")),
+        authors=authors,
+        abstract=_clean(_text(meta, "abstract")),
+        categories=(_text(meta, "categories") or "").split(),
+        published_at=published,
+        updated_at=updated,
+    )
+
+
+def iter_oai_chunks(stream: IO[bytes], chunk_records: int = 2000) -> Iterator[List[bytes]]:
+    """Cut an OAI-PMH response stream into chunks of raw <record>...</record> fragments."""
+    buf = b""
+    chunk: List[bytes] = []
+    while True:
+        block = stream.read(_READ_BLOCK)
+        buf += block
+        pos = 0
+        while True:
+            start = buf.find(b"<record", pos)
+            if start < 0:
+                pos = max(len(buf) - 16, pos)
+                break
+            nxt = buf[start + 7:start + 8]
+            if nxt and nxt not in b"> \t\r\n":
+                pos = start + 7
+                continue
+            end = buf.find(b"</record>", start)
+            if end < 0:
+                pos = start
+                break
+            end += len(b"</record>")
+            chunk.append(buf[start:end])
+            pos = end
+            if len(chunk) >= chunk_records:
+                yield chunk
+                chunk = []
+        buf = buf[pos:]
+        if not block:
+            break
+    if chunk:
+        yield chunk
+
+
+def parse_oai_chunk(records: List[bytes], wanted: Optional[FrozenSet[str]] = None) -> List[Paper]:
+    import xml.etree.ElementTree as ET
+
+    root = ET.fromstring(_OAI_WRAP_OPEN + b"".join(records) + _OAI_WRAP_CLOSE)
+    out: List[Paper] = []
+    for rec in root:
+        header = _child(rec, "header")
+        if header is not None and header.get("status") == "deleted":
+            continue
+        metadata = _child(rec, "metadata")
+        if metadata is None or not len(metadata):
+            continue
+        meta = metadata[0]
+        if wanted and not wants((_text(meta, "categories") or "").split(), wanted):
+            continue
+        out.append(_oai_paper(meta))
+    return out
+
+
+def iter_chunks(stream: IO[bytes], fmt: str, chunk_records: Optional[int] = None) -> Iterator[List[bytes]]:
+    if fmt == "jsonl":
+        return iter_jsonl_chunks(stream, chunk_records or 5000)
+    if fmt == "oai":
+        return iter_oai_chunks(stream, chunk_records or 2000)
+    raise ValueError(f"Unknown snapshot format: {fmt}. Available: {SNAPSHOT_FORMATS}")
+
+
+def parse_chunk(fmt: str, chunk: List[bytes], wanted: Optional[FrozenSet[str]] = None) -> List[Paper]:
+    if fmt == "jsonl":
+        return parse_jsonl_chunk(chunk, wanted)
+    return parse_oai_chunk(chunk, wanted)
+
+
+def iter_snapshot(
+    path: str | Path,
+    categories: Optional[Iterable[str]] = None,
+    fmt: Optional[str] = None,
+) -> Iterator[Paper]:
+    """Stream Papers from one snapshot file in this process (see store.import_snapshot for the parallel path)."""
+    fmt = fmt or detect_format(path)
+    wanted = frozenset(categories) if categories else None
+    with open_snapshot(path) as f:
+        for chunk in iter_chunks(f, fmt):
+            yield from parse_chunk(fmt, chunk, wanted)
@@ -0,0 +1,430 @@
+# mercurial/store.py
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from .config import data_dir
+from .types import Paper
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    arxiv_id     TEXT    NOT NULL,
+    version      INTEGER NOT NULL,
+    title        TEXT    NOT NULL,
+    authors      TEXT    NOT NULL,   -- JSON list
+    abstract     TEXT    NOT NULL,
+    categories   TEXT    NOT NULL,   -- JSON list
+    published_at TEXT    NOT NULL,   -- ISO, naive UTC
+    updated_at   TEXT    NOT NULL,   -- ISO, naive UTC
+    abs_url      TEXT    NOT NULL,
+    pdf_url      TEXT    NOT NULL,
+    PRIMARY KEY (arxiv_id, version)
+);
+CREATE INDEX IF NOT EXISTS idx_papers_updated ON papers (updated_at);
+
+CREATE TABLE IF NOT EXISTS paper_categories (
+    arxiv_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    PRIMARY KEY (arxiv_id, category)
+);
+CREATE INDEX IF NOT EXISTS idx_paper_categories_cat ON paper_categories (category);
+
+-- which papers each search query returned, so a query's window can be read back
+CREATE TABLE IF NOT EXISTS query_papers (
+    query    TEXT NOT NULL,
+    arxiv_id TEXT NOT NULL,
+    PRIMARY KEY (query, arxiv_id)
+);
+
+-- newest updated_at seen per search query (incremental sync high-water mark)
+CREATE TABLE IF NOT EXISTS sync_state (
+    query      TEXT PRIMARY KEY,
+    high_water TEXT NOT NULL
+);
+"""
+
+_COLUMNS = "arxiv_id, version, title, authors, abstract, categories, published_at, updated_at, abs_url, pdf_url"
+
+
+def default_store_path() -> Path:
+    return data_dir() / "papers.db"
+
+
+def _to_row(p: Paper) -> tuple:
+    return (
+        p.arxiv_id,
+        p.version,
+        p.title,
+        json.dumps(p.authors, ensure_ascii=False),
+        p.abstract,
+        json.dumps(p.categories),
+        p.published_at.isoformat(),
+        p.updated_at.isoformat(),
+        p.abs_url,
+        p.pdf_url,
+    )
+
+
+def _row_fields(row: Sequence) -> tuple:
+    # (arxiv_id, version, title, authors, abstract, categories, published_at, updated_at)
+    return (
+        row[0],
+        int(row[1]),
+        row[2],
+        json.loads(row[3]),
+        row[4],
+        json.loads(row[5]),
+        datetime.fromisoformat(row[6]),
+        datetime.fromisoformat(row[7]),
+    )
+
+
+def _from_row(row: Sequence) -> Paper:
+    return Paper(*_row_fields(row))
+
+
+class PaperStore:
+    """SQLite-backed local paper store keyed by (arxiv_id, version)."""
+
+    def __init__(self, path: Path | str | None = None):
+        self.path = Path(path) if path is not None else default_store_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "PaperStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---- writes ----
+
+    def upsert(self, papers: Iterable[Paper], query: str | None = None, batch_size: int = 1000) -> int:
+        """Insert or replace papers in batched transactions. Returns the number written."""
+        n = 0
+        batch: List[Paper] = []
+        for p in papers:
+            batch.append(p)
+            if len(batch) >= batch_size:
+                n += self._write_batch(batch, query)
+                batch = []
+        if batch:
+            n += self._write_batch(batch, query)
+        return n
+
+    def _write_batch(self, batch: List[Paper], query: str | None) -> int:
+        return self.write_rows(
+            [_to_row(p) for p in batch],
+            [(p.arxiv_id, c) for p in batch for c in p.categories],
+            query,
+        )
+
+    def write_rows(self, rows: Sequence[tuple], category_rows: Sequence[tuple], query: str | None = None) -> int:
+        """Write already-serialized rows (see _to_row) in one transaction."""
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO papers ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO paper_categories (arxiv_id, category) VALUES (?, ?)", category_rows
+            )
+            if query is not None:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO query_papers (query, arxiv_id) VALUES (?, ?)",
+                    [(query, r[0]) for r in rows],
+                )
+        return len(rows)
+
+    def high_water(self, query: str) -> Optional[datetime]:
+        row = self.conn.execute("SELECT high_water FROM sync_state WHERE query = ?", (query,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def set_high_water(self, query: str, ts: datetime) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO sync_state (query, high_water) VALUES (?, ?) "
+                "ON CONFLICT(query) DO UPDATE SET high_water = MAX(high_water, excluded.high_water)",
+                (query, ts.isoformat()),
+            )
+
+    # ---- reads ----
+
+    def _window_rows(
+        self,
+        since: datetime,
+        query: str | Sequence[str] | None = None,
+        categories: Sequence[str] | None = None,
+    ) -> Iterator[tuple]:
+        sql = f"SELECT {_COLUMNS}, MAX(version) FROM papers WHERE updated_at >= ?"
+        args: list = [since.isoformat()]
+        if query is not None:
+            queries = [query] if isinstance(query, str) else list(query)
+            marks = ", ".join("?" for _ in queries)
+            sql += f" AND arxiv_id IN (SELECT arxiv_id FROM query_papers WHERE query IN ({marks}))"
+            args.extend(queries)
+        if categories:
+            marks = ", ".join("?" for _ in categories)
+            sql += f" AND arxiv_id IN (SELECT arxiv_id FROM paper_categories WHERE category IN ({marks}))"
+            args.extend(categories)
+        sql += " GROUP BY arxiv_id ORDER BY updated_at DESC"
+
+        return self.conn.execute(sql, args)
+
+    def iter_window(
+        self,
+        since: datetime,
+        query: str | Sequence[str] | None = None,
+        categories: Sequence[str] | None = None,
+    ) -> Iterator[Paper]:
+        """
+        Yield the latest version of every paper updated at or after `since`,
+        newest first. Optionally restricted to papers a search query (or any of
+        several queries) returned, or to papers cross-listed in any of `categories`.
+        """
+        for row in self._window_rows(since, query, categories):
+            yield _from_row(row)
+
+    def window(
+        self,
+        since: datetime,
+        query: str | Sequence[str] | None = None,
+        categories: Sequence[str] | None = None,
+    ) -> List[Paper]:
+        return list(self.iter_window(since, query=query, categories=categories))
+
+    def load_batch(
+        self,
+        since: datetime,
+        query: str | Sequence[str] | None = None,
+        categories: Sequence[str] | None = None,
+    ):
+        """Same window as iter_window(), loaded straight into a columnar PaperBatch."""
+        from .columnar import PaperBatchBuilder
+
+        b = PaperBatchBuilder()
+        for row in self._window_rows(since, query, categories):
+            b.append(*_row_fields(row))
+        return b.build()
+
+    def latest(self, arxiv_ids: Sequence[str]) -> List[Paper]:
+        """Latest stored version of each of `arxiv_ids` (ids not in the store are skipped)."""
+        out: List[Paper] = []
+        ids = list(dict.fromkeys(arxiv_ids))
+        for lo in range(0, len(ids), 500):
+            chunk = ids[lo:lo + 500]
+            marks = ", ".join("?" for _ in chunk)
+            rows = self.conn.execute(
+                f"SELECT {_COLUMNS}, MAX(version) FROM papers WHERE arxiv_id IN ({marks}) GROUP BY arxiv_id", chunk
+            )
+            out.extend(_from_row(row) for row in rows)
+        return out
+
+    def facet_rows(self) -> Iterator[tuple]:
+        """(arxiv_id, version, authors JSON, categories JSON, updated_at) of the latest version of every paper."""
+        return self.conn.execute(
+            "SELECT arxiv_id, version, authors, categories, updated_at, MAX(version) FROM papers GROUP BY arxiv_id"
+        )
+
+    def state_key(self) -> str:
+        """Changes whenever a paper version is added (what derived indexes are keyed on)."""
+        n, newest = self.conn.execute("SELECT COUNT(*), MAX(updated_at) FROM papers").fetchone()
+        return f"{n}:{newest}"
+
+    def count(self) -> int:
+        return int(self.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0])
+
+
+@dataclass(frozen=True)
+class SyncResult:
+    query: str
+    fetched: int
+    previous_high_water: Optional[datetime]
+    high_water: Optional[datetime]
+    complete: bool = True       # False: stopped at max_fetch, so the mark was not moved
+
+
+def sync_recent(
+    store: PaperStore,
+    categories: List[str],
+    keywords: List[str],
+    lookback_hours: int,
+    max_fetch: int,
+    cache=None,
+    client=None,
+) -> SyncResult:
+    """
+    Fetch only entries newer than the query's high-water mark and upsert them.
+
+    Entries updated exactly at the mark are fetched again; the upsert makes
+    that idempotent and it avoids losing papers that share the timestamp.
+    The mark only moves once a fetch reached the cutoff (see
+    advance_high_water); `complete` is False when max_fetch cut it short.
+    """
+    from .sources.arxiv_client import FetchStatus, advance_high_water, build_search_query, iter_recent
+
+    q = build_search_query(categories, keywords)
+    prev = store.high_water(q)
+
+    status = FetchStatus()
+    papers = iter_recent(
+        categories, keywords, lookback_hours, max_fetch, since=prev, cache=cache, client=client, status=status
+    )
+    fetched = store.upsert(papers, query=q)
+    mark = advance_high_water(prev, status)
+    if mark is not None and mark != prev:
+        store.set_high_water(q, mark)
+
+    return SyncResult(
+        query=q,
+        fetched=fetched,
+        previous_high_water=prev,
+        high_water=mark,
+        complete=status.complete,
+    )
+
+
+def sync_shards(
+    store: PaperStore,
+    shards,
+    lookback_hours: int,
+    max_fetch: int,
+    max_workers: int = 4,
+    client=None,
+    cache=None,
+) -> list:
+    """
+    Incrementally sync several query shards concurrently. Each shard query
+    keeps its own high-water mark; fetching runs on the planner's thread pool
+    and all writes happen here on the store's thread. Returns ShardResults.
+    """
+    from .sources.arxiv_client import advance_high_water
+    from .sources.planner import run_shards
+
+    since = {sh.query: store.high_water(sh.query) for sh in shards}
+    since = {q: ts for q, ts in since.items() if ts is not None}
+
+    results = run_shards(
+        shards,
+        lookback_hours,
+        max_fetch,
+        max_workers=max_workers,
+        client=client,
+        cache=cache,
+        since=since,
+    )
+    for res in results:
+        store.upsert(res.papers, query=res.shard.query)
+        prev = since.get(res.shard.query)
+        mark = advance_high_water(prev, res.status) if res.status is not None else prev
+        if mark is not None and mark != prev:
+            store.set_high_water(res.shard.query, mark)
+    return results
+
+
+@dataclass(frozen=True)
+class ImportResult:
+    path: str
+    format: str
+    read: int
+    written: int
+    seconds: float
+
+
+def _import_chunk(fmt: str, chunk: List[bytes], wanted) -> tuple:
+    # runs in a worker process: parse, filter and serialize so the parent only writes
+    from .sources.snapshot import parse_chunk
+
+    papers = parse_chunk(fmt, chunk, wanted)
+    return (
+        len(chunk),
+        [_to_row(p) for p in papers],
+        [(p.arxiv_id, c) for p in papers for c in p.categories],
+    )
+
+
+def import_snapshot(
+    store: PaperStore,
+    path: str | Path,
+    categories: Sequence[str] | None = None,
+    fmt: str | None = None,
+    workers: int | None = None,
+    batch_size: int = 50_000,
+    progress=None,
+) -> ImportResult:
+    """
+    Bulk-load an arXiv metadata snapshot (JSONL dump or OAI-PMH XML, optionally
+    gzipped) into the store.
+
+    The file is cut into chunks of raw records in this process; parsing, the
+    category filter and row serialization run on a process pool with a bounded
+    number of chunks in flight, so memory stays flat however large the file
+    is. Rows are written in order, `batch_size` papers per transaction.
+    workers=0 parses in-process. `progress(read, written)` is called after
+    every transaction.
+    """
+    from .sources.snapshot import detect_format, iter_chunks, open_snapshot
+
+    fmt = fmt or detect_format(path)
+    wanted = frozenset(categories) if categories else None
+    workers = (os.cpu_count() or 1) if workers is None else workers
+
+    t0 = time.perf_counter()
+    read = written = 0
+    rows: List[tuple] = []
+    cat_rows: List[tuple] = []
+
+    def _take(result: tuple) -> None:
+        nonlocal read, written, rows, cat_rows
+        n, r, c = result
+        read += n
+        rows.extend(r)
+        cat_rows.extend(c)
+        if len(rows) >= batch_size:
+            written += store.write_rows(rows, cat_rows)
+            rows, cat_rows = [], []
+            if progress is not None:
+                progress(read, written)
+
+    with open_snapshot(path) as f:
+        chunks = iter_chunks(f, fmt)
+        if workers <= 0:
+            for chunk in chunks:
+                _take(_import_chunk(fmt, chunk, wanted))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending: deque = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(_import_chunk, fmt, chunk, wanted))
+                    if len(pending) >= 2 * workers:
+                        _take(pending.popleft().result())
+                while pending:
+                    _take(pending.popleft().result())
+
+    if rows:
+        written += store.write_rows(rows, cat_rows)
+    if progress is not None:
+        progress(read, written)
+
+    return ImportResult(
+        path=str(path),
+        format=fmt,
+        read=read,
+        written=written,
+        seconds=time.perf_counter() - t0,
+    )
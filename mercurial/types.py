@@ -6,7 +6,7 @@ from datetime import datetime
 from typing import Dict, List
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Paper:
     arxiv_id: str
     version: int
@@ -16,10 +16,18 @@ class Paper:
     categories: List[str]
     published_at: datetime   # naive UTC
     updated_at: datetime     # naive UTC
-    abs_url: str
-    pdf_url: str
 
-@dataclass(frozen=True)
+    # derived from arxiv_id instead of stored per instance
+    @property
+    def abs_url(self) -> str:
+        return f"https://arxiv.org/abs/{self.arxiv_id}"
+
+    @property
+    def pdf_url(self) -> str:
+        return f"https://arxiv.org/pdf/{self.arxiv_id}.pdf"
+
+
+@dataclass(frozen=True, slots=True)
 class RankedPaper:
     paper: Paper
     score: float
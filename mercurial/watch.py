@@ -0,0 +1,312 @@
+# mercurial/watch.py
+from __future__ import annotations
+
+import json
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+
+import numpy as np
+import requests
+
+from .config import Settings, load_settings
+from .profiles import profiles_dir
+from .ranker.batch_ranker import combine, top_k_indices
+from .ranker.simple_ranker import RankerConfig
+from .sources.arxiv_client import ArxivClient, FetchStatus, advance_high_water, build_search_query, iter_recent
+from .types import Paper, RankedPaper
+
+
+# arXiv announces new submissions at 20:00 US Eastern, Sunday through Thursday
+ANNOUNCE_TZ = "America/New_York"
+ANNOUNCE_HOUR = 20
+ANNOUNCE_WEEKDAYS = frozenset({6, 0, 1, 2, 3})  # Mon=0 .. Sun=6
+
+# how often the sleep loop wakes up to check profile files for changes
+RELOAD_CHECK_SECONDS = 5.0
+
+
+def _announce_tz():
+    try:
+        from zoneinfo import ZoneInfo
+
+        return ZoneInfo(ANNOUNCE_TZ)
+    except Exception:  # no tz database available: assume EST
+        return timezone(timedelta(hours=-5))
+
+
+def next_announcement(after: datetime) -> datetime:
+    """First arXiv announcement strictly after `after` (naive UTC in, naive UTC out)."""
+    tz = _announce_tz()
+    local = after.replace(tzinfo=timezone.utc).astimezone(tz)
+    day = local.date()
+    for _ in range(8):
+        t = datetime(day.year, day.month, day.day, ANNOUNCE_HOUR, tzinfo=tz)
+        if t > local and t.weekday() in ANNOUNCE_WEEKDAYS:
+            return t.astimezone(timezone.utc).replace(tzinfo=None)
+        day += timedelta(days=1)
+    raise RuntimeError("no announcement found within a week")  # unreachable
+
+
+@dataclass
+class _Entry:
+    paper: Paper
+    title_hits: int
+    abstract_hits: int
+    bonus: bool
+
+
+class WatchState:
+    """
+    In-memory ranked window. Keyword matching is done once per new paper (or
+    new version); each poll only recomputes the recency decay over the window
+    and the top-N. A config change (profile reload) re-matches everything.
+    """
+
+    def __init__(self, cfg: RankerConfig, top_n: int):
+        self.cfg = cfg
+        self.top_n = top_n
+        self.entries: Dict[str, _Entry] = {}
+        self.top_ids: List[str] = []
+
+    def _score(self, p: Paper) -> _Entry:
+        m = self.cfg.matcher()
+        return _Entry(
+            paper=p,
+            title_hits=len(m.match_indices(p.title)),
+            abstract_hits=len(m.match_indices(p.abstract)),
+            bonus=not frozenset(self.cfg.bonus_categories).isdisjoint(p.categories),
+        )
+
+    def set_config(self, cfg: RankerConfig) -> None:
+        if cfg == self.cfg:
+            return
+        self.cfg = cfg
+        self.entries = {k: self._score(e.paper) for k, e in self.entries.items()}
+
+    def add(self, papers: Iterable[Paper]) -> int:
+        """Score and keep new papers / newer versions. Returns how many changed."""
+        n = 0
+        for p in papers:
+            cur = self.entries.get(p.arxiv_id)
+            if cur is not None and (cur.paper.version, cur.paper.updated_at) >= (p.version, p.updated_at):
+                continue
+            self.entries[p.arxiv_id] = self._score(p)
+            n += 1
+        return n
+
+    def evict(self, cutoff: datetime) -> int:
+        old = [k for k, e in self.entries.items() if e.paper.updated_at < cutoff]
+        for k in old:
+            del self.entries[k]
+        return len(old)
+
+    def rank(self, now: datetime) -> List[RankedPaper]:
+        entries = list(self.entries.values())
+        if not entries:
+            return []
+        title_hits = np.fromiter((e.title_hits for e in entries), dtype=np.int32, count=len(entries))
+        abstract_hits = np.fromiter((e.abstract_hits for e in entries), dtype=np.int32, count=len(entries))
+        bonus = np.fromiter((e.bonus for e in entries), dtype=bool, count=len(entries))
+        updated = np.array([e.paper.updated_at for e in entries], dtype="datetime64[us]")
+
+        hours_ago = np.maximum((np.datetime64(now, "us") - updated) / np.timedelta64(1, "h"), 0.0)
+        kw_score, recency, cat_bonus, score = combine(title_hits, abstract_hits, hours_ago, bonus, self.cfg)
+
+        m = self.cfg.matcher()
+        out: List[RankedPaper] = []
+        for i in top_k_indices(score, updated, self.top_n):
+            p = entries[i].paper
+            out.append(
+                RankedPaper(
+                    paper=p,
+                    score=float(score[i]),
+                    matched_keywords=list(dict.fromkeys(m.hits(p.title) + m.hits(p.abstract))),
+                    score_breakdown={
+                        "kw_score": float(kw_score[i]),
+                        "recency": float(recency[i]),
+                        "cat_bonus": float(cat_bonus[i]),
+                        "hours_ago": float(hours_ago[i]),
+                    },
+                )
+            )
+        return out
+
+    def update(self, now: datetime) -> List[Tuple[int, RankedPaper]]:
+        """Re-rank and return (rank, paper) for papers that were not in the previous top-N."""
+        ranked = self.rank(now)
+        prev = set(self.top_ids)
+        self.top_ids = [rp.paper.arxiv_id for rp in ranked]
+        return [(i, rp) for i, rp in enumerate(ranked, 1) if rp.paper.arxiv_id not in prev]
+
+
+class ProfileFiles:
+    """Tracks mtimes of the selected profile files; changed() is true once per modification."""
+
+    def __init__(self, names: Iterable[str]):
+        self.paths = [profiles_dir() / f"{n}.env" for n in names]
+        self._mtimes = self._snapshot()
+
+    def _snapshot(self) -> Dict[Path, float]:
+        out: Dict[Path, float] = {}
+        for p in self.paths:
+            try:
+                out[p] = p.stat().st_mtime
+            except FileNotFoundError:
+                out[p] = -1.0
+        return out
+
+    def changed(self) -> bool:
+        cur = self._snapshot()
+        if cur == self._mtimes:
+            return False
+        self._mtimes = cur
+        return True
+
+
+def _print_entry(rank: int, rp: RankedPaper, out: TextIO) -> None:
+    p = rp.paper
+    hits = ", ".join(rp.matched_keywords[:8]) + ("..." if len(rp.matched_keywords) > 8 else "")
+    print(f"[+] #{rank} score={rp.score:.4f}  {p.arxiv_id}v{p.version} | {p.updated_at} UTC", file=out)
+    print(f"    {p.title}", file=out)
+    print(f"    hits: {hits}", file=out)
+    print(f"    {p.abs_url}", file=out)
+    out.flush()
+
+
+def _json_entry(rank: int, rp: RankedPaper, now: datetime) -> str:
+    p = rp.paper
+    return json.dumps(
+        {
+            "emitted_at": now.isoformat(timespec="seconds"),
+            "rank": rank,
+            "score": rp.score,
+            "arxiv_id": p.arxiv_id,
+            "version": p.version,
+            "title": p.title,
+            "authors": p.authors,
+            "categories": p.categories,
+            "updated_at": p.updated_at.isoformat(),
+            "abs_url": p.abs_url,
+            "matched_keywords": rp.matched_keywords,
+            "score_breakdown": rp.score_breakdown,
+        },
+        ensure_ascii=False,
+    )
+
+
+def watch(
+    profiles: Optional[List[str]],
+    top: Optional[int] = None,
+    jsonl: str | Path | None = None,
+    interval_seconds: Optional[float] = None,
+    offset_minutes: float = 15.0,
+    iterations: int = 0,
+    client: ArxivClient | None = None,
+    settings_loader: Callable[[Optional[List[str]]], Settings] = load_settings,
+) -> int:
+    """
+    Poll arXiv, keep the ranked window in memory and emit papers that newly
+    enter the top-N (printed, or appended to `jsonl` one object per line).
+
+    Polls happen right away and then `offset_minutes` after each arXiv
+    announcement, or every `interval_seconds` if given. Selected profile files
+    are re-read when they change, followed by an immediate poll. Each poll only
+    requests entries updated since the newest one already seen for the query.
+    A poll that fails (arXiv unreachable after the client's retries) leaves the
+    window and the mark as they were and is retried at the next poll.
+    `iterations` > 0 stops after that many polls.
+    """
+    s = settings_loader(profiles)
+    client = client or ArxivClient(s.arxiv_api_url, delay_seconds=s.arxiv_delay_seconds)
+    top_n = top if top is not None else s.top_picks
+    state = WatchState(RankerConfig.from_settings(s), top_n)
+    files = ProfileFiles(s.profiles)
+    high_water: Dict[str, datetime] = {}
+
+    sink: Optional[TextIO] = None
+    if jsonl is not None:
+        Path(jsonl).parent.mkdir(parents=True, exist_ok=True)
+        sink = open(jsonl, "a", encoding="utf-8")
+
+    prof_str = ", ".join(s.profiles) if s.profiles else "(none)"
+    print(f"Watching profiles: {prof_str} (top {top_n}, lookback_hours={s.lookback_hours})", flush=True)
+
+    polls = 0
+    try:
+        while True:
+            q = build_search_query(s.arxiv_categories, s.keywords)
+            since = high_water.get(q)
+            status = FetchStatus()
+            error: Optional[str] = None
+            try:
+                fetched: List[Paper] = list(
+                    iter_recent(
+                        s.arxiv_categories, s.keywords, s.lookback_hours, s.max_fetch,
+                        since=since, client=client, status=status,
+                    )
+                )
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                mark = advance_high_water(since, status)
+                if mark is not None:
+                    high_water[q] = mark
+
+            now = datetime.utcnow()
+            if error is None:
+                changed = state.add(fetched)
+                state.evict(now - timedelta(hours=s.lookback_hours))
+                new = state.update(now)
+
+                for rank, rp in new:
+                    if sink is not None:
+                        sink.write(_json_entry(rank, rp, now) + "\n")
+                    else:
+                        _print_entry(rank, rp, sys.stdout)
+                if sink is not None:
+                    sink.flush()
+
+            polls += 1
+            if iterations and polls >= iterations:
+                return 0
+
+            if interval_seconds:
+                next_poll = now + timedelta(seconds=interval_seconds)
+            else:
+                next_poll = next_announcement(now) + timedelta(minutes=offset_minutes)
+            if error is not None:
+                print(
+                    f"[{now:%Y-%m-%d %H:%M:%S}] fetch failed, keeping the previous window: {error}; "
+                    f"next poll {next_poll:%Y-%m-%d %H:%M:%S} UTC",
+                    flush=True,
+                )
+            else:
+                print(
+                    f"[{now:%Y-%m-%d %H:%M:%S}] fetched {len(fetched)} ({changed} new/updated), "
+                    f"window {len(state.entries)}, {len(new)} new in top {top_n}; "
+                    f"next poll {next_poll:%Y-%m-%d %H:%M:%S} UTC"
+                    + ("" if status.complete else " (stopped at max_fetch; mark not moved)"),
+                    flush=True,
+                )
+
+            while datetime.utcnow() < next_poll:
+                remaining = (next_poll - datetime.utcnow()).total_seconds()
+                time.sleep(max(0.0, min(RELOAD_CHECK_SECONDS, remaining)))
+                if files.changed():
+                    try:
+                        s = settings_loader(profiles)
+                    except (ValueError, FileNotFoundError) as e:
+                        print(f"Profile reload failed, keeping previous settings: {e}", flush=True)
+                        continue
+                    state.set_config(RankerConfig.from_settings(s))
+                    print("Profiles changed on disk; reloaded and re-scored.", flush=True)
+                    break
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        if sink is not None:
+            sink.close()
@@ -0,0 +1,72 @@
+# tools/check_atom_parser.py
+from __future__ import annotations
+
+import os, sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import argparse
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from mercurial.sources.atom_parser import parse_feed
+from mercurial.sources.http_cache import default_cache_dir
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Parity check: streaming etree Atom parser vs feedparser on recorded feeds"
+    )
+    parser.add_argument(
+        "feeds",
+        nargs="*",
+        help="Atom files to compare (default: responses recorded under data/http_cache via --cache)",
+    )
+    args = parser.parse_args()
+
+    paths = [Path(f) for f in args.feeds] or sorted(default_cache_dir().glob("*.atom"))
+    if not paths:
+        print("No recorded feeds. Run e.g. `python tools/debug_rank.py --cache` first, or pass files.")
+        return 1
+
+    failures = 0
+    t_etree = t_fp = 0.0
+    n_entries = 0
+    for path in paths:
+        body = path.read_bytes()
+
+        t0 = time.perf_counter()
+        fast = list(parse_feed(body, "etree"))
+        t_etree += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        ref = list(parse_feed(body, "feedparser"))
+        t_fp += time.perf_counter() - t0
+
+        n_entries += len(ref)
+        if len(fast) != len(ref):
+            failures += 1
+            print(f"[MISMATCH] {path.name}: {len(fast)} entries (etree) vs {len(ref)} (feedparser)")
+            continue
+
+        for a, b in zip(fast, ref):
+            da, db = asdict(a), asdict(b)
+            diff = [k for k in da if da[k] != db[k]]
+            if diff:
+                failures += 1
+                print(f"[MISMATCH] {path.name} {b.arxiv_id}v{b.version}: {', '.join(diff)}")
+                for k in diff:
+                    print(f"    {k}: etree={da[k]!r}")
+                    print(f"    {k}: feedparser={db[k]!r}")
+                break
+
+    print(f"Checked {len(paths)} feeds, {n_entries} entries, {failures} mismatching feeds.")
+    print(f"etree: {t_etree:.3f}s  feedparser: {t_fp:.3f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -13,6 +13,7 @@ from pathlib import Path
 
 from mercurial.config import load_settings
 from mercurial.sources.arxiv_client import build_search_query, fetch_recent
+from mercurial.sources.http_cache import ResponseCache
 from mercurial.ranker.simple_ranker import RankerConfig, rank_papers
 
 
@@ -21,11 +22,21 @@ def main() -> int:
     parser.add_argument("--profile", action="append", default=None)
     parser.add_argument("--top", type=int, default=20)
     parser.add_argument("--dump", type=str, default=None, help="Dump ranked results to a JSON file")
+    parser.add_argument("--cache", action="store_true", help="Record/reuse raw arXiv responses under data/http_cache")
+    parser.add_argument("--replay", action="store_true", help="Serve arXiv responses only from data/http_cache")
     args = parser.parse_args()
 
     s = load_settings(selected_profiles=args.profile)
     q = build_search_query(s.arxiv_categories, s.keywords)
 
+    cache = None
+    if args.cache or args.replay:
+        cache = ResponseCache(
+            ttl_seconds=s.http_cache_ttl_seconds,
+            max_bytes=int(s.http_cache_max_mb * 1024 * 1024),
+            replay=args.replay,
+        )
+
     print("=== SETTINGS ===")
     print("profiles:", s.profiles if s.profiles else "(none)")
     print("lookback_hours:", s.lookback_hours)
@@ -42,6 +53,7 @@ def main() -> int:
         keywords=s.keywords,
         lookback_hours=s.lookback_hours,
         max_fetch=s.max_fetch,
+        cache=cache,
     )
 
     cfg = RankerConfig(
@@ -50,6 +62,7 @@ def main() -> int:
         abstract_weight=getattr(s, "kw_abstract_weight", 1.0),
         recency_half_life_hours=getattr(s, "recency_half_life_hours", 48.0),
         category_bonus=getattr(s, "category_bonus", 0.2),
+        word_boundary=getattr(s, "kw_word_boundary", False),
     )
 
     ranked = rank_papers(papers, cfg)